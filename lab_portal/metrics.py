@@ -0,0 +1,292 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+DB_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+RESPONSE_SIZE_BUCKETS = (1_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 10_000_000, 100_000_000)
+
+METRICS = {
+    "portal_requests_total": ("counter", "Requests by URL name, method and status.", None),
+    "portal_request_duration_seconds": ("histogram", "Request latency by URL name.", LATENCY_BUCKETS),
+    "portal_request_db_queries": ("histogram", "Database queries issued per request.", QUERY_COUNT_BUCKETS),
+    "portal_request_db_duration_seconds": ("histogram", "Time spent in the database per request.", DB_TIME_BUCKETS),
+    "portal_response_size_bytes": ("histogram", "Response body size.", RESPONSE_SIZE_BUCKETS),
+}
+
+
+def _label_key(labels: dict) -> str:
+    return json.dumps(sorted(labels.items()))
+
+
+class MetricsStore:
+    # Each worker process keeps its own counters in memory and periodically
+    # writes them to metrics-<pid>.json in a shared directory; the /metrics
+    # endpoint sums the files of workers that are still running, like
+    # Prometheus multiprocess mode. A worker that exits takes its counts with
+    # it, which Prometheus reads as a counter reset.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._data = {}
+        self._last_flush = 0.0
+
+    @property
+    def directory(self) -> Path:
+        return Path(settings.METRICS_DIR)
+
+    def _metric(self, name):
+        if os.getpid() != self._pid:
+            # Forked worker: start from zero rather than re-reporting the parent's counts.
+            self._reset()
+        return self._data.setdefault(name, {})
+
+    def inc(self, name, labels, value=1):
+        key = _label_key(labels)
+        with self._lock:
+            metric = self._metric(name)
+            metric[key] = metric.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = _label_key(labels)
+        with self._lock:
+            series = self._metric(name).setdefault(key, {"buckets": [0] * len(buckets), "sum": 0.0, "count": 0})
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    series["buckets"][index] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            payload = json.dumps(self._data)
+            self._last_flush = time.monotonic()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, prefix=".metrics-", suffix=".tmp")
+        with os.fdopen(handle, "w") as stream:
+            stream.write(payload)
+        os.replace(temp_path, self.directory / f"metrics-{os.getpid()}.json")
+
+    def collect(self) -> dict:
+        self.flush()
+        merged = {}
+        for path in sorted(self.directory.glob("metrics-*.json")):
+            pid = path.stem.removeprefix("metrics-")
+            if not pid.isdigit():
+                continue
+            if not _process_alive(int(pid)):
+                path.unlink(missing_ok=True)
+                continue
+            try:
+                data = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            for name, series in data.items():
+                target = merged.setdefault(name, {})
+                for key, value in series.items():
+                    if isinstance(value, dict):
+                        empty = {"buckets": [0] * len(value["buckets"]), "sum": 0.0, "count": 0}
+                        current = target.setdefault(key, empty)
+                        current["buckets"] = [a + b for a, b in zip(current["buckets"], value["buckets"])]
+                        current["sum"] += value["sum"]
+                        current["count"] += value["count"]
+                    else:
+                        target[key] = target.get(key, 0) + value
+        return merged
+
+
+def _process_alive(pid: int) -> bool:
+    # Worker files share one host's pid space; elsewhere (no signal 0) keep them.
+    if pid == os.getpid() or os.name != "posix":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+store = MetricsStore()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    items = [*labels, *extra]
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+def render_prometheus(data) -> str:
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for key, value in sorted(data.get(name, {}).items()):
+            labels = [tuple(item) for item in json.loads(key)]
+            if kind == "counter":
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, value["buckets"]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {value['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {value['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+    return "\n".join(lines) + "\n"
+
+
+_query_observers = ContextVar("portal_query_observers", default=())
+
+
+def _notify_observers(execute, sql, params, many, context):
+    observers = _query_observers.get()
+    if not observers:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        for observer in observers:
+            observer(context["connection"].alias, sql, None if many else params, elapsed)
+
+
+def _install_observer_hook(connection) -> None:
+    if _notify_observers not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_notify_observers)
+
+
+@receiver(connection_created)
+def _hook_new_connection(sender, connection, **kwargs):
+    _install_observer_hook(connection)
+
+
+@contextmanager
+def observe_queries(observer):
+    # Calls observer(alias, sql, params, seconds) for every query run in this
+    # context. Connections are per thread, so observers live in a ContextVar
+    # that sync_to_async carries into the thread an async view's queries use.
+    for alias in connections:
+        _install_observer_hook(connections[alias])
+    token = _query_observers.set((*_query_observers.get(), observer))
+    try:
+        yield
+    finally:
+        _query_observers.reset(token)
+
+
+class _QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, alias, sql, params, seconds):
+        self.duration += seconds
+        self.count += 1
+
+
+class RequestMetricsMiddleware:
+    # Async-capable so ASGI requests to async views are measured without a
+    # thread hop.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timer = _QueryTimer()
+        started = time.perf_counter()
+        with observe_queries(timer):
+            response = self.get_response(request)
+        return self._record(request, response, timer, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        timer = _QueryTimer()
+        started = time.perf_counter()
+        with observe_queries(timer):
+            response = await self.get_response(request)
+        return self._record(request, response, timer, time.perf_counter() - started)
+
+    def _record(self, request, response, timer, elapsed):
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "<unresolved>"
+        labels = {"view": view}
+        store.inc("portal_requests_total", {**labels, "method": request.method, "status": response.status_code})
+        store.observe("portal_request_duration_seconds", labels, elapsed)
+        store.observe("portal_request_db_queries", labels, timer.count)
+        store.observe("portal_request_db_duration_seconds", labels, timer.duration)
+
+        if response.streaming:
+            count_stream = self._acount_stream if response.is_async else self._count_stream
+            response.streaming_content = count_stream(response.streaming_content, labels)
+        else:
+            store.observe("portal_response_size_bytes", labels, len(response.content))
+            store.maybe_flush()
+        return response
+
+    def _count_stream(self, chunks, labels):
+        size = 0
+        try:
+            for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+        finally:
+            store.observe("portal_response_size_bytes", labels, size)
+            store.maybe_flush()
+
+    async def _acount_stream(self, chunks, labels):
+        # Async streams (the live dashboard) must stay async for the ASGI handler.
+        size = 0
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+        finally:
+            store.observe("portal_response_size_bytes", labels, size)
+            store.maybe_flush()
+
+
+def metrics_view(request):
+    token = getattr(settings, "METRICS_TOKEN", "")
+    authorization = request.headers.get("Authorization", "")
+    token_ok = bool(token) and constant_time_compare(authorization, f"Bearer {token}")
+    if not token_ok and not (request.user.is_authenticated and request.user.is_staff):
+        return HttpResponseForbidden("Staff only.")
+    return HttpResponse(render_prometheus(store.collect()), content_type="text/plain; version=0.0.4; charset=utf-8")
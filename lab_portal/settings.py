@@ -23,13 +23,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "lab_portal.metrics.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    "portal.routers.PrimaryPinMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "portal.profiling.RequestProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "lab_portal.urls"
@@ -52,6 +55,7 @@ TEMPLATES = [
 WSGI_APPLICATION = "lab_portal.wsgi.application"
 
 postgres_db = os.getenv("POSTGRES_DB")
+postgres_pool_size = int(os.getenv("POSTGRES_POOL_MAX_SIZE", "0"))
 if postgres_db:
     DATABASES = {
         "default": {
@@ -63,6 +67,8 @@ if postgres_db:
             "PORT": os.getenv("POSTGRES_PORT", "5432"),
         }
     }
+    if postgres_pool_size:
+        DATABASES["default"]["OPTIONS"] = {"pool": {"min_size": 2, "max_size": postgres_pool_size}}
 else:
     DATABASES = {
         "default": {
@@ -71,6 +77,94 @@ else:
         }
     }
 
+# Optional read replica for reporting traffic (dashboard, explorer, exports,
+# JSON API). Locally, point SQLITE_REPLICA_PATH at a copy of db.sqlite3.
+REPLICA_DATABASE = None
+replica_host = os.getenv("POSTGRES_REPLICA_HOST")
+sqlite_replica_path = os.getenv("SQLITE_REPLICA_PATH")
+if postgres_db and replica_host:
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": replica_host,
+        "PORT": os.getenv("POSTGRES_REPLICA_PORT") or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+    REPLICA_DATABASE = "replica"
+elif not postgres_db and sqlite_replica_path:
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": sqlite_replica_path,
+        "TEST": {"MIRROR": "default"},
+    }
+    REPLICA_DATABASE = "replica"
+DATABASE_ROUTERS = ["portal.routers.ReplicaRouter"]
+# Seconds a session keeps reading from the primary after it writes, and how
+# long dashboard payloads built from the replica may be cached.
+REPLICA_PIN_SECONDS = int(os.getenv("DJANGO_REPLICA_PIN_SECONDS", "10"))
+REPLICA_CACHE_TIMEOUT = 60
+
+# The async dashboard runs its independent queries on separate pooled connections.
+DASHBOARD_PARALLEL_QUERIES = bool(postgres_db and postgres_pool_size)
+
+# Dashboard KPIs, facet counts and per-user context are invalidated through
+# version keys in this cache, so by default every process shares it on disk.
+# DJANGO_LOCAL_CACHE=1 keeps it in process memory instead (single-process
+# runs); writes made elsewhere are then only seen once entries expire, so
+# nothing is cached for longer than LOCAL_CACHE_TIMEOUT seconds.
+LOCAL_CACHE = os.getenv("DJANGO_LOCAL_CACHE", "0") == "1"
+LOCAL_CACHE_TIMEOUT = 60
+if LOCAL_CACHE:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "lab-portal",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("DJANGO_CACHE_DIR") or str(BASE_DIR / "var" / "cache"),
+        }
+    }
+
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
+# Swaps in a test-only cache and metrics directory so the suite never touches
+# the shared ones.
+TEST_RUNNER = "lab_portal.test_runner.PortalTestRunner"
+
+# Each worker writes its request metrics here; /metrics sums the files of
+# live workers, so the directory must not be shared between hosts.
+METRICS_DIR = os.getenv("DJANGO_METRICS_DIR") or str(BASE_DIR / "var" / "metrics")
+METRICS_FLUSH_INTERVAL = float(os.getenv("DJANGO_METRICS_FLUSH_INTERVAL", "5"))
+METRICS_TOKEN = os.getenv("DJANGO_METRICS_TOKEN", "")
+
+# Request profiles are captured for staff adding ?_profile=1, plus this
+# fraction of all requests (0 disables sampling). Only the newest are kept.
+PROFILING_SAMPLE_RATE = float(os.getenv("DJANGO_PROFILING_SAMPLE_RATE", "0"))
+PROFILING_SAMPLE_INTERVAL = 0.001
+PROFILING_KEEP = 200
+# Store SQL parameter values with captured queries. Off by default since
+# sampled requests belong to other users; session and auth statements are
+# always redacted.
+PROFILING_CAPTURE_PARAMS = os.getenv("DJANGO_PROFILING_CAPTURE_PARAMS", "0") == "1"
+
+# Bearer token for pipelines posting results to /api/v1/records/ingest/.
+INGEST_TOKEN = os.getenv("DJANGO_INGEST_TOKEN", "")
+
+# The live dashboard stream checks the records data version this often (one
+# cache read per process, not per client) and sends comments when idle.
+LIVE_DASHBOARD_POLL_SECONDS = float(os.getenv("DJANGO_LIVE_DASHBOARD_POLL_SECONDS", "2"))
+LIVE_DASHBOARD_KEEPALIVE_SECONDS = 15
+
+# Prefix for sample codes allocated when a record is registered without one.
+SAMPLE_CODE_PREFIX = os.getenv("DJANGO_SAMPLE_CODE_PREFIX", "LAB")
+
+# compact_record_changes keeps the full change log for this many days; older
+# entries are reduced to the latest change per record.
+CHANGE_LOG_RETENTION_DAYS = int(os.getenv("DJANGO_CHANGE_LOG_RETENTION_DAYS", "30"))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
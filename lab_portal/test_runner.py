@@ -0,0 +1,29 @@
+import tempfile
+
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class PortalTestRunner(DiscoverRunner):
+    # Tests run against their own in-memory cache and metrics directory, so
+    # cache.clear(), test data-version bumps and request metrics never reach
+    # the shared ones under var/.
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._metrics_dir = tempfile.TemporaryDirectory()
+        self._overrides = override_settings(
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                    "LOCATION": "lab-portal-tests",
+                }
+            },
+            METRICS_DIR=self._metrics_dir.name,
+        )
+        self._overrides.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._overrides.disable()
+        self._metrics_dir.cleanup()
+        super().teardown_test_environment(**kwargs)
@@ -1,10 +1,29 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.db import transaction
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
 
-from .models import LabRecord, SavedView
+from .counts import ApproximateCountPaginator, rollup_count
+from .data_version import mark_records_changed
+from .models import DailyRecordStats, LabRecord, LabRecordChange, RequestProfile, SavedView
+
+
+class RollupTotalChangeList(ChangeList):
+    # Django's "(N total)" link runs a second COUNT(*) over the whole table;
+    # the rollup gives the same number from the small bucket table.
+    def get_results(self, request):
+        super().get_results(request)
+        self.full_result_count = rollup_count({})
+        self.show_full_result_count = True
 
 
 @admin.register(LabRecord)
 class LabRecordAdmin(admin.ModelAdmin):
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
     list_display = (
         "sample_code",
         "project",
@@ -17,6 +36,104 @@ class LabRecordAdmin(admin.ModelAdmin):
     list_filter = ("status", "project", "received_at")
     search_fields = ("sample_code", "project", "submitter", "notes")
 
+    def get_changelist(self, request, **kwargs):
+        return RollupTotalChangeList
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            days = set(queryset.values_list("received_at", flat=True).distinct())
+            deleted = list(queryset.order_by("id").values(*LabRecordChange.SNAPSHOT_FIELDS))
+            super().delete_queryset(request, queryset)
+            LabRecordChange.log_rows(deleted, LabRecordChange.Action.DELETED)
+            DailyRecordStats.rebuild(days=days)
+            mark_records_changed()
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "method", "path", "view_name", "status_code", "duration_ms", "query_count", "user")
+    list_filter = ("view_name", "method", "status_code")
+    search_fields = ("path", "view_name")
+    date_hierarchy = "created_at"
+    fields = (
+        "created_at",
+        "user",
+        "method",
+        "path",
+        "view_name",
+        "status_code",
+        "duration_ms",
+        "query_count",
+        "db_time_ms",
+        "flamegraph",
+        "sql_statements",
+        "profile_table",
+    )
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                "<int:pk>/collapsed/",
+                self.admin_site.admin_view(self.collapsed_view),
+                name="portal_requestprofile_collapsed",
+            ),
+            *super().get_urls(),
+        ]
+
+    def collapsed_view(self, request, pk):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(profile.collapsed_stacks, content_type="text/plain; charset=utf-8")
+        response["Content-Disposition"] = f'attachment; filename="profile-{profile.pk}.folded"'
+        return response
+
+    @admin.display(description="Collapsed stacks")
+    def flamegraph(self, obj):
+        if not obj.collapsed_stacks:
+            return "No stack samples (request finished within one sampling interval)."
+        url = reverse("admin:portal_requestprofile_collapsed", args=[obj.pk])
+        return format_html('<a href="{}">Download .folded</a> (feed to flamegraph.pl or speedscope)', url)
+
+    @admin.display(description="SQL")
+    def sql_statements(self, obj):
+        return format_html_join(
+            "",
+            "<p><strong>{} ms</strong> [{}]</p><pre>{}\nparams: {}</pre><pre>{}</pre>",
+            (
+                (
+                    query["duration_ms"],
+                    query["alias"],
+                    query["sql"],
+                    ", ".join(query["params"]),
+                    query["explain"] or "(not explained)",
+                )
+                for query in obj.queries
+            ),
+        )
+
+    @admin.display(description="cProfile (cumulative)")
+    def profile_table(self, obj):
+        return format_html("<pre>{}</pre>", obj.profile_stats)
+
+
+@admin.register(DailyRecordStats)
+class DailyRecordStatsAdmin(admin.ModelAdmin):
+    list_display = ("day", "project", "status", "record_count", "qc_sum", "low_qc_count")
+    list_filter = ("status", "project")
+    date_hierarchy = "day"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(SavedView)
 class SavedViewAdmin(admin.ModelAdmin):
@@ -0,0 +1,328 @@
+import hashlib
+import json
+from datetime import date
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import Http404, JsonResponse
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from django.utils.http import urlencode
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import condition, require_GET, require_POST
+
+from .changes import DEFAULT_CHANGES_LIMIT, MAX_CHANGES_LIMIT, CursorExpired, changes_after
+from .dashboard import aget_dashboard_payload
+from .facets import facet_selection
+from .ingest import NDJSON_CONTENT_TYPES, MetricsIngester, read_json_rows, read_ndjson_rows
+from .models import LabRecord
+from .pagination import InvalidCursor, KeysetPaginator
+from .queries import build_record_query
+from .routers import replica_reads
+from .sample_codes import allocate_sample_codes
+from .search import SEARCH_RANK
+from .transitions import transition_records
+from .user_context import get_user_context
+
+API_FIELDS = [
+    "id",
+    "sample_code",
+    "project",
+    "submitter",
+    "status",
+    "received_at",
+    "processed_at",
+    "qc_score",
+    "read_count",
+    "notes",
+    "created_at",
+    "updated_at",
+]
+DEFAULT_LIMIT = 25
+MAX_LIMIT = 500
+MAX_REPORTED_ERRORS = 1000
+MAX_SAMPLE_CODE_BLOCK = 1000
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def api_login_required(view_func):
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({"detail": "Authentication required."}, status=401)
+        try:
+            return view_func(request, *args, **kwargs)
+        except ApiError as exc:
+            return JsonResponse({"detail": str(exc)}, status=exc.status)
+
+    return wrapper
+
+
+def api_token_or_login_required(view_func):
+    # Pipelines authenticate with "Authorization: Bearer <INGEST_TOKEN>" and
+    # skip CSRF; browser sessions still need a valid CSRF token.
+    protected = csrf_protect(api_login_required(view_func))
+
+    @csrf_exempt
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        token = settings.INGEST_TOKEN
+        authorization = request.headers.get("Authorization", "")
+        if token and constant_time_compare(authorization, f"Bearer {token}"):
+            try:
+                return view_func(request, *args, **kwargs)
+            except ApiError as exc:
+                return JsonResponse({"detail": str(exc)}, status=exc.status)
+        return protected(request, *args, **kwargs)
+
+    return wrapper
+
+
+def _make_etag(*parts) -> str:
+    return hashlib.md5("|".join(str(part) for part in parts).encode(), usedforsecurity=False).hexdigest()
+
+
+def _api_saved_view(request):
+    # Like the explorer, fall back to the user's default view when none is given.
+    user_context = get_user_context(request)
+    view_id = request.GET.get("view", "")
+    if not view_id:
+        return user_context.default_view
+    if not view_id.isdigit():
+        raise ApiError("view must be an integer id.")
+    try:
+        return user_context.get_view(view_id)
+    except Http404 as exc:
+        raise ApiError("Saved view not found.", status=404) from exc
+
+
+def _api_limit(request) -> int:
+    raw = request.GET.get("limit", "")
+    if not raw:
+        return DEFAULT_LIMIT
+    if not raw.isdigit() or int(raw) < 1:
+        raise ApiError("limit must be a positive integer.")
+    return min(int(raw), MAX_LIMIT)
+
+
+def _list_request(request):
+    if not hasattr(request, "_api_record_query"):
+        saved_view = _api_saved_view(request)
+        request._api_saved_view = saved_view
+        request._api_record_query = build_record_query(
+            saved_view, request.GET.get("q", ""), facet_selection(request.GET)
+        )
+    return request._api_saved_view, request._api_record_query
+
+
+def record_list_etag(request):
+    try:
+        saved_view, record_query = _list_request(request)
+        limit = _api_limit(request)
+    except ApiError:
+        return None
+
+    state = record_query.queryset.order_by().aggregate(latest=Max("updated_at"), total=Count("id"))
+    return _make_etag(
+        "records",
+        saved_view.pk if saved_view else "",
+        saved_view.updated_at.isoformat() if saved_view else "",
+        record_query.query,
+        sorted(record_query.facets.items()),
+        request.GET.get("cursor", ""),
+        limit,
+        state["latest"].isoformat() if state["latest"] else "",
+        state["total"],
+    )
+
+
+def record_detail_etag(request, sample_code):
+    state = LabRecord.objects.filter(sample_code=sample_code).values_list("id", "updated_at").first()
+    if state is None:
+        return None
+    return _make_etag("record", sample_code, state[0], state[1].isoformat())
+
+
+def _page_url(request, cursor):
+    params = {key: value for key, value in request.GET.items() if key != "cursor"}
+    params["cursor"] = cursor
+    return request.build_absolute_uri(f"{reverse('api_record_list')}?{urlencode(params)}")
+
+
+@require_GET
+@replica_reads
+@api_login_required
+@condition(etag_func=record_list_etag)
+def record_list(request):
+    _, record_query = _list_request(request)
+    fields = API_FIELDS
+    if record_query.ordering.lstrip("-") == SEARCH_RANK:
+        fields = [*API_FIELDS, SEARCH_RANK]
+
+    queryset = record_query.queryset.values_list(*fields, named=True)
+    paginator = KeysetPaginator(queryset, record_query.ordering, per_page=_api_limit(request))
+    try:
+        page = paginator.page(request.GET.get("cursor"))
+    except InvalidCursor as exc:
+        # Unlike the explorer, clients are told rather than silently restarted.
+        raise ApiError("Invalid cursor.") from exc
+
+    return JsonResponse(
+        {
+            "results": [row._asdict() for row in page],
+            "next": _page_url(request, page.next_cursor) if page.has_next() else None,
+            "previous": _page_url(request, page.previous_cursor) if page.has_previous() else None,
+        }
+    )
+
+
+@require_GET
+@replica_reads
+@api_login_required
+@condition(etag_func=record_detail_etag)
+def record_detail(request, sample_code):
+    row = LabRecord.objects.filter(sample_code=sample_code).values(*API_FIELDS).first()
+    if row is None:
+        return JsonResponse({"detail": "Record not found."}, status=404)
+    return JsonResponse(row)
+
+
+def _json_body(request) -> dict:
+    try:
+        body = json.loads(request.body)
+    except ValueError as exc:
+        raise ApiError("Request body must be JSON.") from exc
+    if not isinstance(body, dict):
+        raise ApiError("Request body must be a JSON object.")
+    return body
+
+
+def _list_param(body, key) -> list:
+    values = body.get(key, [])
+    if not isinstance(values, list) or not all(isinstance(value, (str, int)) for value in values):
+        raise ApiError(f"{key} must be a list.")
+    return values
+
+
+@require_GET
+@replica_reads
+async def dashboard(request):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({"detail": "Authentication required."}, status=401)
+    management_mode = (await sync_to_async(get_user_context)(request)).is_management
+    return JsonResponse(await aget_dashboard_payload(include_management=management_mode))
+
+
+@require_POST
+@api_login_required
+def record_bulk_status(request):
+    body = _json_body(request)
+    ids = _list_param(body, "ids")
+    sample_codes = [str(value) for value in _list_param(body, "sample_codes")]
+    if not all(str(value).isdigit() for value in ids):
+        raise ApiError("ids must be integers.")
+    if not ids and not sample_codes:
+        raise ApiError("Provide ids or sample_codes.")
+
+    processed_at = body.get("processed_at")
+    if processed_at is not None:
+        try:
+            processed_at = date.fromisoformat(processed_at)
+        except (TypeError, ValueError) as exc:
+            raise ApiError("processed_at must be an ISO date (YYYY-MM-DD).") from exc
+
+    try:
+        result = transition_records(body.get("status"), processed_at, ids=ids, sample_codes=sample_codes)
+    except ValidationError as exc:
+        raise ApiError(" ".join(exc.messages)) from exc
+    return JsonResponse(result.as_dict())
+
+
+@require_POST
+@api_token_or_login_required
+def record_ingest(request):
+    content_type = request.content_type
+    if content_type in NDJSON_CONTENT_TYPES:
+        rows = read_ndjson_rows(request)
+    elif content_type == "application/json":
+        try:
+            rows = read_json_rows(request.body)
+        except ValueError as exc:
+            raise ApiError(f"Invalid JSON: {exc}") from exc
+    else:
+        raise ApiError("Send application/json or application/x-ndjson.", status=415)
+
+    created_by = request.user if request.user.is_authenticated else None
+    result = MetricsIngester(created_by=created_by).run(rows)
+    return JsonResponse(
+        {
+            "processed": result.processed,
+            "created": result.created,
+            "updated": result.updated,
+            "unchanged": result.unchanged,
+            "rejected": result.rejected,
+            "errors": [
+                {"line": error.line, "sample_code": error.sample_code, "errors": error.errors}
+                for error in result.errors[:MAX_REPORTED_ERRORS]
+            ],
+        }
+    )
+
+
+@require_POST
+@api_token_or_login_required
+def sample_codes(request):
+    # Reserves a block of codes up front, e.g. for a pipeline labelling a plate
+    # before its results exist. Unused codes are simply never filled in.
+    body = _json_body(request)
+    count, year = body.get("count", 1), body.get("year")
+    if isinstance(count, bool) or not isinstance(count, int) or not 1 <= count <= MAX_SAMPLE_CODE_BLOCK:
+        raise ApiError(f"count must be an integer from 1 to {MAX_SAMPLE_CODE_BLOCK}.")
+    if year is not None and (isinstance(year, bool) or not isinstance(year, int)):
+        raise ApiError("year must be an integer.")
+    prefix = body.get("prefix")
+    if prefix is not None and not isinstance(prefix, str):
+        raise ApiError("prefix must be a string.")
+
+    try:
+        codes = allocate_sample_codes(count, prefix, year)
+    except ValidationError as exc:
+        raise ApiError(" ".join(exc.messages)) from exc
+    return JsonResponse({"sample_codes": codes}, status=201)
+
+
+@require_GET
+@replica_reads
+@api_token_or_login_required
+def record_changes(request):
+    after = request.GET.get("after", "0")
+    limit = request.GET.get("limit", str(DEFAULT_CHANGES_LIMIT))
+    if not after.isdigit():
+        raise ApiError("after must be a non-negative integer.")
+    if not limit.isdigit() or int(limit) < 1:
+        raise ApiError("limit must be a positive integer.")
+
+    try:
+        page = changes_after(int(after), min(int(limit), MAX_CHANGES_LIMIT))
+    except CursorExpired as exc:
+        return JsonResponse({"detail": str(exc), "resume_after": exc.resume_after}, status=410)
+
+    params = {key: value for key, value in request.GET.items() if key != "after"}
+    params["after"] = page.cursor
+    return JsonResponse(
+        {
+            "results": page.results,
+            "cursor": page.cursor,
+            "has_more": page.has_more,
+            "next": request.build_absolute_uri(f"{reverse('api_record_changes')}?{urlencode(params)}"),
+        }
+    )
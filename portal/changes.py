@@ -0,0 +1,48 @@
+from dataclasses import dataclass
+
+from .models import ChangeLogState, LabRecordChange
+
+DEFAULT_CHANGES_LIMIT = 100
+MAX_CHANGES_LIMIT = 1000
+
+
+class CursorExpired(Exception):
+    def __init__(self, expired_through, resume_after):
+        super().__init__(f"Changes up to {expired_through} have been compacted; resync from the records endpoint.")
+        self.resume_after = resume_after
+
+
+@dataclass
+class ChangePage:
+    results: list
+    cursor: int
+    has_more: bool
+
+
+def serialize_change(change: LabRecordChange) -> dict:
+    return {
+        "sequence": change.sequence,
+        "action": change.action,
+        "record_id": change.record_id,
+        "sample_code": change.sample_code,
+        "changed_at": change.changed_at,
+        "data": change.data,
+    }
+
+
+def changes_after(after: int, limit: int = DEFAULT_CHANGES_LIMIT) -> ChangePage:
+    # Consumers store the returned cursor and pass it back as `after`. Once
+    # compaction has dropped deletions past their cursor they must take
+    # resume_after, resync from the records endpoint, then continue from it.
+    state = ChangeLogState.objects.filter(pk=1).values("last_sequence", "expired_through").first()
+    if state and after < state["expired_through"]:
+        raise CursorExpired(state["expired_through"], state["last_sequence"])
+
+    rows = list(LabRecordChange.objects.filter(sequence__gt=after).order_by("sequence")[: limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return ChangePage(
+        results=[serialize_change(row) for row in rows],
+        cursor=rows[-1].sequence if rows else after,
+        has_more=has_more,
+    )
@@ -0,0 +1,106 @@
+from dataclasses import dataclass
+
+from django.db.models import Case, CharField, F, Value, When
+from django.urls import reverse
+from django.utils.formats import localize
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import LabRecord, SavedView
+
+COLUMN_NAMES = [name for name, _ in SavedView.COLUMN_CHOICES]
+STATUS_DISPLAY = "status_display"
+
+
+def status_display_expression():
+    return Case(
+        *[When(status=value, then=Value(label)) for value, label in LabRecord.Status.choices],
+        default=F("status"),
+        output_field=CharField(),
+    )
+
+
+def project_records(queryset, columns, extra=()):
+    # Fetch only the rendered columns (plus id and any ordering keys) as named
+    # tuples instead of full model instances, so wide fields like notes stay
+    # in the database.
+    fields = ["id"]
+    for name in [*(c for c in COLUMN_NAMES if c in columns), *extra]:
+        if name not in fields:
+            fields.append(name)
+
+    annotations = {}
+    if "status" in columns:
+        annotations[STATUS_DISPLAY] = status_display_expression()
+
+    return queryset.annotate(**annotations).values_list(*fields, *annotations, named=True)
+
+
+def _text(value) -> str:
+    return escape(value)
+
+
+def _localized(value) -> str:
+    return escape(localize(value))
+
+
+def _optional(value) -> str:
+    return "-" if value is None else escape(localize(value))
+
+
+@dataclass(frozen=True)
+class ColumnRenderer:
+    header: str
+    attribute: str
+    format: object = _text
+
+
+# One entry per SavedView.COLUMN_CHOICES value; the explorer table is rendered
+# from these instead of re-testing every column in the template for each row.
+COLUMN_RENDERERS = {
+    "sample_code": ColumnRenderer("Sample", "sample_code"),
+    "project": ColumnRenderer("Project", "project"),
+    "submitter": ColumnRenderer("Submitter", "submitter"),
+    "status": ColumnRenderer("Status", STATUS_DISPLAY),
+    "received_at": ColumnRenderer("Received", "received_at", _localized),
+    "processed_at": ColumnRenderer("Processed", "processed_at", _optional),
+    "qc_score": ColumnRenderer("QC", "qc_score", _localized),
+    "read_count": ColumnRenderer("Reads", "read_count", _localized),
+}
+
+
+class RecordTable:
+    # Built once per request: resolves the visible columns and the edit URL
+    # pattern up front, then renders each row as one string join.
+
+    def __init__(self, columns, rows):
+        self.columns = [COLUMN_RENDERERS[name] for name in COLUMN_NAMES if name in columns]
+        self.rows = rows
+        edit_prefix, edit_suffix = reverse("record_edit", args=[0]).rsplit("0", 1)
+        self._edit_url = edit_prefix + "{}" + edit_suffix
+
+    @property
+    def header(self) -> str:
+        cells = "".join(f"<th>{column.header}</th>" for column in self.columns)
+        select_all = (
+            '<th><input type="checkbox" aria-label="Select all" '
+            "onclick=\"document.querySelectorAll('input[name=ids]').forEach((box) => { box.checked = this.checked; })\">"
+            "</th>"
+        )
+        return mark_safe(f"<tr>{select_all}{cells}<th>Actions</th></tr>")
+
+    @property
+    def body(self) -> str:
+        columns = [(column.attribute, column.format) for column in self.columns]
+        edit_url = self._edit_url
+        html = []
+        for row in self.rows:
+            cells = "".join(f"<td>{formatter(getattr(row, attribute))}</td>" for attribute, formatter in columns)
+            html.append(
+                f'<tr><td><input type="checkbox" name="ids" value="{row.id}" form="bulk-status-form" '
+                f'aria-label="Select {row.id}"></td>{cells}'
+                f'<td><a href="{edit_url.format(row.id)}" class="table-link">Edit</a></td></tr>'
+            )
+        if not html:
+            html.append(f'<tr><td colspan="{len(self.columns) + 2}">No records found.</td></tr>')
+        return mark_safe("".join(html))
@@ -0,0 +1,107 @@
+import json
+
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Sum
+from django.utils.functional import cached_property
+
+from .models import DailyRecordStats
+
+EXACT_COUNT_THRESHOLD = 10_000
+
+
+class RecordCount(int):
+    # An int, so paginators and admin changelists can do arithmetic with it,
+    # that renders as "about N" when it is an estimate.
+
+    def __new__(cls, value, exact=True, lower_bound=False):
+        count = super().__new__(cls, value)
+        count.exact = exact
+        count.lower_bound = lower_bound
+        return count
+
+    def __str__(self) -> str:
+        if self.exact:
+            return f"{int(self):,}"
+        if self.lower_bound:
+            return f"more than {int(self):,}"
+        return f"about {_round_estimate(int(self)):,}"
+
+
+def _round_estimate(value: int) -> int:
+    # Two significant figures: 123,456 -> 120,000.
+    digits = len(str(value))
+    if digits <= 2:
+        return value
+    scale = 10 ** (digits - 2)
+    return round(value / scale) * scale
+
+
+def rollup_count(rollup_filter: dict) -> RecordCount:
+    # DailyRecordStats is kept in step with LabRecord inside each write, so
+    # this is exact while only scanning the small bucket table.
+    total = DailyRecordStats.objects.filter(**rollup_filter).aggregate(total=Sum("record_count", default=0))
+    return RecordCount(total["total"])
+
+
+def estimate_count(queryset):
+    # Planner estimates on PostgreSQL; None where the backend has none (SQLite).
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    if not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        # reltuples is -1 until the table has been vacuumed or analyzed.
+        return row[0] if row and row[0] >= 0 else None
+    plan = json.loads(queryset.order_by().explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_records(queryset, rollup_filter=None, threshold: int = EXACT_COUNT_THRESHOLD) -> RecordCount:
+    if rollup_filter is not None:
+        return rollup_count(rollup_filter)
+
+    # Counting at most threshold + 1 ids keeps small results exact and caps the
+    # cost of large ones.
+    bounded = queryset.order_by().values("id")[: threshold + 1].count()
+    if bounded <= threshold:
+        return RecordCount(bounded)
+    estimate = estimate_count(queryset)
+    if estimate is None:
+        return RecordCount(threshold, exact=False, lower_bound=True)
+    return RecordCount(max(estimate, bounded), exact=False)
+
+
+class ApproximateCountPaginator(Paginator):
+    # An estimated count is for display only: page bounds stay open-ended, so
+    # pages past "more than 10,000" are still served until one comes back empty.
+
+    @cached_property
+    def count(self):
+        rollup_filter = {} if not self.object_list.query.where else None
+        return count_records(self.object_list, rollup_filter)
+
+    def validate_number(self, number):
+        if self.count.exact:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError) as exc:
+            raise PageNotAnInteger(self.error_messages["invalid_page"]) from exc
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        return number
+
+    def page(self, number):
+        if self.count.exact:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = self.object_list[bottom : bottom + self.per_page]
+        if number > 1 and not object_list:
+            raise EmptyPage(self.error_messages["no_results"])
+        return self._get_page(object_list, number, self)
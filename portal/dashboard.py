@@ -0,0 +1,127 @@
+import asyncio
+from datetime import datetime, time, timedelta
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+
+from .columns import project_records
+from .data_version import aget_data_version, cache_timeout, get_data_version
+from .models import LabRecord
+from .routers import current_read_alias
+from .stats import compute_dashboard_stats, rollup_totals, rollup_trend, stats_from_rollup_rows
+
+RECENT_COLUMNS = ["sample_code", "project", "status", "received_at", "qc_score"]
+MANAGEMENT_FIELDS = ("completion_rate", "overdue_count")
+
+
+def seconds_until_tomorrow(now=None) -> int:
+    now = timezone.localtime(now)
+    midnight = datetime.combine(now.date() + timedelta(days=1), time.min, tzinfo=now.tzinfo)
+    return max(int((midnight - now).total_seconds()), 1)
+
+
+def dashboard_cache_keys(version: str, today) -> tuple[str, str]:
+    return (
+        f"portal:dashboard:base:{version}:{today.isoformat()}",
+        f"portal:dashboard:management:{version}:{today.isoformat()}",
+    )
+
+
+def recent_records() -> list[dict]:
+    recent = project_records(LabRecord.objects.order_by("-received_at", "-id"), RECENT_COLUMNS)[:10]
+    return [row._asdict() for row in recent]
+
+
+def _assemble_payload(stats, recent) -> tuple[dict, dict]:
+    context = stats.as_context()
+    management = {name: context.pop(name) for name in MANAGEMENT_FIELDS}
+    base = {
+        **context,
+        "recent_records": recent,
+        "status_chart": stats.status_chart,
+        "trend_chart": stats.trend_chart,
+    }
+    return base, management
+
+
+def _cache_timeout() -> int:
+    # A lagging replica could cache pre-write numbers under the new data
+    # version, so payloads read from it expire quickly.
+    if current_read_alias():
+        return cache_timeout(min(settings.REPLICA_CACHE_TIMEOUT, seconds_until_tomorrow()))
+    return cache_timeout(seconds_until_tomorrow())
+
+
+def _select_payload(cached, base_key, management_key, include_management) -> dict:
+    payload = dict(cached[base_key])
+    if include_management:
+        payload.update(cached[management_key])
+    return payload
+
+
+def build_dashboard_payload(today=None) -> tuple[dict, dict]:
+    return _assemble_payload(compute_dashboard_stats(today=today), recent_records())
+
+
+def get_dashboard_payload(include_management: bool = False) -> dict:
+    # Cached under the global records data version (bumped after every commit
+    # that touches LabRecord) and today's date, so entries expire at rollover.
+    today = timezone.localdate()
+    base_key, management_key = dashboard_cache_keys(get_data_version(), today)
+    keys = [base_key, management_key] if include_management else [base_key]
+
+    cached = cache.get_many(keys)
+    if len(cached) != len(keys):
+        base, management = build_dashboard_payload(today=today)
+        cache.set_many({base_key: base, management_key: management}, timeout=_cache_timeout())
+        cached = {base_key: base, management_key: management}
+    return _select_payload(cached, base_key, management_key, include_management)
+
+
+def _with_own_connection(func):
+    @wraps(func)
+    def wrapper(*args):
+        try:
+            return func(*args)
+        finally:
+            # This worker thread's connection goes back to the pool.
+            connections.close_all()
+
+    return wrapper
+
+
+async def _run_query(func, *args):
+    # Django's async ORM runs every query on the one thread-sensitive executor,
+    # so gather() alone would still be serial. With a connection pool each query
+    # gets its own thread and connection instead.
+    if settings.DASHBOARD_PARALLEL_QUERIES:
+        return await sync_to_async(_with_own_connection(func), thread_sensitive=False)(*args)
+    return await sync_to_async(func)(*args)
+
+
+async def abuild_dashboard_payload(today) -> tuple[dict, dict]:
+    totals, trend, recent = await asyncio.gather(
+        _run_query(rollup_totals, today),
+        _run_query(rollup_trend, today),
+        _run_query(recent_records),
+    )
+    return _assemble_payload(stats_from_rollup_rows(totals, trend), recent)
+
+
+async def aget_dashboard_payload(include_management: bool = False, refresh: bool = False) -> dict:
+    # refresh=True rebuilds even on a hit, since the cached entry may have been
+    # built from a lagging replica; the rebuilt payload replaces it.
+    today = timezone.localdate()
+    base_key, management_key = dashboard_cache_keys(await aget_data_version(), today)
+    keys = [base_key, management_key] if include_management else [base_key]
+
+    cached = {} if refresh else await cache.aget_many(keys)
+    if len(cached) != len(keys):
+        base, management = await abuild_dashboard_payload(today)
+        await cache.aset_many({base_key: base, management_key: management}, timeout=_cache_timeout())
+        cached = {base_key: base, management_key: management}
+    return _select_payload(cached, base_key, management_key, include_management)
@@ -0,0 +1,41 @@
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+DATA_VERSION_KEY = "portal:records:data-version"
+
+
+def get_data_version() -> str:
+    version = cache.get(DATA_VERSION_KEY)
+    if version is None:
+        cache.add(DATA_VERSION_KEY, uuid4().hex, timeout=None)
+        version = cache.get(DATA_VERSION_KEY)
+    return version
+
+
+async def aget_data_version() -> str:
+    version = await cache.aget(DATA_VERSION_KEY)
+    if version is None:
+        await cache.aadd(DATA_VERSION_KEY, uuid4().hex, timeout=None)
+        version = await cache.aget(DATA_VERSION_KEY)
+    return version
+
+
+def bump_data_version() -> None:
+    # Random tokens rather than a counter: a cache that loses the key (eviction,
+    # restart, fresh database) can never resurrect an old version's entries.
+    cache.set(DATA_VERSION_KEY, uuid4().hex, timeout=None)
+
+
+def mark_records_changed(using=None) -> None:
+    transaction.on_commit(bump_data_version, using=using)
+
+
+def cache_timeout(timeout):
+    # A process-local cache never hears about writes made by other processes
+    # (workers, management commands), so its entries must expire quickly.
+    if settings.LOCAL_CACHE:
+        return settings.LOCAL_CACHE_TIMEOUT if timeout is None else min(timeout, settings.LOCAL_CACHE_TIMEOUT)
+    return timeout
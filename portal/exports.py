@@ -0,0 +1,112 @@
+import csv
+import importlib.util
+from itertools import islice
+
+from .columns import COLUMN_NAMES
+from .models import LabRecord
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+PARQUET_TYPES = {
+    "CharField": "string",
+    "DateField": "date32",
+    "PositiveSmallIntegerField": "int16",
+    "PositiveIntegerField": "int64",
+}
+
+
+def parquet_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def export_columns(record_query) -> list[str]:
+    return [name for name in COLUMN_NAMES if name in record_query.visible_columns]
+
+
+def export_rows(record_query, columns, chunk_size: int = EXPORT_CHUNK_SIZE):
+    queryset = record_query.queryset.order_by(*record_query.ordering_fields).values_list(*columns)
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def stream_export(record_query, export_format: str, chunk_size: int = EXPORT_CHUNK_SIZE):
+    columns = export_columns(record_query)
+    rows = export_rows(record_query, columns, chunk_size=chunk_size)
+    if export_format == "parquet":
+        return _iter_parquet(rows, columns, chunk_size)
+    return _iter_csv(rows, columns, chunk_size)
+
+
+def _batched(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def _iter_csv(rows, columns, chunk_size):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for batch in _batched(rows, chunk_size):
+        yield "".join(writer.writerow(row) for row in batch)
+
+
+class _StreamSink:
+    # Minimal write-only file object so ParquetWriter output can be drained
+    # after every row group instead of buffering the whole file.
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _iter_parquet(rows, columns, chunk_size):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [
+            (name, getattr(pa, PARQUET_TYPES[LabRecord._meta.get_field(name).get_internal_type()])())
+            for name in columns
+        ]
+    )
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in _batched(rows, chunk_size):
+            arrays = [pa.array(values, type=schema.field(name).type) for name, values in zip(columns, zip(*batch))]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
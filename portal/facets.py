@@ -0,0 +1,155 @@
+import hashlib
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Case, CharField, Q, Value, When
+
+from .data_version import cache_timeout, get_data_version
+from .models import LOW_QC_THRESHOLD, LabRecord
+from .routers import current_read_alias
+
+HIGH_QC_THRESHOLD = 90
+QC_BANDS = {
+    "low": ("Below 70", Q(qc_score__lt=LOW_QC_THRESHOLD)),
+    "medium": ("70 to 89", Q(qc_score__gte=LOW_QC_THRESHOLD, qc_score__lt=HIGH_QC_THRESHOLD)),
+    "high": ("90 and above", Q(qc_score__gte=HIGH_QC_THRESHOLD)),
+}
+FACET_FIELDS = {"status": "Status", "project": "Project", "qc_band": "QC band"}
+PROJECT_FACET_LIMIT = 15
+FACET_CACHE_TIMEOUT = 60 * 60
+
+
+@dataclass(frozen=True)
+class FacetOption:
+    value: str
+    label: str
+    count: int
+    selected: bool
+    url: str
+
+
+@dataclass(frozen=True)
+class Facet:
+    name: str
+    label: str
+    options: list[FacetOption]
+
+
+def facet_selection(params) -> dict:
+    # Invalid values are ignored rather than rejected, like the other
+    # explorer query parameters.
+    selection = {}
+    status = params.get("status", "")
+    if status in LabRecord.Status.values:
+        selection["status"] = status
+    project = params.get("project", "").strip()
+    if project and len(project) <= LabRecord._meta.get_field("project").max_length:
+        selection["project"] = project
+    qc_band = params.get("qc_band", "")
+    if qc_band in QC_BANDS:
+        selection["qc_band"] = qc_band
+    return selection
+
+
+def apply_facets(queryset, selection: dict):
+    if "status" in selection:
+        queryset = queryset.filter(status=selection["status"])
+    if "project" in selection:
+        queryset = queryset.filter(project=selection["project"])
+    if "qc_band" in selection:
+        queryset = queryset.filter(QC_BANDS[selection["qc_band"]][1])
+    return queryset
+
+
+def _qc_band_expression():
+    whens = [When(condition, then=Value(band)) for band, (_, condition) in QC_BANDS.items()]
+    return Case(*whens, output_field=CharField())
+
+
+def _facet_rows(queryset) -> list[tuple[str, str, int]]:
+    # (facet, value, count) for all three facets in one statement. PostgreSQL
+    # groups the filtered rows once with GROUPING SETS; elsewhere the same
+    # subquery is grouped three times and glued with UNION ALL.
+    inner = queryset.order_by().annotate(qc_band=_qc_band_expression()).values("status", "project", "qc_band")
+    sql, params = inner.query.sql_with_params()
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        statement = (
+            "SELECT CASE WHEN GROUPING(status) = 0 THEN 'status' "
+            "WHEN GROUPING(project) = 0 THEN 'project' ELSE 'qc_band' END, "
+            f"COALESCE(status, project, qc_band), COUNT(*) FROM ({sql}) facets "
+            "GROUP BY GROUPING SETS ((status), (project), (qc_band))"
+        )
+    else:
+        statement = " UNION ALL ".join(
+            f"SELECT '{name}', {name}, COUNT(*) FROM ({sql}) facets GROUP BY {name}" for name in FACET_FIELDS
+        )
+        params = params * len(FACET_FIELDS)
+    with connection.cursor() as cursor:
+        cursor.execute(statement, params)
+        return cursor.fetchall()
+
+
+def _facet_cache_key(queryset) -> str:
+    sql, params = queryset.order_by().query.sql_with_params()
+    digest = hashlib.md5(f"{sql}|{params!r}".encode(), usedforsecurity=False).hexdigest()
+    return f"portal:facets:{get_data_version()}:{digest}"
+
+
+def facet_counts(queryset) -> dict[str, dict[str, int]]:
+    # Keyed by the filtered query and the records data version, so paging
+    # reuses the counts and any write invalidates them.
+    key = _facet_cache_key(queryset)
+    counts = cache.get(key)
+    if counts is None:
+        counts = {name: {} for name in FACET_FIELDS}
+        for name, value, count in _facet_rows(queryset):
+            counts[name][value] = count
+        timeout = settings.REPLICA_CACHE_TIMEOUT if current_read_alias() else FACET_CACHE_TIMEOUT
+        cache.set(key, counts, timeout=cache_timeout(timeout))
+    return counts
+
+
+def _toggle_url(params, name, value, selected) -> str:
+    # Selecting a facet replaces any earlier value for it; clicking the
+    # selected one removes it. Either way paging restarts.
+    params = params.copy()
+    for key in ("cursor", "page", name):
+        params.pop(key, None)
+    if not selected:
+        params[name] = value
+    return f"?{params.urlencode()}"
+
+
+def build_facets(queryset, selection: dict, params) -> list[Facet]:
+    counts = facet_counts(queryset)
+    status_labels = dict(LabRecord.Status.choices)
+    projects = [value for value, _ in sorted(counts["project"].items(), key=lambda item: (-item[1], item[0]))]
+    projects = projects[:PROJECT_FACET_LIMIT]
+    if selection.get("project") and selection["project"] not in projects:
+        projects.append(selection["project"])
+    choices = {
+        "status": [(value, status_labels[value]) for value in LabRecord.Status.values],
+        "project": [(value, value) for value in projects],
+        "qc_band": [(value, label) for value, (label, _) in QC_BANDS.items()],
+    }
+    return [
+        Facet(
+            name,
+            label,
+            [
+                FacetOption(
+                    value,
+                    option_label,
+                    counts[name].get(value, 0),
+                    selection.get(name) == value,
+                    _toggle_url(params, name, value, selection.get(name) == value),
+                )
+                for value, option_label in choices[name]
+                if counts[name].get(value) or selection.get(name) == value
+            ],
+        )
+        for name, label in FACET_FIELDS.items()
+    ]
@@ -1,6 +1,10 @@
 from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
 
 from .models import LabRecord, SavedView
+from .sample_codes import PREFIX_RE, allocate_sample_codes
+from .view_filters import validate_filters
 
 
 class DateInput(forms.DateInput):
@@ -8,6 +12,14 @@ class DateInput(forms.DateInput):
 
 
 class LabRecordForm(forms.ModelForm):
+    code_prefix = forms.CharField(
+        required=False,
+        max_length=6,
+        label="Code prefix",
+        help_text="Leave the sample code blank to assign the next PREFIX-YYYY-NNNN for the received year.",
+    )
+    field_order = ["sample_code", "code_prefix"]
+
     class Meta:
         model = LabRecord
         fields = [
@@ -29,17 +41,69 @@ class LabRecordForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            del self.fields["code_prefix"]
+        else:
+            self.fields["sample_code"].required = False
+            self.fields["code_prefix"].initial = settings.SAMPLE_CODE_PREFIX
         for field in self.fields.values():
             css = field.widget.attrs.get("class", "")
             field.widget.attrs["class"] = (css + " form-input").strip()
 
+    def clean_code_prefix(self):
+        prefix = self.cleaned_data["code_prefix"].strip().upper()
+        if prefix and not PREFIX_RE.match(prefix):
+            raise ValidationError("Use 2 to 6 letters, like LAB.")
+        return prefix
+
+    def save(self, commit=True):
+        # Allocated only after model validation passed, so rejected forms do not
+        # burn numbers.
+        if "code_prefix" in self.fields and not self.instance.sample_code:
+            [self.instance.sample_code] = allocate_sample_codes(
+                1, self.cleaned_data["code_prefix"], self.instance.received_at.year
+            )
+        return super().save(commit)
+
+
+def _split_names(value) -> list[str]:
+    return [name.strip() for name in value.replace("\n", ",").split(",") if name.strip()]
+
 
 class SavedViewForm(forms.ModelForm):
+    # Form field -> (SavedView.filters key, bound). Sets use bound None.
+    FILTER_FIELDS = {
+        "received_from": ("received_at", "from"),
+        "received_to": ("received_at", "to"),
+        "processed_from": ("processed_at", "from"),
+        "processed_to": ("processed_at", "to"),
+        "projects": ("projects", None),
+        "submitters": ("submitters", None),
+        "min_read_count": ("read_count", "min"),
+        "max_read_count": ("read_count", "max"),
+        "min_turnaround_days": ("turnaround_days", "min"),
+        "max_turnaround_days": ("turnaround_days", "max"),
+    }
+
     visible_columns = forms.MultipleChoiceField(
         choices=SavedView.COLUMN_CHOICES,
         widget=forms.CheckboxSelectMultiple,
         required=True,
     )
+    received_from = forms.DateField(required=False, label="Received from", widget=DateInput())
+    received_to = forms.DateField(required=False, label="Received to", widget=DateInput())
+    processed_from = forms.DateField(required=False, label="Processed from", widget=DateInput())
+    processed_to = forms.DateField(required=False, label="Processed to", widget=DateInput())
+    projects = forms.CharField(
+        required=False, help_text="Comma or line separated.", widget=forms.Textarea(attrs={"rows": 2})
+    )
+    submitters = forms.CharField(
+        required=False, help_text="Comma or line separated.", widget=forms.Textarea(attrs={"rows": 2})
+    )
+    min_read_count = forms.IntegerField(required=False, min_value=0, label="Min read count")
+    max_read_count = forms.IntegerField(required=False, min_value=0, label="Max read count")
+    min_turnaround_days = forms.IntegerField(required=False, min_value=0, label="Min turnaround (days)")
+    max_turnaround_days = forms.IntegerField(required=False, min_value=0, label="Max turnaround (days)")
 
     class Meta:
         model = SavedView
@@ -50,6 +114,12 @@ class SavedViewForm(forms.ModelForm):
 
         if self.instance and self.instance.pk:
             self.fields["visible_columns"].initial = self.instance.visible_columns
+            filters = self.instance.filters or {}
+            for name, (key, bound) in self.FILTER_FIELDS.items():
+                if bound is None:
+                    self.fields[name].initial = ", ".join(filters.get(key, []))
+                else:
+                    self.fields[name].initial = filters.get(key, {}).get(bound)
 
         for name, field in self.fields.items():
             if name == "visible_columns":
@@ -57,12 +127,46 @@ class SavedViewForm(forms.ModelForm):
             css = field.widget.attrs.get("class", "")
             field.widget.attrs["class"] = (css + " form-input").strip()
 
+    @property
+    def filter_fields(self):
+        return [self[name] for name in self.FILTER_FIELDS]
+
     def clean_visible_columns(self):
         return list(self.cleaned_data["visible_columns"])
 
+    def clean(self):
+        cleaned_data = super().clean()
+        filters = {}
+        for name, (key, bound) in self.FILTER_FIELDS.items():
+            value = cleaned_data.get(name)
+            if bound is None:
+                value = _split_names(value or "")
+                if value:
+                    filters[key] = value
+            elif value is not None:
+                filters.setdefault(key, {})[bound] = value.isoformat() if hasattr(value, "isoformat") else value
+
+        errors = validate_filters(filters)
+        if not errors:
+            self.instance.filters = filters
+        for name, (key, _) in self.FILTER_FIELDS.items():
+            if key in errors and not self.has_error(name):
+                self.add_error(name, errors.pop(key))
+        return cleaned_data
+
     def save(self, commit=True):
         instance = super().save(commit=False)
         instance.visible_columns = self.cleaned_data["visible_columns"]
         if commit:
             instance.save()
         return instance
+
+
+class BulkStatusForm(forms.Form):
+    status = forms.ChoiceField(choices=LabRecord.Status.choices)
+    processed_at = forms.DateField(required=False, widget=DateInput())
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field in self.fields.values():
+            field.widget.attrs["class"] = "form-input"
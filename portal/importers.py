@@ -0,0 +1,223 @@
+import csv
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .data_version import mark_records_changed
+from .models import DailyRecordStats, LabRecord, LabRecordChange
+from .sample_codes import allocate_sample_codes
+
+IMPORT_FIELDS = [
+    "sample_code",
+    "submitter",
+    "project",
+    "received_at",
+    "processed_at",
+    "status",
+    "qc_score",
+    "read_count",
+    "notes",
+]
+UPDATE_FIELDS = [name for name in IMPORT_FIELDS if name != "sample_code"] + ["updated_at"]
+
+
+@dataclass
+class RowError:
+    line: int
+    sample_code: str
+    errors: dict[str, list[str]]
+
+
+@dataclass
+class ImportResult:
+    processed: int = 0
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    errors: list[RowError] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rejected(self) -> int:
+        return len(self.errors)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+
+def read_sheet(handle, delimiter=","):
+    # Returns (import columns in the header, rows) with header names normalised.
+    reader = csv.DictReader(handle, delimiter=delimiter)
+    if reader.fieldnames:
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    columns = [name for name in reader.fieldnames or () if name in IMPORT_FIELDS]
+    return columns, _read_rows(reader)
+
+
+def _read_rows(reader):
+    # Yields (line number, {field: value}); blank cells are dropped so model
+    # defaults and NULLs apply.
+    for row in reader:
+        values = {}
+        for name, value in row.items():
+            if name in IMPORT_FIELDS and value is not None and value.strip() != "":
+                values[name] = value.strip()
+        yield reader.line_num, values
+
+
+class RecordImporter:
+    def __init__(
+        self,
+        batch_size: int = 1000,
+        update_existing: bool = False,
+        dry_run: bool = False,
+        created_by=None,
+        code_prefix=None,
+    ):
+        self.batch_size = batch_size
+        self.update_existing = update_existing
+        self.dry_run = dry_run
+        self.created_by = created_by
+        self.code_prefix = code_prefix
+        self._seen_codes = set()
+
+    def run(self, rows, columns=None) -> ImportResult:
+        # columns is the sheet's header. Existing records only take those
+        # columns on --update-existing; the rest keep their stored values
+        # rather than falling back to model defaults.
+        self._kept_fields = [name for name in IMPORT_FIELDS if columns is not None and name not in columns]
+        self._update_fields = [name for name in UPDATE_FIELDS if name not in self._kept_fields]
+        result = ImportResult()
+        started = time.perf_counter()
+        rows = iter(rows)
+        while batch := list(islice(rows, self.batch_size)):
+            self._import_batch(batch, result)
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    def _import_batch(self, batch, result: ImportResult) -> None:
+        result.processed += len(batch)
+        existing = {
+            row["sample_code"]: row
+            for row in LabRecord.objects.filter(
+                sample_code__in=[values["sample_code"] for _, values in batch if values.get("sample_code")]
+            ).values(*IMPORT_FIELDS)
+        }
+        candidates = []
+        unassigned = []
+        for line, values in batch:
+            stored = existing.get(values.get("sample_code")) if self.update_existing else None
+            if stored is not None:
+                values = {**{name: stored[name] for name in self._kept_fields}, **values}
+            record = LabRecord(**values, created_by=self.created_by)
+            try:
+                record.full_clean(
+                    exclude=[] if record.sample_code else ["sample_code"],
+                    validate_unique=False,
+                    validate_constraints=False,
+                )
+            except ValidationError as exc:
+                result.errors.append(RowError(line, values.get("sample_code", ""), exc.message_dict))
+                continue
+
+            if not record.sample_code:
+                unassigned.append((line, record))
+                continue
+
+            if record.sample_code in self._seen_codes:
+                result.errors.append(
+                    RowError(line, record.sample_code, {"sample_code": ["Duplicate sample code in this file."]})
+                )
+                continue
+            self._seen_codes.add(record.sample_code)
+            candidates.append((line, record))
+
+        if unassigned and not self.dry_run:
+            self._assign_codes([record for _, record in unassigned])
+
+        if not self.update_existing:
+            for line, record in candidates:
+                if record.sample_code in existing:
+                    result.errors.append(
+                        RowError(line, record.sample_code, {"sample_code": ["A record with this sample code exists."]})
+                    )
+            candidates = [(line, record) for line, record in candidates if record.sample_code not in existing]
+        else:
+            # Identical rows are counted and skipped, so re-running a sheet writes nothing.
+            changed = [
+                (line, record)
+                for line, record in candidates
+                if {name: getattr(record, name) for name in IMPORT_FIELDS} != existing.get(record.sample_code)
+            ]
+            result.unchanged += len(candidates) - len(changed)
+            candidates = changed
+
+        rows = candidates + unassigned
+        if rows and not self.dry_run:
+            rows = self._write_batch(rows, existing, result)
+        updated = sum(1 for _, record in rows if record.sample_code in existing)
+        result.created += len(rows) - updated
+        result.updated += updated
+
+    def _assign_codes(self, records) -> None:
+        # Rows without a sample code get one block per received year per batch.
+        by_year = defaultdict(list)
+        for record in records:
+            by_year[record.received_at.year].append(record)
+        for year, group in by_year.items():
+            codes = allocate_sample_codes(len(group), self.code_prefix, year, reserved=self._seen_codes)
+            for record, sample_code in zip(group, codes):
+                record.sample_code = sample_code
+
+    def _write_batch(self, rows, existing, result: ImportResult) -> list:
+        # A row that conflicts in the database (e.g. a sample code inserted
+        # concurrently) fails the whole batch; retry it row by row so only the
+        # conflicting rows are rejected. Returns the rows written.
+        try:
+            self._write([record for _, record in rows], existing)
+            return rows
+        except IntegrityError:
+            pass
+
+        written = []
+        for line, record in rows:
+            # Earlier sub-batches of the failed insert may have set a pk.
+            record.pk = None
+            try:
+                self._write([record], existing)
+            except IntegrityError as exc:
+                errors = {"__all__": [f"Database rejected the row: {exc}"]}
+                result.errors.append(RowError(line, record.sample_code, errors))
+            else:
+                written.append((line, record))
+        return written
+
+    def _write(self, records, existing) -> None:
+        updated_codes = [record.sample_code for record in records if record.sample_code in existing]
+        with transaction.atomic():
+            if self.update_existing:
+                LabRecord.objects.bulk_create(
+                    records,
+                    update_conflicts=True,
+                    unique_fields=["sample_code"],
+                    update_fields=self._update_fields,
+                )
+            else:
+                LabRecord.objects.bulk_create(records)
+            written = LabRecord.objects.filter(sample_code__in=[record.sample_code for record in records])
+            if updated_codes:
+                LabRecordChange.log_records(
+                    written.filter(sample_code__in=updated_codes), LabRecordChange.Action.UPDATED
+                )
+                written = written.exclude(sample_code__in=updated_codes)
+            LabRecordChange.log_records(written, LabRecordChange.Action.CREATED)
+            DailyRecordStats.apply_deltas(
+                removed=[existing[code] for code in updated_codes],
+                added=[{name: getattr(record, name) for name in DailyRecordStats.SOURCE_FIELDS} for record in records],
+            )
+            mark_records_changed()
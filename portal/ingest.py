@@ -0,0 +1,184 @@
+import json
+import time
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .data_version import mark_records_changed
+from .importers import IMPORT_FIELDS, ImportResult, RowError
+from .models import DailyRecordStats, LabRecord, LabRecordChange
+
+INGEST_CHUNK_SIZE = 1000
+METRIC_FIELDS = ["read_count", "qc_score"]
+NOT_FOUND = "Record not found; send the full record (submitter, project, received_at, ...) to create it."
+NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+
+
+def read_json_rows(body):
+    # A JSON array, or an object with a "records" array, read in one go. Not a
+    # generator, so a malformed body raises ValueError here rather than partway
+    # through the ingest.
+    data = json.loads(body)
+    if isinstance(data, dict):
+        data = data.get("records")
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array or {"records": [...]}.')
+    return enumerate(data, start=1)
+
+
+def read_ndjson_rows(stream):
+    # One object per line, consumed straight from the request stream so large
+    # runs never sit in memory as a whole.
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, None
+
+
+class MetricsIngester:
+    # Applies pipeline results keyed by sample_code. Existing records only take
+    # read_count/qc_score; unknown codes are created when the row carries the
+    # full record. Unchanged rows are skipped, so retrying a run is a no-op.
+
+    def __init__(self, chunk_size: int = INGEST_CHUNK_SIZE, created_by=None):
+        self.chunk_size = chunk_size
+        self.created_by = created_by
+        self._seen_codes = set()
+
+    def run(self, rows) -> ImportResult:
+        result = ImportResult()
+        started = time.perf_counter()
+        rows = iter(rows)
+        while chunk := list(islice(rows, self.chunk_size)):
+            self._ingest_chunk(chunk, result)
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    def _parse(self, line, values, result):
+        if not isinstance(values, dict):
+            result.errors.append(RowError(line, "", {"__all__": ["Each row must be a JSON object."]}))
+            return None
+        sample_code = values.get("sample_code")
+        if not isinstance(sample_code, str) or not sample_code:
+            result.errors.append(RowError(line, "", {"sample_code": ["This field is required."]}))
+            return None
+        unknown = set(values) - set(IMPORT_FIELDS)
+        if unknown:
+            message = f"Unknown fields: {', '.join(sorted(unknown))}"
+            result.errors.append(RowError(line, sample_code, {"__all__": [message]}))
+            return None
+        errors = self._check_types(values)
+        if errors:
+            result.errors.append(RowError(line, sample_code, errors))
+            return None
+        if sample_code in self._seen_codes:
+            result.errors.append(RowError(line, sample_code, {"sample_code": ["Duplicate sample code in this run."]}))
+            return None
+        self._seen_codes.add(sample_code)
+        return sample_code
+
+    def _check_types(self, values) -> dict:
+        # JSON can carry any type; only strings (and numbers for the metrics)
+        # reach the model, so a wrong type is a row error rather than a
+        # TypeError or an IntegrityError that sinks the whole chunk.
+        errors = {}
+        for name, value in values.items():
+            if value is None:
+                field = LabRecord._meta.get_field(name)
+                if field.blank and not field.null and field.empty_strings_allowed:
+                    values[name] = ""
+                continue
+            if name in METRIC_FIELDS:
+                if isinstance(value, bool) or not isinstance(value, (int, str)):
+                    errors[name] = ["Expected a whole number."]
+            elif not isinstance(value, str):
+                errors[name] = ["Expected a string."]
+        return errors
+
+    def _ingest_chunk(self, chunk, result: ImportResult) -> None:
+        result.processed += len(chunk)
+        parsed = []
+        for line, values in chunk:
+            sample_code = self._parse(line, values, result)
+            if sample_code is not None:
+                parsed.append((line, sample_code, values))
+
+        with transaction.atomic():
+            existing = LabRecord.objects.select_for_update().in_bulk(
+                [sample_code for _, sample_code, _ in parsed], field_name="sample_code"
+            )
+            now = timezone.now()
+            changed, created, previous = [], [], []
+            for line, sample_code, values in parsed:
+                record = existing.get(sample_code)
+                before = {name: getattr(record, name) for name in DailyRecordStats.SOURCE_FIELDS} if record else None
+                try:
+                    if record is None and set(values) <= {"sample_code", *METRIC_FIELDS}:
+                        raise ValidationError({"sample_code": [NOT_FOUND]})
+                    if record is None:
+                        new_record = LabRecord(**values, created_by=self.created_by)
+                        new_record.full_clean(validate_unique=False, validate_constraints=False)
+                        created.append(new_record)
+                    elif self._apply_metrics(record, values, now):
+                        changed.append(record)
+                        previous.append(before)
+                    else:
+                        result.unchanged += 1
+                except ValidationError as exc:
+                    result.errors.append(RowError(line, sample_code, exc.message_dict))
+                except TypeError as exc:
+                    result.errors.append(RowError(line, sample_code, {"__all__": [str(exc)]}))
+
+            if changed:
+                LabRecord.objects.bulk_update(changed, [*METRIC_FIELDS, "updated_at"], batch_size=500)
+                LabRecordChange.log_records(
+                    LabRecord.objects.filter(id__in=[record.pk for record in changed]), LabRecordChange.Action.UPDATED
+                )
+            if created:
+                LabRecord.objects.bulk_create(
+                    created,
+                    update_conflicts=True,
+                    unique_fields=["sample_code"],
+                    update_fields=[*METRIC_FIELDS, "updated_at"],
+                )
+                LabRecordChange.log_records(
+                    LabRecord.objects.filter(sample_code__in=[record.sample_code for record in created]),
+                    LabRecordChange.Action.CREATED,
+                )
+            if changed or created:
+                DailyRecordStats.apply_deltas(
+                    removed=previous,
+                    added=[
+                        {name: getattr(record, name) for name in DailyRecordStats.SOURCE_FIELDS}
+                        for record in [*changed, *created]
+                    ],
+                )
+                mark_records_changed()
+        result.updated += len(changed)
+        result.created += len(created)
+
+    def _apply_metrics(self, record, values, now) -> bool:
+        updates = {}
+        errors = {}
+        for name in METRIC_FIELDS:
+            if name not in values:
+                continue
+            try:
+                updates[name] = LabRecord._meta.get_field(name).clean(values[name], record)
+            except ValidationError as exc:
+                errors[name] = exc.messages
+        if errors:
+            raise ValidationError(errors)
+        if not updates:
+            raise ValidationError({"__all__": [f"Provide at least one of: {', '.join(METRIC_FIELDS)}."]})
+        if all(getattr(record, name) == value for name, value in updates.items()):
+            return False
+        for name, value in updates.items():
+            setattr(record, name, value)
+        record.updated_at = now
+        return True
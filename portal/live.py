@@ -0,0 +1,122 @@
+import asyncio
+import contextvars
+import json
+import logging
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .dashboard import MANAGEMENT_FIELDS, aget_dashboard_payload
+from .data_version import aget_data_version
+
+logger = logging.getLogger(__name__)
+
+STAT_FIELDS = ("total_records", "completed_count", "pending_count", "failed_count", "avg_qc", "low_qc_count")
+CHART_FIELDS = ("status_chart", "trend_chart")
+LIVE_FIELDS = (*STAT_FIELDS, *MANAGEMENT_FIELDS, *CHART_FIELDS)
+
+
+def sse_event(event: str, data, event_id=None) -> str:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, cls=DjangoJSONEncoder)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def payload_delta(previous: dict, current: dict) -> dict:
+    return {name: value for name, value in current.items() if previous.get(name, object()) != value}
+
+
+class DashboardBroadcaster:
+    # One per process and event loop. A single producer task watches the
+    # records data version (a cache read) and only rebuilds the payload when it
+    # or the date changes; every connected client waits on the same condition
+    # and works out its own delta, so a slow client just skips to the latest.
+
+    def __init__(self):
+        self.payload = None
+        self.revision = 0
+        self._key = None
+        self._subscribers = 0
+        self._task = None
+        self._changed = asyncio.Condition()
+
+    async def _refresh(self) -> None:
+        key = (await aget_data_version(), timezone.localdate())
+        if key == self._key:
+            return
+        # The key is memoized, so the payload it stands for must not come from
+        # a lagging replica or a cache entry built from one: read the primary.
+        payload = await aget_dashboard_payload(include_management=True, refresh=True)
+        self._key = key
+        self.payload = {name: payload[name] for name in LIVE_FIELDS}
+        self.revision += 1
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def _produce(self) -> None:
+        while self._subscribers:
+            try:
+                await self._refresh()
+            except Exception:
+                logger.exception("Live dashboard refresh failed")
+            await asyncio.sleep(settings.LIVE_DASHBOARD_POLL_SECONDS)
+
+    def _subscribe(self) -> None:
+        self._subscribers += 1
+        if self._task is None or self._task.done():
+            # The producer is shared and outlives the request that started it,
+            # so it runs in a fresh context: no request metrics or profiling
+            # observers, and no replica routing from the request.
+            self._task = asyncio.get_running_loop().create_task(self._produce(), context=contextvars.Context())
+
+    def _unsubscribe(self) -> None:
+        self._subscribers -= 1
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self._key = None
+
+    async def _wait_for_revision(self, seen: int) -> None:
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.revision != seen)
+
+    async def stream(self, include_management: bool = False):
+        # First event is the full state ("snapshot"), then only changed fields
+        # ("delta"); comment lines keep idle proxies from closing the stream.
+        fields = [name for name in LIVE_FIELDS if include_management or name not in MANAGEMENT_FIELDS]
+        sent = None
+        seen = 0
+        self._subscribe()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wait_for_revision(seen), settings.LIVE_DASHBOARD_KEEPALIVE_SECONDS)
+                except TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                seen = self.revision
+                current = {name: self.payload[name] for name in fields}
+                if sent is None:
+                    yield sse_event("snapshot", current, seen)
+                elif delta := payload_delta(sent, current):
+                    yield sse_event("delta", delta, seen)
+                sent = current
+        finally:
+            self._unsubscribe()
+
+
+_broadcasters = {}
+
+
+def get_broadcaster() -> DashboardBroadcaster:
+    loop = asyncio.get_running_loop()
+    broadcaster = _broadcasters.get(loop)
+    if broadcaster is None:
+        # Drop broadcasters left behind by closed loops (tests, reloads).
+        for stale in [key for key in _broadcasters if key.is_closed()]:
+            del _broadcasters[stale]
+        broadcaster = _broadcasters[loop] = DashboardBroadcaster()
+    return broadcaster
@@ -0,0 +1,204 @@
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+import django
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from portal.columns import project_records
+from portal.data_version import bump_data_version
+from portal.models import LabRecord, SavedView
+from portal.pagination import KeysetPaginator
+from portal.queries import build_record_query
+from portal.views import RECORDS_PER_PAGE
+
+BENCHMARK_VIEW_PREFIX = "benchmark: "
+
+
+class Command(BaseCommand):
+    help = "Time the portal's hot paths (dashboard, record explorer, deep pages, search) and write JSON results."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", required=True, help="Existing username to run the requests as.")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per scenario.")
+        parser.add_argument("--deep-pages", type=int, default=20, help="Pages to follow for the deep page scenario.")
+        parser.add_argument("--search", action="append", default=None, help="Search term to benchmark (repeatable).")
+        parser.add_argument("--output", "-o", help="Write JSON results here (defaults to stdout).")
+        parser.add_argument("--compare", help="Previous JSON results to print deltas against.")
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1.")
+        try:
+            self.user = get_user_model().objects.get(username=options["user"])
+        except get_user_model().DoesNotExist as exc:
+            raise CommandError(f"Unknown user: {options['user']}") from exc
+
+        host = next((h for h in settings.ALLOWED_HOSTS if h not in {"*", ""} and not h.startswith(".")), "localhost")
+        self.client = Client(HTTP_HOST=host)
+        self.client.force_login(self.user)
+        # The same requests through Django's ASGI handler, for the async views.
+        self.async_client = AsyncClient(HTTP_HOST=host)
+        async_to_sync(self.async_client.aforce_login)(self.user)
+        self.repeat = options["repeat"]
+
+        views = self._benchmark_views()
+        try:
+            results = list(self._run(views, options))
+        finally:
+            SavedView.objects.filter(pk__in=[view.pk for view in views.values()]).delete()
+
+        report = {
+            "meta": {
+                "timestamp": timezone.now().isoformat(),
+                "database": connection.vendor,
+                "record_count": LabRecord.objects.count(),
+                "django": django.get_version(),
+                "python": platform.python_version(),
+                "repeat": self.repeat,
+                "parallel_dashboard_queries": settings.DASHBOARD_PARALLEL_QUERIES,
+            },
+            "results": results,
+        }
+
+        payload = json.dumps(report, indent=2)
+        if options["output"]:
+            Path(options["output"]).write_text(payload + "\n")
+            self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        else:
+            self.stdout.write(payload)
+
+        if options["compare"]:
+            self._compare(json.loads(Path(options["compare"]).read_text()), report)
+
+    def _benchmark_views(self):
+        views = {}
+        for ordering, _ in SavedView.ORDERING_CHOICES:
+            views[ordering], _ = SavedView.objects.update_or_create(
+                user=self.user,
+                name=f"{BENCHMARK_VIEW_PREFIX}{ordering}",
+                defaults={
+                    "visible_columns": [name for name, _ in SavedView.COLUMN_CHOICES],
+                    "ordering": ordering,
+                    "is_default": False,
+                },
+            )
+        return views
+
+    def _run(self, views, options):
+        url = reverse("record_list")
+
+        yield self._measure("dashboard (cold cache)", lambda: self._get(reverse("dashboard")), before=bump_data_version)
+        yield self._measure("dashboard (warm cache)", lambda: self._get(reverse("dashboard")))
+        yield self._measure(
+            "dashboard async via ASGI (cold cache)",
+            lambda: self._aget(reverse("dashboard_async")),
+            before=bump_data_version,
+        )
+        yield self._measure("dashboard async via ASGI (warm cache)", lambda: self._aget(reverse("dashboard_async")))
+        yield self._measure(
+            "dashboard JSON via WSGI (cold cache)", lambda: self._get(reverse("api_dashboard")), before=bump_data_version
+        )
+        yield self._measure(
+            "dashboard JSON via ASGI (cold cache)", lambda: self._aget(reverse("api_dashboard")), before=bump_data_version
+        )
+
+        for ordering, view in views.items():
+            yield self._measure(f"record_list ordering={ordering}", lambda v=view: self._get(url, {"view": v.pk}))
+
+        for size in (200, 500):
+            yield self._measure(
+                f"record_list per_page={size}",
+                lambda size=size: self._get(url, {"view": views["-received_at"].pk, "per_page": size}),
+            )
+
+        deep_view = views["-received_at"]
+        record_query = build_record_query(deep_view)
+        queryset = project_records(
+            record_query.queryset, record_query.visible_columns, extra=[record_query.ordering.lstrip("-")]
+        )
+        paginator = KeysetPaginator(queryset, record_query.ordering, per_page=RECORDS_PER_PAGE)
+        cursor = None
+        for _ in range(options["deep_pages"]):
+            page = paginator.get_page(cursor)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        if cursor:
+            yield self._measure(
+                f"record_list deep page ({options['deep_pages']} pages in)",
+                lambda: self._get(url, {"view": deep_view.pk, "cursor": cursor}),
+            )
+
+        for term in options["search"] or ["genomics", "extraction", f"SYN-{timezone.localdate().year}"]:
+            yield self._measure(f"record_list search q={term}", lambda t=term: self._get(url, {"q": t}))
+
+    def _get(self, path, params=None):
+        response = self.client.get(path, params or {})
+        if response.status_code != 200:
+            raise CommandError(f"GET {path} returned {response.status_code}")
+        return response
+
+    def _aget(self, path, params=None):
+        response = async_to_sync(self.async_client.get)(path, params or {})
+        if response.status_code != 200:
+            raise CommandError(f"GET {path} returned {response.status_code}")
+        return response
+
+    def _measure(self, name, request, before=None):
+        timings = []
+        queries = 0
+        for _ in range(self.repeat):
+            if before:
+                before()
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                request()
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = len(ctx.captured_queries)
+
+        if before:
+            before()
+        tracemalloc.start()
+        try:
+            request()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.stderr.write(f"{name}: {statistics.median(timings):.1f} ms, {queries} queries")
+        return {
+            "name": name,
+            "queries": queries,
+            "wall_ms_median": round(statistics.median(timings), 2),
+            "wall_ms_min": round(min(timings), 2),
+            "wall_ms_max": round(max(timings), 2),
+            "peak_memory_kib": round(peak / 1024, 1),
+        }
+
+    def _compare(self, previous, current):
+        before = {row["name"]: row for row in previous.get("results", [])}
+        self.stderr.write("")
+        self.stderr.write(f"{'scenario':<48} {'median ms':>18} {'queries':>10} {'peak KiB':>18}")
+        for row in current["results"]:
+            old = before.get(row["name"])
+            if old is None:
+                self.stderr.write(f"{row['name']:<48} {'(new)':>18}")
+                continue
+            self.stderr.write(
+                f"{row['name']:<48} "
+                f"{old['wall_ms_median']:>8.1f} -> {row['wall_ms_median']:<7.1f} "
+                f"{old['queries']:>4} -> {row['queries']:<3} "
+                f"{old['peak_memory_kib']:>8.1f} -> {row['peak_memory_kib']:<7.1f}"
+            )
@@ -0,0 +1,105 @@
+import json
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+
+from portal.models import LabRecord, SavedView
+from portal.search import search_records
+from portal.stats import OVERDUE_AFTER_DAYS, PENDING_STATUSES
+
+PAGE_SIZE = 25
+TABLE = LabRecord._meta.db_table
+
+SCAN_PATTERNS = {
+    "postgresql": [re.compile(rf"Seq Scan on {TABLE}\b")],
+    "sqlite": [re.compile(rf"\bSCAN {TABLE}\b(?! USING)"), re.compile(r"USE TEMP B-TREE FOR ORDER BY")],
+}
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the record queries generated by saved views and flag sequential scans."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all-combinations",
+            action="store_true",
+            help="Check every status filter x ordering combination, not only the saved views that exist.",
+        )
+        parser.add_argument(
+            "--disable-seqscan",
+            action="store_true",
+            help="PostgreSQL only: plan with enable_seqscan=off so small tables still show whether an index applies.",
+        )
+        parser.add_argument("--database", default="default")
+        parser.add_argument("--fail", action="store_true", help="Exit non-zero if any plan is flagged.")
+        parser.add_argument("--verbose-plans", action="store_true", help="Print every plan, not just flagged ones.")
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        patterns = SCAN_PATTERNS.get(connection.vendor)
+        if patterns is None:
+            raise CommandError(f"No scan patterns for database vendor {connection.vendor!r}.")
+
+        flagged = 0
+        checks = list(self._checks(options))
+        with transaction.atomic(using=options["database"]):
+            if options["disable_seqscan"] and connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+
+            for label, queryset in checks:
+                plan = queryset.using(options["database"]).explain()
+                hits = [line.strip() for line in plan.splitlines() if any(p.search(line) for p in patterns)]
+                if hits:
+                    flagged += 1
+                    self.stdout.write(self.style.WARNING(f"SCAN  {label}"))
+                    for line in hits:
+                        self.stdout.write(f"      {line}")
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"OK    {label}"))
+
+                if options["verbose_plans"]:
+                    self.stdout.write("\n".join(f"      | {line}" for line in plan.splitlines()))
+
+        summary = f"{len(checks)} queries checked, {flagged} flagged."
+        if flagged and options["fail"]:
+            raise CommandError(summary)
+        self.stdout.write(summary)
+
+    def _checks(self, options):
+        combinations = {
+            (status_filter, min_qc_score, json.dumps(filters, sort_keys=True), ordering)
+            for status_filter, min_qc_score, filters, ordering in SavedView.objects.values_list(
+                "status_filter", "min_qc_score", "filters", "ordering"
+            )
+        }
+        if options["all_combinations"]:
+            statuses = ["", *LabRecord.Status.values]
+            combinations |= {
+                (status, None, "{}", ordering) for status in statuses for ordering, _ in SavedView.ORDERING_CHOICES
+            }
+
+        for status_filter, min_qc_score, filters, ordering in sorted(
+            combinations, key=lambda c: (c[0], c[1] or -1, c[2], c[3])
+        ):
+            view = SavedView(
+                status_filter=status_filter, min_qc_score=min_qc_score, filters=json.loads(filters), ordering=ordering
+            )
+            queryset = view.apply_to_queryset(LabRecord.objects.all())
+            tiebreak = "-id" if ordering.startswith("-") else "id"
+            label = f"view status={status_filter or '*'} min_qc={min_qc_score} ordering={ordering}"
+            if view.filters:
+                label += f" filters={filters}"
+            yield label, queryset.order_by(ordering, tiebreak)[: PAGE_SIZE + 1]
+
+        overdue_before = timezone.localdate() - timedelta(days=OVERDUE_AFTER_DAYS)
+        yield "overdue pending records", LabRecord.objects.filter(
+            status__in=PENDING_STATUSES, received_at__lt=overdue_before
+        ).order_by().values("id")
+        yield "dashboard recent records", LabRecord.objects.order_by("-received_at", "-id")[:10]
+
+        prefix_search, _ = search_records(LabRecord.objects.all(), "LAB-2026")
+        yield "sample code prefix search", prefix_search.order_by("sample_code", "id")[: PAGE_SIZE + 1]
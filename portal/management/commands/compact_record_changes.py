@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from portal.models import LabRecordChange
+
+
+class Command(BaseCommand):
+    help = "Compact the LabRecord change log: drop superseded changes and deletions past the retention window."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=settings.CHANGE_LOG_RETENTION_DAYS,
+            help="Only compact changes older than this (defaults to CHANGE_LOG_RETENTION_DAYS).",
+        )
+
+    def handle(self, *args, **options):
+        if options["older_than_days"] < 0:
+            raise CommandError("--older-than-days cannot be negative.")
+        before = timezone.now() - timedelta(days=options["older_than_days"])
+        superseded, tombstones = LabRecordChange.compact(before)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Removed {superseded} superseded changes and {tombstones} deletions before {before:%Y-%m-%d}."
+            )
+        )
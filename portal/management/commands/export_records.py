@@ -0,0 +1,46 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portal.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, parquet_available, stream_export
+from portal.models import SavedView
+from portal.queries import build_record_query
+
+
+class Command(BaseCommand):
+    help = "Stream the full result set of a saved view (plus optional search) to CSV or Parquet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--view", type=int, help="SavedView id whose filters, ordering and columns to apply.")
+        parser.add_argument("--q", default="", help="Search term, as in the record explorer.")
+        parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+        parser.add_argument("--output", "-o", help="Output file (defaults to stdout for CSV).")
+
+    def handle(self, *args, **options):
+        saved_view = None
+        if options["view"]:
+            try:
+                saved_view = SavedView.objects.get(pk=options["view"])
+            except SavedView.DoesNotExist as exc:
+                raise CommandError(f"Saved view {options['view']} does not exist.") from exc
+
+        export_format = options["format"]
+        if export_format == "parquet":
+            if not parquet_available():
+                raise CommandError("Parquet export requires pyarrow to be installed.")
+            if not options["output"]:
+                raise CommandError("Parquet export needs --output.")
+
+        chunks = stream_export(
+            build_record_query(saved_view, options["q"]), export_format, chunk_size=options["chunk_size"]
+        )
+        if not options["output"]:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+
+        with Path(options["output"]).open("wb") as handle:
+            for chunk in chunks:
+                handle.write(chunk.encode() if isinstance(chunk, str) else chunk)
+        self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}"))
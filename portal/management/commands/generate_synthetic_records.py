@@ -0,0 +1,170 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from portal.data_version import mark_records_changed
+from portal.models import LOW_QC_THRESHOLD, DailyRecordStats, LabRecord, LabRecordChange
+
+PROJECTS = [
+    ("Cancer Genomics", 30),
+    ("Metagenomics", 18),
+    ("Rare Disease", 14),
+    ("Population Health", 10),
+    ("Marine eDNA", 8),
+    ("Pathogen Surveillance", 7),
+    ("Transcriptomics", 5),
+    ("Plant Genomics", 3),
+    ("Single Cell", 2),
+    ("Methods Development", 2),
+    ("External Collaborations", 1),
+]
+FIRST_INITIALS = "ABCDEFGHJKLMNPRSTW"
+SURNAMES = [
+    "James",
+    "Patel",
+    "Brown",
+    "Nguyen",
+    "Smith",
+    "Chen",
+    "Garcia",
+    "Wilson",
+    "Kaur",
+    "Taylor",
+    "Martin",
+    "Lee",
+    "Walker",
+    "Hall",
+    "Young",
+    "King",
+    "Wright",
+    "Scott",
+    "Green",
+    "Baker",
+]
+NOTES = [
+    "",
+    "",
+    "",
+    "Passed all QC checks.",
+    "Awaiting final pipeline output.",
+    "Queued for extraction.",
+    "Low yield, re-extraction requested.",
+    "Library prep repeated after failed fragment analysis.",
+    "Contamination flagged in negative control.",
+    "Resequenced on a second lane to top up coverage.",
+]
+PREFIXES = ["SYN", "SYNA", "SYNB", "SYNC", "SYND", "SYNE", "SYNF", "SYNG"]
+MAX_SEQUENCE = 999999
+
+
+class SampleCodeSequence:
+    def __init__(self, prefixes):
+        self.prefixes = prefixes
+        self.counters = {}
+
+    def _start(self, prefix, year):
+        latest = (
+            LabRecord.objects.filter(sample_code__startswith=f"{prefix}-{year}-")
+            .order_by("-sample_code")
+            .values_list("sample_code", flat=True)
+            .first()
+        )
+        return int(latest.rsplit("-", 1)[1]) if latest else 0
+
+    def next(self, year) -> str:
+        for prefix in self.prefixes:
+            key = (prefix, year)
+            if key not in self.counters:
+                self.counters[key] = self._start(prefix, year)
+            if self.counters[key] < MAX_SEQUENCE:
+                self.counters[key] += 1
+                return f"{prefix}-{year}-{self.counters[key]:06d}"
+        raise CommandError(f"Ran out of synthetic sample codes for {year}.")
+
+
+class Command(BaseCommand):
+    help = "Bulk-generate realistic synthetic LabRecords for load and performance testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, required=True)
+        parser.add_argument("--days", type=int, default=730, help="Spread received dates over this many days.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        if count < 1 or options["batch_size"] < 1 or options["days"] < 1:
+            raise CommandError("--count, --batch-size and --days must be positive.")
+
+        rng = random.Random(options["seed"])
+        today = timezone.localdate()
+        sequence = SampleCodeSequence(PREFIXES)
+        projects, project_weights = zip(*PROJECTS)
+        submitters = [f"{initial}. {surname}" for initial in FIRST_INITIALS for surname in SURNAMES]
+        submitters = rng.sample(submitters, 40)
+
+        started = time.perf_counter()
+        created = 0
+        while created < count:
+            size = min(options["batch_size"], count - created)
+            batch = [
+                self._build(rng, today, options["days"], sequence, projects, project_weights, submitters)
+                for _ in range(size)
+            ]
+            with transaction.atomic():
+                LabRecord.objects.bulk_create(batch, batch_size=1000)
+                LabRecordChange.log_records(
+                    LabRecord.objects.filter(sample_code__in=[record.sample_code for record in batch]),
+                    LabRecordChange.Action.CREATED,
+                )
+            created += size
+            self.stdout.write(f"  {created}/{count} rows ({created / (time.perf_counter() - started):.0f} rows/s)")
+
+        with transaction.atomic():
+            buckets = DailyRecordStats.rebuild()
+            mark_records_changed()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"Generated {created} records in {elapsed:.1f}s; rollup has {buckets} buckets.")
+        )
+
+    def _build(self, rng, today, days, sequence, projects, project_weights, submitters):
+        # Intake skews recent; older samples have mostly finished processing.
+        age = min(int(rng.expovariate(3.0 / days)), days - 1)
+        received_at = today - timedelta(days=age)
+        processed_at = None
+
+        if age < 3:
+            status = LabRecord.Status.RECEIVED
+        elif age < 14 and rng.random() < 0.7:
+            status = rng.choice([LabRecord.Status.RECEIVED, LabRecord.Status.IN_PROGRESS])
+        else:
+            status = LabRecord.Status.FAILED if rng.random() < 0.08 else LabRecord.Status.COMPLETED
+            turnaround = max(1, int(rng.gammavariate(2.0, 3.0)))
+            processed_at = min(received_at + timedelta(days=turnaround), today)
+
+        qc_mean = 55 if status == LabRecord.Status.FAILED else 83
+        qc_score = max(0, min(100, int(rng.gauss(qc_mean, 11))))
+        read_count = 0
+        if status in {LabRecord.Status.IN_PROGRESS, LabRecord.Status.COMPLETED}:
+            read_count = int(rng.lognormvariate(17.2, 0.5))
+        notes = rng.choice(NOTES)
+        if qc_score < LOW_QC_THRESHOLD and not notes:
+            notes = "QC below threshold, flagged for review."
+
+        return LabRecord(
+            sample_code=sequence.next(received_at.year),
+            submitter=rng.choice(submitters),
+            project=rng.choices(projects, weights=project_weights)[0],
+            received_at=received_at,
+            processed_at=processed_at,
+            status=status,
+            qc_score=qc_score,
+            read_count=read_count,
+            notes=notes,
+        )
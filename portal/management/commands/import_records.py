@@ -0,0 +1,84 @@
+import csv
+import sys
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from portal.importers import RecordImporter, read_sheet
+
+
+class Command(BaseCommand):
+    help = "Stream LabRecords from a CSV/TSV sample sheet, validating and writing in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or TSV file to import, or '-' for stdin.")
+        parser.add_argument("--delimiter", help="Field delimiter (defaults to tab for .tsv files, comma otherwise).")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--update-existing",
+            action="store_true",
+            help="Upsert rows whose sample_code already exists instead of rejecting them.",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Validate only; do not write any records.")
+        parser.add_argument("--user", help="Username to record as created_by.")
+        parser.add_argument(
+            "--code-prefix",
+            help="Prefix for sample codes allocated to rows without one (defaults to DJANGO_SAMPLE_CODE_PREFIX).",
+        )
+        parser.add_argument("--errors-file", help="Write rejected rows to this CSV file.")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        created_by = None
+        if options["user"]:
+            try:
+                created_by = get_user_model().objects.get(username=options["user"])
+            except get_user_model().DoesNotExist as exc:
+                raise CommandError(f"Unknown user: {options['user']}") from exc
+
+        path = options["path"]
+        delimiter = options["delimiter"] or ("\t" if path.lower().endswith(".tsv") else ",")
+        importer = RecordImporter(
+            batch_size=options["batch_size"],
+            update_existing=options["update_existing"],
+            dry_run=options["dry_run"],
+            created_by=created_by,
+            code_prefix=options["code_prefix"],
+        )
+
+        if path == "-":
+            columns, rows = read_sheet(sys.stdin, delimiter=delimiter)
+            result = importer.run(rows, columns=columns)
+        else:
+            try:
+                with Path(path).open(newline="", encoding="utf-8-sig") as handle:
+                    columns, rows = read_sheet(handle, delimiter=delimiter)
+                    result = importer.run(rows, columns=columns)
+            except FileNotFoundError as exc:
+                raise CommandError(f"File not found: {path}") from exc
+
+        for error in result.errors:
+            for field_name, messages in error.errors.items():
+                for message in messages:
+                    self.stderr.write(f"line {error.line} [{error.sample_code or '-'}] {field_name}: {message}")
+
+        if options["errors_file"]:
+            with Path(options["errors_file"]).open("w", newline="", encoding="utf-8") as handle:
+                writer = csv.writer(handle)
+                writer.writerow(["line", "sample_code", "field", "message"])
+                for error in result.errors:
+                    for field_name, messages in error.errors.items():
+                        for message in messages:
+                            writer.writerow([error.line, error.sample_code, field_name, message])
+
+        verb = "Validated" if options["dry_run"] else "Imported"
+        summary = (
+            f"{verb} {result.processed} rows in {result.elapsed:.2f}s ({result.rows_per_second:.0f} rows/s): "
+            f"{result.created} created, {result.updated} updated, {result.unchanged} unchanged, "
+            f"{result.rejected} rejected."
+        )
+        style = self.style.WARNING if result.rejected else self.style.SUCCESS
+        self.stdout.write(style(summary))
@@ -0,0 +1,32 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portal.data_version import bump_data_version
+from portal.models import DailyRecordStats, LabRecord
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailyRecordStats rollup table from LabRecord rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help="Only rebuild buckets received on or after this date (YYYY-MM-DD).",
+        )
+
+    def handle(self, *args, **options):
+        days = None
+        if options["since"]:
+            try:
+                since = date.fromisoformat(options["since"])
+            except ValueError as exc:
+                raise CommandError(f"Invalid --since date: {options['since']}") from exc
+            days = set(
+                LabRecord.objects.filter(received_at__gte=since).values_list("received_at", flat=True).distinct()
+            )
+            days |= set(DailyRecordStats.objects.filter(day__gte=since).values_list("day", flat=True).distinct())
+
+        created = DailyRecordStats.rebuild(days=days)
+        bump_data_version()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} daily stats buckets."))
@@ -0,0 +1,35 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from portal.changes import MAX_CHANGES_LIMIT, CursorExpired, changes_after
+
+
+class Command(BaseCommand):
+    help = "Write LabRecord changes after a sequence cursor as NDJSON, one change per line."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--after", type=int, default=0, help="Last sequence already consumed.")
+        parser.add_argument("--limit", type=int, default=0, help="Stop after this many changes (0 for all).")
+
+    def handle(self, *args, **options):
+        if options["after"] < 0 or options["limit"] < 0:
+            raise CommandError("--after and --limit cannot be negative.")
+
+        cursor = options["after"]
+        remaining = options["limit"] or None
+        while remaining is None or remaining > 0:
+            size = MAX_CHANGES_LIMIT if remaining is None else min(remaining, MAX_CHANGES_LIMIT)
+            try:
+                page = changes_after(cursor, size)
+            except CursorExpired as exc:
+                raise CommandError(f"{exc} Resume after {exc.resume_after}.") from exc
+            for change in page.results:
+                self.stdout.write(json.dumps(change, cls=DjangoJSONEncoder))
+            cursor = page.cursor
+            if remaining is not None:
+                remaining -= len(page.results)
+            if not page.has_more:
+                break
+        self.stderr.write(f"cursor={cursor}")
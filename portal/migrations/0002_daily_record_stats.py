@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:58
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def populate_daily_stats(apps, schema_editor):
+    LabRecord = apps.get_model('portal', 'LabRecord')
+    DailyRecordStats = apps.get_model('portal', 'DailyRecordStats')
+
+    rows = (
+        LabRecord.objects.order_by()
+        .values('received_at', 'project', 'status')
+        .annotate(total=Count('id'), qc_total=Sum('qc_score'), low_qc=Count('id', filter=Q(qc_score__lt=70)))
+    )
+    DailyRecordStats.objects.bulk_create(
+        [
+            DailyRecordStats(
+                day=row['received_at'],
+                project=row['project'],
+                status=row['status'],
+                record_count=row['total'],
+                qc_sum=row['qc_total'] or 0,
+                low_qc_count=row['low_qc'],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRecordStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('project', models.CharField(max_length=120)),
+                ('status', models.CharField(choices=[('received', 'Received'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('failed', 'Failed')], max_length=16)),
+                ('record_count', models.PositiveIntegerField(default=0)),
+                ('qc_sum', models.PositiveBigIntegerField(default=0)),
+                ('low_qc_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'daily record stats',
+                'ordering': ['-day', 'project', 'status'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'project', 'status'), name='unique_daily_stats_bucket')],
+            },
+        ),
+        migrations.RunPython(populate_daily_stats, migrations.RunPython.noop),
+    ]
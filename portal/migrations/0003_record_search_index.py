@@ -0,0 +1,79 @@
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE portal_labrecord ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(sample_code, '')), 'A')
+        || setweight(to_tsvector('simple', coalesce(project, '') || ' ' || coalesce(submitter, '')), 'B')
+        || setweight(to_tsvector('simple', coalesce(notes, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX portal_labrecord_search_gin ON portal_labrecord USING GIN (search_vector)",
+    "CREATE INDEX labrecord_code_prefix_idx ON portal_labrecord (sample_code varchar_pattern_ops)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS labrecord_code_prefix_idx",
+    "DROP INDEX IF EXISTS portal_labrecord_search_gin",
+    "ALTER TABLE portal_labrecord DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE portal_labrecord_fts USING fts5(
+        sample_code, project, submitter, notes,
+        content='portal_labrecord', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER portal_labrecord_fts_ai AFTER INSERT ON portal_labrecord BEGIN
+        INSERT INTO portal_labrecord_fts (rowid, sample_code, project, submitter, notes)
+        VALUES (new.id, new.sample_code, new.project, new.submitter, new.notes);
+    END
+    """,
+    """
+    CREATE TRIGGER portal_labrecord_fts_ad AFTER DELETE ON portal_labrecord BEGIN
+        INSERT INTO portal_labrecord_fts (portal_labrecord_fts, rowid, sample_code, project, submitter, notes)
+        VALUES ('delete', old.id, old.sample_code, old.project, old.submitter, old.notes);
+    END
+    """,
+    """
+    CREATE TRIGGER portal_labrecord_fts_au AFTER UPDATE OF sample_code, project, submitter, notes
+    ON portal_labrecord BEGIN
+        INSERT INTO portal_labrecord_fts (portal_labrecord_fts, rowid, sample_code, project, submitter, notes)
+        VALUES ('delete', old.id, old.sample_code, old.project, old.submitter, old.notes);
+        INSERT INTO portal_labrecord_fts (rowid, sample_code, project, submitter, notes)
+        VALUES (new.id, new.sample_code, new.project, new.submitter, new.notes);
+    END
+    """,
+    "INSERT INTO portal_labrecord_fts (portal_labrecord_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS portal_labrecord_fts_au",
+    "DROP TRIGGER IF EXISTS portal_labrecord_fts_ad",
+    "DROP TRIGGER IF EXISTS portal_labrecord_fts_ai",
+    "DROP TABLE IF EXISTS portal_labrecord_fts",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0002_daily_record_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            _run({'postgresql': POSTGRES_REVERSE, 'sqlite': SQLITE_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0003_record_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='labrecord',
+            index=models.Index(fields=['-received_at', '-id'], name='labrecord_received_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='labrecord',
+            index=models.Index(fields=['qc_score', 'id'], name='labrecord_qc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='labrecord',
+            index=models.Index(fields=['status', '-received_at', '-id'], name='labrecord_status_received_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='labrecord',
+            index=models.Index(fields=['status', 'qc_score', 'id'], name='labrecord_status_qc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='labrecord',
+            index=models.Index(fields=['status', 'sample_code'], name='labrecord_status_code_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='labrecord',
+            index=models.Index(condition=models.Q(('status__in', ['received', 'in_progress'])), fields=['received_at'], name='labrecord_pending_received_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:26
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0005_request_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_sequence', models.PositiveBigIntegerField(default=0)),
+                ('expired_through', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LabRecordChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveBigIntegerField(unique=True)),
+                ('record_id', models.PositiveBigIntegerField()),
+                ('sample_code', models.CharField(max_length=32)),
+                ('action', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=8)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+            ],
+            options={
+                'ordering': ['sequence'],
+                'indexes': [models.Index(fields=['record_id', 'sequence'], name='labrecordchange_record_idx'), models.Index(fields=['changed_at'], name='labrecordchange_changed_idx')],
+            },
+        ),
+    ]
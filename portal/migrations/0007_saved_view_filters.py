@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portal', '0006_record_change_log'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='savedview',
+            name='filters',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddIndex(
+            model_name='labrecord',
+            index=models.Index(fields=['project', '-received_at', '-id'], name='labrecord_project_received_idx'),
+        ),
+    ]
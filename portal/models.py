@@ -1,10 +1,25 @@
+from collections import defaultdict
+
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MaxValueValidator, MinValueValidator, RegexValidator
-from django.db import models, transaction
-from django.db.models import F, Q
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, Exists, F, Max, OuterRef, Q, Sum
 from django.utils import timezone
 
+from .data_version import mark_records_changed
+from .view_filters import (
+    compile_filters,
+    describe_filters,
+    filter_definition,
+    normalize_filters,
+    rollup_lookups,
+    validate_filters,
+)
+
+LOW_QC_THRESHOLD = 70
+
 
 class LabRecord(models.Model):
     class Status(models.TextChoices):
@@ -47,6 +62,19 @@ class LabRecord(models.Model):
 
     class Meta:
         ordering = ["-received_at", "-created_at"]
+        indexes = [
+            models.Index(fields=["-received_at", "-id"], name="labrecord_received_idx"),
+            models.Index(fields=["qc_score", "id"], name="labrecord_qc_idx"),
+            models.Index(fields=["status", "-received_at", "-id"], name="labrecord_status_received_idx"),
+            models.Index(fields=["status", "qc_score", "id"], name="labrecord_status_qc_idx"),
+            models.Index(fields=["status", "sample_code"], name="labrecord_status_code_idx"),
+            models.Index(fields=["project", "-received_at", "-id"], name="labrecord_project_received_idx"),
+            models.Index(
+                fields=["received_at"],
+                condition=Q(status__in=["received", "in_progress"]),
+                name="labrecord_pending_received_idx",
+            ),
+        ]
         constraints = [
             models.CheckConstraint(
                 condition=Q(processed_at__isnull=True) | Q(processed_at__gte=F("received_at")),
@@ -85,7 +113,255 @@ class LabRecord(models.Model):
 
     def save(self, *args, **kwargs):
         self.full_clean()
-        return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = LabRecord.objects.filter(pk=self.pk).values(*DailyRecordStats.SOURCE_FIELDS).first()
+
+            result = super().save(*args, **kwargs)
+
+            current = {name: getattr(self, name) for name in DailyRecordStats.SOURCE_FIELDS}
+            if previous != current:
+                if previous:
+                    DailyRecordStats.apply_delta(previous, -1)
+                DailyRecordStats.apply_delta(current, 1)
+
+            action = LabRecordChange.Action.UPDATED if previous else LabRecordChange.Action.CREATED
+            LabRecordChange.log_rows([{name: getattr(self, name) for name in LabRecordChange.SNAPSHOT_FIELDS}], action)
+            mark_records_changed()
+            return result
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = LabRecord.objects.filter(pk=self.pk).values(*LabRecordChange.SNAPSHOT_FIELDS).first()
+            result = super().delete(*args, **kwargs)
+            if previous:
+                DailyRecordStats.apply_delta(previous, -1)
+                LabRecordChange.log_rows([previous], LabRecordChange.Action.DELETED)
+            mark_records_changed()
+            return result
+
+
+class DailyRecordStats(models.Model):
+    SOURCE_FIELDS = ("received_at", "project", "status", "qc_score")
+
+    day = models.DateField()
+    project = models.CharField(max_length=120)
+    status = models.CharField(max_length=16, choices=LabRecord.Status.choices)
+    record_count = models.PositiveIntegerField(default=0)
+    qc_sum = models.PositiveBigIntegerField(default=0)
+    low_qc_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-day", "project", "status"]
+        verbose_name_plural = "daily record stats"
+        constraints = [
+            models.UniqueConstraint(fields=["day", "project", "status"], name="unique_daily_stats_bucket"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.day} {self.project} {self.status}: {self.record_count}"
+
+    @classmethod
+    def apply_delta(cls, values, sign: int) -> None:
+        if sign > 0:
+            cls.apply_deltas(added=[values])
+        else:
+            cls.apply_deltas(removed=[values])
+
+    @classmethod
+    def apply_deltas(cls, removed=(), added=()) -> None:
+        # Nets a batch of rows (dicts with SOURCE_FIELDS) per bucket first, so
+        # a bulk write costs one statement per touched bucket instead of a
+        # rescan of every record on its days.
+        totals = defaultdict(lambda: [0, 0, 0])
+        for rows, sign in ((removed, -1), (added, 1)):
+            for values in rows:
+                bucket = totals[(values["received_at"], values["project"], values["status"])]
+                bucket[0] += sign
+                bucket[1] += sign * values["qc_score"]
+                bucket[2] += sign if values["qc_score"] < LOW_QC_THRESHOLD else 0
+
+        for (day, project, status), (count, qc_sum, low_qc) in totals.items():
+            if not (count or qc_sum or low_qc):
+                continue
+            key = {"day": day, "project": project, "status": status}
+            changes = {
+                "record_count": F("record_count") + count,
+                "qc_sum": F("qc_sum") + qc_sum,
+                "low_qc_count": F("low_qc_count") + low_qc,
+            }
+            if cls.objects.filter(**key).update(**changes):
+                if count < 0:
+                    cls.objects.filter(**key, record_count__lte=0).delete()
+                continue
+            if count <= 0:
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(**key, record_count=count, qc_sum=qc_sum, low_qc_count=low_qc)
+            except IntegrityError:
+                cls.objects.filter(**key).update(**changes)
+
+    @classmethod
+    def rebuild(cls, days=None) -> int:
+        records = LabRecord.objects.all()
+        buckets = cls.objects.all()
+        if days is not None:
+            days = list(days)
+            records = records.filter(received_at__in=days)
+            buckets = buckets.filter(day__in=days)
+
+        rows = (
+            records.order_by()
+            .values("received_at", "project", "status")
+            .annotate(
+                total=Count("id"),
+                qc_total=Sum("qc_score"),
+                low_qc=Count("id", filter=Q(qc_score__lt=LOW_QC_THRESHOLD)),
+            )
+        )
+
+        with transaction.atomic():
+            buckets.delete()
+            created = cls.objects.bulk_create(
+                [
+                    cls(
+                        day=row["received_at"],
+                        project=row["project"],
+                        status=row["status"],
+                        record_count=row["total"],
+                        qc_sum=row["qc_total"] or 0,
+                        low_qc_count=row["low_qc"],
+                    )
+                    for row in rows.iterator()
+                ],
+                batch_size=1000,
+            )
+        return len(created)
+
+
+class ChangeLogState(models.Model):
+    # Single row. Bumping last_sequence inside the writing transaction row-locks
+    # it until commit, so sequence numbers become visible strictly in order and
+    # a consumer's cursor can never skip a change that commits late.
+    last_sequence = models.PositiveBigIntegerField(default=0)
+    expired_through = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def reserve(cls, count: int) -> range:
+        if not cls.objects.filter(pk=1).update(last_sequence=F("last_sequence") + count):
+            try:
+                with transaction.atomic():
+                    cls.objects.create(pk=1, last_sequence=count)
+            except IntegrityError:
+                cls.objects.filter(pk=1).update(last_sequence=F("last_sequence") + count)
+        last = cls.objects.values_list("last_sequence", flat=True).get(pk=1)
+        return range(last - count + 1, last + 1)
+
+
+class SampleCodeCounter(models.Model):
+    # Last number handed out per PREFIX-YYYY; see portal.sample_codes.
+    prefix = models.CharField(max_length=6)
+    year = models.PositiveSmallIntegerField()
+    last_number = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["prefix", "year"], name="unique_sample_code_counter"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.prefix}-{self.year}: {self.last_number}"
+
+
+class LabRecordChange(models.Model):
+    class Action(models.TextChoices):
+        CREATED = "created", "Created"
+        UPDATED = "updated", "Updated"
+        DELETED = "deleted", "Deleted"
+
+    SNAPSHOT_FIELDS = (
+        "id",
+        "sample_code",
+        "project",
+        "submitter",
+        "status",
+        "received_at",
+        "processed_at",
+        "qc_score",
+        "read_count",
+        "notes",
+        "created_at",
+        "updated_at",
+    )
+
+    sequence = models.PositiveBigIntegerField(unique=True)
+    record_id = models.PositiveBigIntegerField()
+    sample_code = models.CharField(max_length=32)
+    action = models.CharField(max_length=8, choices=Action.choices)
+    changed_at = models.DateTimeField(default=timezone.now)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+
+    class Meta:
+        ordering = ["sequence"]
+        indexes = [
+            models.Index(fields=["record_id", "sequence"], name="labrecordchange_record_idx"),
+            models.Index(fields=["changed_at"], name="labrecordchange_changed_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"#{self.sequence} {self.action} {self.sample_code}"
+
+    @classmethod
+    def log_rows(cls, rows, action) -> None:
+        # rows: dicts holding SNAPSHOT_FIELDS. Must run inside the transaction
+        # that made the change.
+        rows = list(rows)
+        if not rows:
+            return
+        now = timezone.now()
+        cls.objects.bulk_create(
+            [
+                cls(
+                    sequence=sequence,
+                    record_id=row["id"],
+                    sample_code=row["sample_code"],
+                    action=action,
+                    changed_at=now,
+                    data={name: row[name] for name in cls.SNAPSHOT_FIELDS},
+                )
+                for sequence, row in zip(ChangeLogState.reserve(len(rows)), rows)
+            ],
+            batch_size=1000,
+        )
+
+    @classmethod
+    def log_records(cls, queryset, action) -> None:
+        cls.log_rows(queryset.order_by("id").values(*cls.SNAPSHOT_FIELDS).iterator(chunk_size=2000), action)
+
+    @classmethod
+    def compact(cls, before) -> tuple[int, int]:
+        # Log compaction: changes older than `before` are dropped when a later
+        # change to the same record exists, and old deletions are dropped
+        # entirely. Cursors older than the newest dropped deletion can no
+        # longer be served and must resync.
+        with transaction.atomic():
+            old = cls.objects.filter(changed_at__lt=before)
+            superseded = old.filter(
+                Exists(cls.objects.filter(record_id=OuterRef("record_id"), sequence__gt=OuterRef("sequence")))
+            )
+            superseded_count = superseded.delete()[0]
+
+            tombstones = old.filter(action=cls.Action.DELETED)
+            expired_through = tombstones.aggregate(last=Max("sequence"))["last"]
+            tombstone_count = tombstones.delete()[0]
+            if expired_through:
+                ChangeLogState.objects.filter(pk=1, expired_through__lt=expired_through).update(
+                    expired_through=expired_through
+                )
+        return superseded_count, tombstone_count
 
 
 class SavedView(models.Model):
@@ -121,6 +397,7 @@ class SavedView(models.Model):
         null=True,
         validators=[MinValueValidator(0), MaxValueValidator(100)],
     )
+    filters = models.JSONField(default=dict, blank=True)
     ordering = models.CharField(max_length=32, choices=ORDERING_CHOICES, default="-received_at")
     is_default = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -147,6 +424,11 @@ class SavedView(models.Model):
             invalid_list = ", ".join(sorted(invalid))
             raise ValidationError({"visible_columns": f"Unsupported columns: {invalid_list}"})
 
+        filter_errors = validate_filters(self.filters)
+        if filter_errors:
+            raise ValidationError({"filters": [f"{name}: {message}" for name, message in filter_errors.items()]})
+        self.filters = normalize_filters(self.filters)
+
     def save(self, *args, **kwargs):
         self.full_clean()
 
@@ -159,11 +441,42 @@ class SavedView(models.Model):
 
             return super().save(*args, **kwargs)
 
+    @property
+    def filter_summary(self) -> str:
+        return describe_filters(self.filters or {})
+
+    @property
+    def filter_definition(self) -> str:
+        return filter_definition(self.status_filter, self.min_qc_score, self.filters)
+
     def apply_to_queryset(self, queryset):
-        if self.status_filter:
-            queryset = queryset.filter(status=self.status_filter)
+        # The Q tree is compiled once per distinct filter definition and reused
+        # by every request for this view until the view is edited.
+        return queryset.filter(compile_filters(self.filter_definition)).order_by(self.ordering)
+
+    def rollup_filter(self):
+        # The DailyRecordStats filter matching this view, or None when the view
+        # filters on something the rollup does not keep (QC, reads, turnaround,
+        # submitters, processed dates).
+        return rollup_lookups(self.filter_definition)
+
 
-        if self.min_qc_score is not None:
-            queryset = queryset.filter(qc_score__gte=self.min_qc_score)
+class RequestProfile(models.Model):
+    created_at = models.DateTimeField(auto_now_add=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    method = models.CharField(max_length=8)
+    path = models.TextField()
+    view_name = models.CharField(max_length=200, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField(default=0)
+    db_time_ms = models.FloatField(default=0)
+    profile_stats = models.TextField(blank=True)
+    collapsed_stacks = models.TextField(blank=True)
+    queries = models.JSONField(default=list)
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
 
-        return queryset.order_by(self.ordering)
+    def __str__(self) -> str:
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
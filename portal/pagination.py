@@ -0,0 +1,128 @@
+import base64
+import binascii
+import json
+import math
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _is_bigint(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and -(2**63) <= value < 2**63
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    # Cursors encode (ordering, direction, boundary value, boundary id), so each
+    # page is a bounded index range scan rather than an OFFSET over the whole set.
+    NEXT = "n"
+    PREVIOUS = "p"
+
+    def __init__(self, queryset, ordering: str, per_page: int = 25):
+        self.queryset = queryset
+        self.ordering = ordering
+        self.per_page = per_page
+        self.field_name = ordering.lstrip("-")
+        self.descending = ordering.startswith("-")
+
+    def _order_by(self, reverse: bool = False) -> tuple[str, str]:
+        descending = self.descending != reverse
+        prefix = "-" if descending else ""
+        return (f"{prefix}{self.field_name}", f"{prefix}id")
+
+    def _seek(self, value, pk, reverse: bool = False) -> Q:
+        lookup = "lt" if self.descending != reverse else "gt"
+        return Q(**{f"{self.field_name}__{lookup}": value}) | Q(**{self.field_name: value, f"id__{lookup}": pk})
+
+    def encode_cursor(self, row, direction: str) -> str:
+        payload = [self.ordering, direction, getattr(row, self.field_name), row.id]
+        raw = json.dumps(payload, cls=DjangoJSONEncoder, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode_cursor(self, token: str):
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            ordering, direction, value, pk = json.loads(raw)
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as exc:
+            raise InvalidCursor("Malformed cursor.") from exc
+
+        if ordering != self.ordering or direction not in {self.NEXT, self.PREVIOUS} or not _is_bigint(pk):
+            raise InvalidCursor("Cursor does not match the active ordering.")
+        # Every orderable column is non-null, so a boundary is always a plain,
+        # finite scalar the database can bind; anything else is a forged token.
+        if not (isinstance(value, str) or _is_bigint(value) or (isinstance(value, float) and math.isfinite(value))):
+            raise InvalidCursor("Malformed cursor value.")
+
+        try:
+            field = self.queryset.model._meta.get_field(self.field_name)
+        except FieldDoesNotExist:
+            field = None
+        if field is not None:
+            try:
+                value = field.to_python(value)
+            except (ValidationError, TypeError, ValueError, OverflowError) as exc:
+                raise InvalidCursor("Malformed cursor value.") from exc
+        return direction, value, pk
+
+    def page(self, cursor: str | None = None) -> KeysetPage:
+        if not cursor:
+            rows = list(self.queryset.order_by(*self._order_by())[: self.per_page + 1])
+            has_next = len(rows) > self.per_page
+            rows = rows[: self.per_page]
+            return self._build_page(rows, has_next=has_next, has_previous=False)
+
+        direction, value, pk = self.decode_cursor(cursor)
+        reverse = direction == self.PREVIOUS
+        queryset = self.queryset.filter(self._seek(value, pk, reverse=reverse))
+        rows = list(queryset.order_by(*self._order_by(reverse=reverse))[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+
+        if reverse:
+            rows.reverse()
+            return self._build_page(rows, has_next=True, has_previous=has_more)
+        return self._build_page(rows, has_next=has_more, has_previous=True)
+
+    def get_page(self, cursor: str | None = None) -> KeysetPage:
+        try:
+            page = self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+        if cursor and not page.object_list:
+            return self.page()
+        return page
+
+    def _build_page(self, rows, has_next: bool, has_previous: bool) -> KeysetPage:
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(rows[-1], self.NEXT)
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(rows[0], self.PREVIOUS)
+        return KeysetPage(rows, next_cursor=next_cursor, previous_cursor=previous_cursor)
@@ -0,0 +1,223 @@
+import cProfile
+import io
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from lab_portal.metrics import observe_queries
+
+from .models import RequestProfile
+
+PROFILE_PARAM = "_profile"
+STATS_LIMIT = 60
+EXPLAIN_LIMIT = 50
+REDACTED = "<redacted>"
+# Session keys and password hashes must never end up in the admin.
+SENSITIVE_SQL_RE = re.compile(r"\b(django_session|auth_\w+)\b")
+
+
+def should_profile(request, user) -> bool:
+    if request.GET.get(PROFILE_PARAM) and user is not None and user.is_staff:
+        return True
+    rate = settings.PROFILING_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+def _frame_label(code) -> str:
+    path = Path(code.co_filename)
+    try:
+        path = path.relative_to(settings.BASE_DIR)
+    except ValueError:
+        path = Path(*path.parts[-2:])
+    return f"{code.co_qualname} ({path}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    # Samples the profiled thread's Python stack on a timer and folds the
+    # samples into "outer;inner count" lines, the input flamegraph.pl and
+    # speedscope expect.
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+
+class SqlRecorder:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, alias, sql, params, seconds):
+        self.statements.append((alias, sql, params, seconds * 1000))
+
+
+def explain(alias, sql, params) -> str:
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+            # SQLite returns (id, parent, notused, detail); PostgreSQL one text column.
+            return "\n".join(str(row[-1]) for row in cursor.fetchall())
+    except DatabaseError as exc:
+        return f"EXPLAIN failed: {exc}"
+
+
+def _query_log(recorder):
+    entries = []
+    explained = 0
+    for alias, sql, params, duration_ms in recorder.statements:
+        sensitive = bool(SENSITIVE_SQL_RE.search(sql))
+        if settings.PROFILING_CAPTURE_PARAMS and not sensitive:
+            logged_params = [str(value) for value in params or ()]
+        else:
+            logged_params = [REDACTED] * len(params or ())
+        entry = {
+            "alias": alias,
+            "sql": sql,
+            "params": logged_params,
+            "duration_ms": round(duration_ms, 3),
+            "explain": "",
+        }
+        # PostgreSQL plans quote the parameter values, so sensitive
+        # statements are not explained either.
+        explainable = params is not None and not sensitive and sql.lstrip().upper().startswith("SELECT")
+        if explainable and explained < EXPLAIN_LIMIT:
+            entry["explain"] = explain(alias, sql, params)
+            explained += 1
+        entries.append(entry)
+    return entries
+
+
+def _trim_profiles():
+    stale = list(RequestProfile.objects.values_list("id", flat=True)[settings.PROFILING_KEEP :])
+    if stale:
+        RequestProfile.objects.filter(id__in=stale).delete()
+
+
+class _Capture:
+    # One profiled request: cProfile, the stack sampler and a SQL recorder.
+    # start() returns False when another profiler is active (Python 3.12+
+    # allows one per interpreter, e.g. concurrent sampled requests); stop()
+    # copes with a partial start.
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.recorder = SqlRecorder()
+        self.sampler = StackSampler(threading.get_ident(), settings.PROFILING_SAMPLE_INTERVAL)
+        self.observing = ExitStack()
+        self.started = self.duration_ms = 0.0
+
+    def start(self) -> bool:
+        try:
+            self.profiler.enable()
+        except ValueError:
+            return False
+        self.started = time.perf_counter()
+        try:
+            self.observing.enter_context(observe_queries(self.recorder))
+            self.sampler.start()
+        except BaseException:
+            self.stop()
+            raise
+        return True
+
+    def stop(self) -> None:
+        self.profiler.disable()
+        self.observing.close()
+        if self.sampler.is_alive():
+            self.sampler.stop()
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+
+    def save(self, request, user, response) -> None:
+        stats_output = io.StringIO()
+        pstats.Stats(self.profiler, stream=stats_output).sort_stats("cumulative").print_stats(STATS_LIMIT)
+        queries = _query_log(self.recorder)
+        match = getattr(request, "resolver_match", None)
+
+        RequestProfile.objects.create(
+            user=user if user is not None and user.is_authenticated else None,
+            method=request.method,
+            path=request.get_full_path(),
+            view_name=match.view_name if match else "",
+            status_code=response.status_code,
+            duration_ms=self.duration_ms,
+            query_count=len(queries),
+            db_time_ms=sum(entry["duration_ms"] for entry in queries),
+            profile_stats=stats_output.getvalue(),
+            collapsed_stacks=self.sampler.collapsed(),
+            queries=queries,
+        )
+        _trim_profiles()
+
+
+class RequestProfilingMiddleware:
+    # Runs after AuthenticationMiddleware so ?_profile=1 can be limited to
+    # staff. Streaming responses are profiled up to the point the view returns.
+    # Under ASGI the profile covers the event loop thread, which concurrent
+    # requests share.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        user = getattr(request, "user", None)
+        if not should_profile(request, user):
+            return self.get_response(request)
+        capture = _Capture()
+        if not capture.start():
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            capture.stop()
+        capture.save(request, user, response)
+        return response
+
+    async def __acall__(self, request):
+        user = await request.auser()
+        if not should_profile(request, user):
+            return await self.get_response(request)
+        capture = _Capture()
+        if not capture.start():
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            capture.stop()
+        await sync_to_async(capture.save)(request, user, response)
+        return response
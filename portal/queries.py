@@ -0,0 +1,75 @@
+from dataclasses import dataclass
+
+from .facets import apply_facets
+from .models import LabRecord
+from .search import SEARCH_ORDERING, search_records
+
+DEFAULT_COLUMNS = [
+    "sample_code",
+    "project",
+    "submitter",
+    "status",
+    "received_at",
+    "processed_at",
+    "qc_score",
+    "read_count",
+]
+DEFAULT_ORDERING = "-received_at"
+
+
+@dataclass(frozen=True)
+class RecordQuery:
+    queryset: object
+    visible_columns: list[str]
+    ordering: str
+    query: str = ""
+    rollup_filter: dict | None = None
+    facets: dict | None = None
+
+    @property
+    def ordering_fields(self) -> tuple[str, str]:
+        tiebreak = "-id" if self.ordering.startswith("-") else "id"
+        return (self.ordering, tiebreak)
+
+
+def _facet_rollup_filter(rollup_filter, facets):
+    # Status and project facets are rollup dimensions; QC bands are not.
+    if rollup_filter is None or "qc_band" in facets:
+        return None
+    merged = dict(rollup_filter)
+    for name, value in facets.items():
+        if merged.setdefault(name, value) != value:
+            return None
+    return merged
+
+
+def build_record_query(saved_view=None, query: str = "", facets=None) -> RecordQuery:
+    queryset = LabRecord.objects.all()
+    visible_columns = DEFAULT_COLUMNS
+    ordering = DEFAULT_ORDERING
+    rollup_filter = {}
+
+    if saved_view:
+        queryset = saved_view.apply_to_queryset(queryset)
+        visible_columns = saved_view.visible_columns
+        ordering = saved_view.ordering
+        rollup_filter = saved_view.rollup_filter()
+
+    query = query.strip()
+    queryset, ranked = search_records(queryset, query)
+    if ranked:
+        ordering = SEARCH_ORDERING
+    if query:
+        rollup_filter = None
+    if facets:
+        queryset = apply_facets(queryset, facets)
+        rollup_filter = _facet_rollup_filter(rollup_filter, facets)
+
+    return RecordQuery(
+        queryset=queryset,
+        visible_columns=visible_columns,
+        ordering=ordering,
+        query=query,
+        rollup_filter=rollup_filter,
+        facets=facets or {},
+    )
@@ -0,0 +1,124 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+PRIMARY_PIN_SESSION_KEY = "portal_primary_until"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+REPLICA_APP_LABELS = {"portal"}
+
+_read_alias = ContextVar("portal_read_alias", default=None)
+
+
+def current_read_alias():
+    return _read_alias.get()
+
+
+@contextmanager
+def read_from(alias):
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    # Portal models are read from the replica only inside views marked with
+    # @replica_reads; auth, sessions and every write stay on the primary.
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in REPLICA_APP_LABELS:
+            return _read_alias.get()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != settings.REPLICA_DATABASE
+
+
+def _pinned_to_primary(request) -> bool:
+    session = getattr(request, "session", None)
+    return session is not None and session.get(PRIMARY_PIN_SESSION_KEY, 0) > time.time()
+
+
+def _replica_alias(request):
+    if not settings.REPLICA_DATABASE or request.method not in SAFE_METHODS or _pinned_to_primary(request):
+        return None
+    return settings.REPLICA_DATABASE
+
+
+def _stream_from(alias, chunks):
+    # Streaming bodies are produced after the view returns (possibly on another
+    # thread under ASGI), so each chunk is pulled inside its own context.
+    iterator = iter(chunks)
+    while True:
+        with read_from(alias):
+            chunk = next(iterator, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def _route_streaming(response, alias):
+    if alias and response.streaming and not response.is_async:
+        response.streaming_content = _stream_from(alias, response.streaming_content)
+    return response
+
+
+def replica_reads(view_func):
+    if iscoroutinefunction(view_func):
+
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            alias = await sync_to_async(_replica_alias)(request)
+            with read_from(alias):
+                response = await view_func(request, *args, **kwargs)
+            return _route_streaming(response, alias)
+
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        alias = _replica_alias(request)
+        with read_from(alias):
+            response = view_func(request, *args, **kwargs)
+        return _route_streaming(response, alias)
+
+    return wrapper
+
+
+class PrimaryPinMiddleware:
+    # After a write, keep that session's reads on the primary for a few
+    # seconds so a redirect after record_create/record_edit never lags behind.
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self._pin(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._pin(request, await self.get_response(request))
+
+    def _pin(self, request, response):
+        # Only touches the in-memory session; SessionMiddleware saves it.
+        if settings.REPLICA_DATABASE and request.method not in SAFE_METHODS and hasattr(request, "session"):
+            request.session[PRIMARY_PIN_SESSION_KEY] = time.time() + settings.REPLICA_PIN_SECONDS
+        return response
@@ -0,0 +1,94 @@
+import re
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import LabRecord, SampleCodeCounter
+
+PREFIX_RE = re.compile(r"^[A-Z]{2,6}$")
+MAX_SAMPLE_NUMBER = 999_999
+NUMBER_WIDTH = 4
+
+
+def format_sample_code(prefix: str, year: int, number: int) -> str:
+    return f"{prefix}-{year}-{number:0{NUMBER_WIDTH}d}"
+
+
+def _highest_existing(using, prefix: str, year: int, reserved=()) -> int:
+    # Highest number already used for prefix/year: hand-entered codes on
+    # records plus any `reserved` codes not saved yet. The range keeps the
+    # scan on the unique index.
+    start = f"{prefix}-{year}-"
+    codes = LabRecord.objects.using(using).filter(sample_code__gte=start, sample_code__lt=start + "\U0010ffff")
+    codes = [*codes.values_list("sample_code", flat=True), *reserved]
+    return max((int(code[len(start) :]) for code in codes if code.startswith(start)), default=0)
+
+
+def _bump(using, prefix: str, year: int, count: int):
+    # The UPDATE takes the counter row lock until commit and RETURNING hands
+    # back the new value, so concurrent callers get disjoint blocks from a
+    # single statement.
+    connection = connections[using]
+    if connection.features.can_return_columns_from_insert:
+        table = connection.ops.quote_name(SampleCodeCounter._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET last_number = last_number + %s WHERE prefix = %s AND year = %s "
+                "RETURNING last_number",
+                [count, prefix, year],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+    counters = SampleCodeCounter.objects.using(using).filter(prefix=prefix, year=year)
+    if not counters.update(last_number=F("last_number") + count):
+        return None
+    return counters.values_list("last_number", flat=True).get()
+
+
+def _block(prefix: str, year: int, last: int, count: int) -> list[str]:
+    return [format_sample_code(prefix, year, number) for number in range(last - count + 1, last + 1)]
+
+
+def allocate_sample_codes(count: int = 1, prefix=None, year=None, reserved=()) -> list[str]:
+    # Reserves `count` consecutive PREFIX-YYYY-NNNN codes. Numbers are never
+    # handed out twice; a rolled-back caller just leaves a gap. `reserved` holds
+    # codes the caller is about to save itself (e.g. the rest of an import).
+    prefix = (prefix or settings.SAMPLE_CODE_PREFIX).strip().upper()
+    year = year or timezone.localdate().year
+    if not PREFIX_RE.match(prefix):
+        raise ValidationError({"prefix": "Use 2 to 6 letters, like LAB."})
+    if not 1000 <= year <= 9999:
+        raise ValidationError({"year": "Use a four-digit year."})
+    if count < 1:
+        raise ValidationError({"count": "Allocate at least one code."})
+
+    reserved = set(reserved)
+    using = router.db_for_write(SampleCodeCounter)
+    counters = SampleCodeCounter.objects.using(using).filter(prefix=prefix, year=year)
+    with transaction.atomic(using=using):
+        last = _bump(using, prefix, year, count)
+        if last is None:
+            try:
+                with transaction.atomic(using=using):
+                    SampleCodeCounter.objects.using(using).create(
+                        prefix=prefix, year=year, last_number=_highest_existing(using, prefix, year, reserved)
+                    )
+            except IntegrityError:
+                # Another caller created it first; the bump below queues behind it.
+                pass
+            last = _bump(using, prefix, year, count)
+        codes = _block(prefix, year, last, count)
+        if reserved.intersection(codes) or LabRecord.objects.using(using).filter(sample_code__in=codes).exists():
+            # Someone typed a code at or above the counter since it was seeded;
+            # move the counter past everything in use and take the next block.
+            highest = _highest_existing(using, prefix, year, reserved)
+            counters.update(last_number=Greatest(F("last_number"), highest))
+            last = _bump(using, prefix, year, count)
+            codes = _block(prefix, year, last, count)
+        if last > MAX_SAMPLE_NUMBER:
+            raise ValidationError(f"No {prefix}-{year} codes left (the highest number is {MAX_SAMPLE_NUMBER}).")
+    return codes
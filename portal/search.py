@@ -0,0 +1,83 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import LabRecord
+
+SEARCH_RANK = "search_rank"
+SEARCH_ORDERING = f"-{SEARCH_RANK}"
+
+RECORD_TABLE = LabRecord._meta.db_table
+FTS_TABLE = f"{RECORD_TABLE}_fts"
+SEARCH_VECTOR_COLUMN = "search_vector"
+
+SAMPLE_CODE_PREFIX_RE = re.compile(r"^[A-Za-z]{2,6}-\d[\d-]*$")
+TERM_RE = re.compile(r"\w+")
+
+
+def search_records(queryset, query: str):
+    # Returns (queryset, ranked). Ranked querysets carry a search_rank
+    # annotation (higher is better) that callers should order by.
+    query = query.strip()
+    if not query:
+        return queryset, False
+
+    if SAMPLE_CODE_PREFIX_RE.match(query):
+        return _sample_code_prefix(queryset, query.upper()), False
+
+    terms = TERM_RE.findall(query)
+    vendor = connections[queryset.db].vendor
+    if terms and vendor == "postgresql":
+        return _postgres_search(queryset, terms), True
+    if terms and vendor == "sqlite":
+        return _sqlite_search(queryset, terms), True
+    return _substring_search(queryset, query), False
+
+
+def _sample_code_prefix(queryset, prefix: str):
+    queryset = queryset.filter(sample_code__startswith=prefix)
+    if connections[queryset.db].vendor == "sqlite":
+        # SQLite only uses the unique sample_code index for LIKE when it is
+        # case sensitive; the equivalent range lets it seek instead of scan.
+        queryset = queryset.filter(sample_code__gte=prefix, sample_code__lt=prefix + "\U0010ffff")
+    return queryset
+
+
+def _postgres_search(queryset, terms):
+    tsquery = " & ".join(f"{term}:*" for term in terms)
+    vector = f'"{RECORD_TABLE}"."{SEARCH_VECTOR_COLUMN}"'
+    # ts_rank() is a float4; cast it so keyset cursors, which carry the rank as
+    # a Python float, compare equal to the value they were taken from.
+    rank = f"ts_rank({vector}, to_tsquery('simple', %s))::float8"
+    return queryset.filter(
+        RawSQL(f"{vector} @@ to_tsquery('simple', %s)", (tsquery,), output_field=BooleanField())
+    ).annotate(**{SEARCH_RANK: RawSQL(rank, (tsquery,), output_field=FloatField())})
+
+
+def _sqlite_search(queryset, terms):
+    match = " ".join(f'"{term}"*' for term in terms)
+    return queryset.filter(
+        id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (match,))
+    ).annotate(
+        **{
+            SEARCH_RANK: RawSQL(
+                # bm25() is lower-is-better; column weights mirror the Postgres
+                # setweight() A/B/B/C split used for the tsvector.
+                f"SELECT -bm25({FTS_TABLE}, 10.0, 4.0, 4.0, 1.0) FROM {FTS_TABLE} "
+                f'WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = "{RECORD_TABLE}"."id"',
+                (match,),
+                output_field=FloatField(),
+            )
+        }
+    )
+
+
+def _substring_search(queryset, query: str):
+    return queryset.filter(
+        Q(sample_code__icontains=query)
+        | Q(project__icontains=query)
+        | Q(submitter__icontains=query)
+        | Q(notes__icontains=query)
+    )
@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import SavedView
+from .user_context import invalidate_user_context
+
+
+@receiver(post_save, sender=SavedView)
+@receiver(post_delete, sender=SavedView)
+def saved_view_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_user_context(instance.user_id))
+
+
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+def group_membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        user_ids = list(instance.user_set.values_list("pk", flat=True))
+    elif action in {"post_add", "post_remove", "post_clear"}:
+        user_ids = list(pk_set or []) if reverse else [instance.pk]
+    else:
+        return
+    if user_ids:
+        transaction.on_commit(lambda: invalidate_user_context(*user_ids))
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    user_ids = list(instance.user_set.values_list("pk", flat=True))
+    if user_ids:
+        transaction.on_commit(lambda: invalidate_user_context(*user_ids))
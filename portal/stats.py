@@ -0,0 +1,151 @@
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+
+from .models import LOW_QC_THRESHOLD, DailyRecordStats, LabRecord
+
+OVERDUE_AFTER_DAYS = 7
+TREND_WINDOW_DAYS = 30
+
+PENDING_STATUSES = (LabRecord.Status.RECEIVED, LabRecord.Status.IN_PROGRESS)
+
+
+@dataclass(frozen=True)
+class DashboardStats:
+    total_records: int
+    completed_count: int
+    pending_count: int
+    failed_count: int
+    avg_qc: float | None
+    overdue_count: int
+    low_qc_count: int
+    status_counts: dict[str, int] = field(default_factory=dict)
+    trend: list[tuple[date, int]] = field(default_factory=list)
+
+    @property
+    def completion_rate(self) -> float | None:
+        if not self.total_records:
+            return None
+        return round((self.completed_count / self.total_records) * 100, 1)
+
+    @property
+    def status_chart(self) -> dict:
+        status_lookup = dict(LabRecord.Status.choices)
+        labels, values = [], []
+        for status in sorted(self.status_counts):
+            if self.status_counts[status]:
+                labels.append(status_lookup[status])
+                values.append(self.status_counts[status])
+        return {"labels": labels, "values": values}
+
+    @property
+    def trend_chart(self) -> dict:
+        return {
+            "labels": [day.isoformat() for day, _ in self.trend],
+            "values": [total for _, total in self.trend],
+        }
+
+    def as_context(self) -> dict:
+        return {
+            "total_records": self.total_records,
+            "completed_count": self.completed_count,
+            "pending_count": self.pending_count,
+            "failed_count": self.failed_count,
+            "avg_qc": round(self.avg_qc, 1) if self.avg_qc is not None else None,
+            "completion_rate": self.completion_rate,
+            "overdue_count": self.overdue_count,
+            "low_qc_count": self.low_qc_count,
+        }
+
+
+def compute_dashboard_stats(queryset=None, today: date | None = None) -> DashboardStats:
+    today = today or timezone.localdate()
+    if queryset is None:
+        return _stats_from_rollup(today)
+    return _stats_from_records(queryset, today)
+
+
+def _stats_from_rollup(today: date) -> DashboardStats:
+    return stats_from_rollup_rows(rollup_totals(today), rollup_trend(today))
+
+
+# The two rollup queries are independent, so the async dashboard can run them
+# concurrently and assemble the result with stats_from_rollup_rows().
+def rollup_totals(today: date) -> dict:
+    overdue_before = today - timedelta(days=OVERDUE_AFTER_DAYS)
+    status_aggregates = {
+        f"status_{value}": Sum("record_count", filter=Q(status=value), default=0)
+        for value, _ in LabRecord.Status.choices
+    }
+    return DailyRecordStats.objects.order_by().aggregate(
+        total=Sum("record_count", default=0),
+        qc_sum=Sum("qc_sum", default=0),
+        overdue=Sum("record_count", filter=Q(status__in=PENDING_STATUSES, day__lt=overdue_before), default=0),
+        low_qc=Sum("low_qc_count", default=0),
+        **status_aggregates,
+    )
+
+
+def rollup_trend(today: date) -> list[tuple[date, int]]:
+    window_start = today - timedelta(days=TREND_WINDOW_DAYS)
+    rows = (
+        DailyRecordStats.objects.filter(day__gte=window_start)
+        .values("day")
+        .annotate(total=Sum("record_count"))
+        .order_by("day")
+    )
+    return [(row["day"], row["total"]) for row in rows]
+
+
+def stats_from_rollup_rows(totals: dict, trend: list[tuple[date, int]]) -> DashboardStats:
+    status_counts = {value: totals[f"status_{value}"] for value, _ in LabRecord.Status.choices}
+    return DashboardStats(
+        total_records=totals["total"],
+        completed_count=status_counts[LabRecord.Status.COMPLETED],
+        pending_count=sum(status_counts[status] for status in PENDING_STATUSES),
+        failed_count=status_counts[LabRecord.Status.FAILED],
+        avg_qc=totals["qc_sum"] / totals["total"] if totals["total"] else None,
+        overdue_count=totals["overdue"],
+        low_qc_count=totals["low_qc"],
+        status_counts=status_counts,
+        trend=trend,
+    )
+
+
+def _stats_from_records(queryset, today: date) -> DashboardStats:
+    overdue_before = today - timedelta(days=OVERDUE_AFTER_DAYS)
+    window_start = today - timedelta(days=TREND_WINDOW_DAYS)
+
+    status_aggregates = {
+        f"status_{value}": Count("id", filter=Q(status=value)) for value, _ in LabRecord.Status.choices
+    }
+    totals = queryset.order_by().aggregate(
+        total=Count("id"),
+        avg_qc=Avg("qc_score"),
+        overdue=Count("id", filter=Q(status__in=PENDING_STATUSES, received_at__lt=overdue_before)),
+        low_qc=Count("id", filter=Q(qc_score__lt=LOW_QC_THRESHOLD)),
+        **status_aggregates,
+    )
+    status_counts = {value: totals[f"status_{value}"] for value, _ in LabRecord.Status.choices}
+
+    trend_rows = (
+        queryset.filter(received_at__gte=window_start)
+        .order_by()
+        .values("received_at")
+        .annotate(total=Count("id"))
+        .order_by("received_at")
+    )
+
+    return DashboardStats(
+        total_records=totals["total"],
+        completed_count=status_counts[LabRecord.Status.COMPLETED],
+        pending_count=sum(status_counts[status] for status in PENDING_STATUSES),
+        failed_count=status_counts[LabRecord.Status.FAILED],
+        avg_qc=totals["avg_qc"],
+        overdue_count=totals["overdue"],
+        low_qc_count=totals["low_qc"],
+        status_counts=status_counts,
+        trend=[(row["received_at"], row["total"]) for row in trend_rows],
+    )
@@ -1,11 +1,66 @@
-from datetime import timedelta
+import base64
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.core.management import call_command
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.http import HttpResponse
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from django.utils import timezone
 
-from .models import LabRecord, SavedView
+from lab_portal.metrics import RequestMetricsMiddleware
+from lab_portal.metrics import store as metrics_store
+
+from .admin import LabRecordAdmin
+from .columns import COLUMN_NAMES, COLUMN_RENDERERS, RecordTable, project_records
+from .counts import ApproximateCountPaginator, RecordCount, count_records
+from .dashboard import (
+    abuild_dashboard_payload,
+    build_dashboard_payload,
+    dashboard_cache_keys,
+    get_dashboard_payload,
+    seconds_until_tomorrow,
+)
+from .data_version import bump_data_version, cache_timeout, get_data_version
+from .facets import facet_counts
+from .importers import RecordImporter
+from .ingest import NOT_FOUND
+from .live import payload_delta
+from .models import (
+    ChangeLogState,
+    DailyRecordStats,
+    LabRecord,
+    LabRecordChange,
+    RequestProfile,
+    SampleCodeCounter,
+    SavedView,
+)
+from .pagination import KeysetPaginator
+from .profiling import RequestProfilingMiddleware, SqlRecorder, _query_log
+from .queries import build_record_query
+from .routers import PRIMARY_PIN_SESSION_KEY, PrimaryPinMiddleware, ReplicaRouter, current_read_alias, read_from
+from .sample_codes import allocate_sample_codes
+from .search import search_records
+from .stats import compute_dashboard_stats
+from .transitions import PROCESSED_BEFORE_RECEIVED, PROCESSED_REQUIRED, transition_records
+from .user_context import USER_CONTEXT_CACHE_TIMEOUT
+from .view_filters import compile_filters
 
 
 class LabRecordValidationTests(TestCase):
@@ -73,3 +128,1721 @@ class SavedViewBehaviorTests(TestCase):
         first.refresh_from_db()
         self.assertFalse(first.is_default)
         self.assertTrue(second.is_default)
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        today = timezone.localdate()
+        rows = [
+            ("LAB-2026-0001", LabRecord.Status.COMPLETED, today - timedelta(days=10), today - timedelta(days=8), 92),
+            ("LAB-2026-0002", LabRecord.Status.IN_PROGRESS, today - timedelta(days=9), None, 65),
+            ("LAB-2026-0003", LabRecord.Status.RECEIVED, today - timedelta(days=1), None, 81),
+            ("LAB-2026-0004", LabRecord.Status.FAILED, today - timedelta(days=40), today - timedelta(days=39), 30),
+        ]
+        for sample_code, status, received_at, processed_at, qc_score in rows:
+            LabRecord.objects.create(
+                sample_code=sample_code,
+                submitter="User One",
+                project="Oncology",
+                received_at=received_at,
+                processed_at=processed_at,
+                status=status,
+                qc_score=qc_score,
+            )
+
+    def test_stats_are_computed_in_two_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            stats = compute_dashboard_stats()
+
+        self.assertLessEqual(len(ctx.captured_queries), 2)
+        self.assertEqual(stats.total_records, 4)
+        self.assertEqual(stats.completed_count, 1)
+        self.assertEqual(stats.pending_count, 2)
+        self.assertEqual(stats.failed_count, 1)
+        self.assertEqual(stats.overdue_count, 1)
+        self.assertEqual(stats.low_qc_count, 2)
+        self.assertEqual(stats.avg_qc, 67.0)
+        self.assertEqual(stats.completion_rate, 25.0)
+
+    def test_chart_series_match_record_data(self):
+        stats = compute_dashboard_stats()
+
+        self.assertEqual(stats.status_chart["labels"], ["Completed", "Failed", "In Progress", "Received"])
+        self.assertEqual(stats.status_chart["values"], [1, 1, 1, 1])
+        self.assertEqual(sum(stats.trend_chart["values"]), 3)
+
+    def test_rollup_stats_match_record_aggregates(self):
+        self.assertEqual(compute_dashboard_stats(), compute_dashboard_stats(LabRecord.objects.all()))
+
+    def test_dashboard_view_renders_stats(self):
+        user = get_user_model().objects.create_user(username="viewer", password="password123")
+        self.client.force_login(user)
+
+        response = self.client.get(reverse("dashboard"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["total_records"], 4)
+        self.assertEqual(len(response.context["recent_records"]), 4)
+
+
+class DailyRecordStatsTests(TestCase):
+    def _create(self, sample_code, **overrides):
+        values = {
+            "sample_code": sample_code,
+            "submitter": "User One",
+            "project": "Oncology",
+            "received_at": timezone.localdate() - timedelta(days=2),
+            "status": LabRecord.Status.RECEIVED,
+            "qc_score": 90,
+        }
+        values.update(overrides)
+        return LabRecord.objects.create(**values)
+
+    def _snapshot(self):
+        return list(
+            DailyRecordStats.objects.order_by("day", "project", "status").values_list(
+                "day", "project", "status", "record_count", "qc_sum", "low_qc_count"
+            )
+        )
+
+    def test_save_and_delete_keep_rollup_in_sync(self):
+        first = self._create("LAB-2026-0001")
+        second = self._create("LAB-2026-0002", qc_score=50)
+        self._create("LAB-2026-0003", project="Metagenomics")
+
+        second.status = LabRecord.Status.IN_PROGRESS
+        second.save()
+        first.delete()
+
+        incremental = self._snapshot()
+        DailyRecordStats.rebuild()
+        self.assertEqual(incremental, self._snapshot())
+        self.assertEqual(sum(row[3] for row in incremental), 2)
+
+    def test_rebuild_command_restores_buckets(self):
+        self._create("LAB-2026-0001")
+        DailyRecordStats.objects.all().delete()
+
+        call_command("rebuild_daily_stats", stdout=StringIO())
+
+        self.assertEqual(DailyRecordStats.objects.get().record_count, 1)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        today = timezone.localdate()
+        for index in range(1, 8):
+            LabRecord.objects.create(
+                sample_code=f"LAB-2026-{index:04d}",
+                submitter="User One",
+                project="Oncology",
+                received_at=today - timedelta(days=index % 3),
+                qc_score=50 + index % 2,
+            )
+
+    def _walk(self, ordering):
+        paginator = KeysetPaginator(LabRecord.objects.all(), ordering, per_page=3)
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        return paginator, pages
+
+    def test_pages_follow_ordering_with_id_tiebreaker(self):
+        for ordering, _ in SavedView.ORDERING_CHOICES:
+            with self.subTest(ordering=ordering):
+                _, pages = self._walk(ordering)
+                walked = [record.pk for page in pages for record in page]
+                expected = list(
+                    LabRecord.objects.order_by(ordering, ("-" if ordering.startswith("-") else "") + "id")
+                    .values_list("pk", flat=True)
+                )
+                self.assertEqual(walked, expected)
+                self.assertFalse(pages[0].has_previous())
+
+    def test_previous_cursor_returns_prior_page(self):
+        paginator, pages = self._walk("-qc_score")
+        back = paginator.get_page(pages[2].previous_cursor)
+
+        self.assertEqual([r.pk for r in back], [r.pk for r in pages[1]])
+        self.assertTrue(back.has_previous())
+
+    def test_invalid_or_foreign_cursor_falls_back_to_first_page(self):
+        paginator, pages = self._walk("qc_score")
+        other = KeysetPaginator(LabRecord.objects.all(), "sample_code", per_page=3)
+
+        self.assertEqual([r.pk for r in paginator.get_page("not-a-cursor")], [r.pk for r in pages[0]])
+        self.assertFalse(other.get_page(pages[0].next_cursor).has_previous())
+
+    def test_forged_cursor_values_fall_back_to_first_page(self):
+        paginator, pages = self._walk("-received_at")
+        user = get_user_model().objects.create_user(username="viewer", password="password123")
+        self.client.force_login(user)
+
+        for value in (None, ["2026-01-01"], {"a": 1}, True, float("inf"), float("nan"), 10**30):
+            with self.subTest(value=value):
+                raw = json.dumps(["-received_at", KeysetPaginator.NEXT, value, 1]).encode()
+                cursor = base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+                self.assertEqual([r.pk for r in paginator.get_page(cursor)], [r.pk for r in pages[0]])
+                self.assertEqual(self.client.get(reverse("record_list"), {"cursor": cursor}).status_code, 200)
+
+    def test_record_list_pager_carries_query_and_view(self):
+        user = get_user_model().objects.create_user(username="viewer", password="password123")
+        view = SavedView.objects.create(user=user, name="All", visible_columns=["sample_code"], ordering="sample_code")
+        self.client.force_login(user)
+
+        with mock.patch("portal.views.RECORDS_PER_PAGE", 3):
+            response = self.client.get(reverse("record_list"), {"q": "LAB-2026", "view": view.pk})
+            next_cursor = response.context["page_obj"].next_cursor
+            self.assertContains(response, f"?q=LAB-2026&amp;view={view.pk}&amp;cursor={next_cursor}")
+
+            response = self.client.get(reverse("record_list"), {"q": "LAB-2026", "view": view.pk, "cursor": next_cursor})
+
+        self.assertEqual([r.sample_code for r in response.context["page_obj"]], ["LAB-2026-0004", "LAB-2026-0005", "LAB-2026-0006"])
+
+
+class RecordSearchTests(TestCase):
+    def setUp(self):
+        rows = [
+            ("LAB-2026-0001", "Oncology", "Extraction repeated after low yield."),
+            ("LAB-2026-0002", "Metagenomics", "Oncology collaborator sample."),
+            ("SEQ-2025-0101", "Rare Disease", ""),
+        ]
+        for sample_code, project, notes in rows:
+            LabRecord.objects.create(
+                sample_code=sample_code,
+                submitter="User One",
+                project=project,
+                received_at=timezone.localdate(),
+                qc_score=80,
+                notes=notes,
+            )
+
+    def test_full_text_search_is_ranked(self):
+        queryset, ranked = search_records(LabRecord.objects.all(), "oncol")
+
+        self.assertTrue(ranked)
+        codes = list(queryset.order_by("-search_rank").values_list("sample_code", flat=True))
+        self.assertEqual(codes, ["LAB-2026-0001", "LAB-2026-0002"])
+
+    def test_search_index_follows_updates_and_deletes(self):
+        record = LabRecord.objects.get(sample_code="SEQ-2025-0101")
+        record.notes = "Requeued for extraction"
+        record.save()
+        LabRecord.objects.get(sample_code="LAB-2026-0001").delete()
+
+        queryset, _ = search_records(LabRecord.objects.all(), "extraction")
+
+        self.assertEqual(list(queryset.values_list("sample_code", flat=True)), ["SEQ-2025-0101"])
+
+    def test_sample_code_prefix_uses_fast_path(self):
+        queryset, ranked = search_records(LabRecord.objects.all(), "lab-2026")
+
+        self.assertFalse(ranked)
+        self.assertEqual(queryset.count(), 2)
+
+    def test_ranked_results_paginate_by_rank(self):
+        queryset, _ = search_records(LabRecord.objects.all(), "oncology")
+        paginator = KeysetPaginator(queryset, "-search_rank", per_page=1)
+
+        first = paginator.get_page()
+        second = paginator.get_page(first.next_cursor)
+
+        self.assertEqual([r.sample_code for r in first], ["LAB-2026-0001"])
+        self.assertEqual([r.sample_code for r in second], ["LAB-2026-0002"])
+        self.assertFalse(second.has_next())
+
+
+    @skipUnless(connection.vendor == "postgresql", "ts_rank() rounding is Postgres-specific")
+    def test_tied_ranks_page_without_repeats_or_gaps(self):
+        for index in range(1, 61):
+            LabRecord.objects.create(
+                sample_code=f"TIE-2026-{index:04d}",
+                submitter="User One",
+                project="Tied",
+                received_at=timezone.localdate(),
+                qc_score=80,
+                notes="Identical tied notes",
+            )
+        queryset, _ = search_records(LabRecord.objects.all(), "tied")
+        paginator = KeysetPaginator(queryset, "-search_rank", per_page=7)
+
+        codes, page = [], paginator.get_page()
+        codes += [r.sample_code for r in page]
+        while page.has_next():
+            page = paginator.get_page(page.next_cursor)
+            codes += [r.sample_code for r in page]
+
+        self.assertEqual(sorted(codes), [f"TIE-2026-{index:04d}" for index in range(1, 61)])
+
+class QueryPlanCheckTests(TestCase):
+    def test_every_ordering_is_served_by_an_index(self):
+        out = StringIO()
+
+        call_command("check_query_plans", "--all-combinations", "--fail", stdout=out)
+
+        self.assertIn("0 flagged", out.getvalue())
+
+
+class ColumnProjectionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        LabRecord.objects.create(
+            sample_code="LAB-2026-0001",
+            submitter="User One",
+            project="Oncology",
+            received_at=timezone.localdate(),
+            status=LabRecord.Status.IN_PROGRESS,
+            qc_score=80,
+            notes="x" * 5000,
+        )
+
+    def test_projection_selects_only_visible_columns(self):
+        queryset = project_records(LabRecord.objects.all(), ["status", "sample_code"], extra=["received_at"])
+
+        with CaptureQueriesContext(connection) as ctx:
+            row = queryset.get()
+
+        self.assertEqual(row._fields, ("id", "sample_code", "status", "received_at", "status_display"))
+        self.assertEqual(row.status_display, "In Progress")
+        self.assertNotIn("notes", ctx.captured_queries[0]["sql"])
+
+    def test_record_list_renders_projected_rows(self):
+        user = get_user_model().objects.create_user(username="viewer", password="password123")
+        SavedView.objects.create(user=user, name="Slim", visible_columns=["sample_code", "status"])
+        self.client.force_login(user)
+
+        response = self.client.get(reverse("record_list"))
+
+        self.assertContains(response, "In Progress")
+        # The project facet still lists it; the table must not.
+        self.assertNotContains(response, "<td>Oncology</td>")
+
+
+class ImportRecordsCommandTests(TestCase):
+    def _write_sheet(self, content, suffix=".csv"):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / f"sheet{suffix}"
+        path.write_text(content)
+        return str(path)
+
+    def test_valid_rows_are_bulk_created_and_invalid_rows_reported(self):
+        today = timezone.localdate()
+        LabRecord.objects.create(
+            sample_code="LAB-2026-0009", submitter="A", project="Oncology", received_at=today, qc_score=90
+        )
+        path = self._write_sheet(
+            "sample_code\tsubmitter\tproject\treceived_at\tstatus\tqc_score\tprocessed_at\n"
+            f"LAB-2026-0001\tA. James\tOncology\t{today}\treceived\t91\t\n"
+            f"LAB-2026-0002\tA. James\tOncology\t{today}\tcompleted\t88\t\n"
+            f"bad-code\tA. James\tOncology\t{today}\treceived\t70\t\n"
+            f"LAB-2026-0001\tA. James\tOncology\t{today}\treceived\t91\t\n"
+            f"LAB-2026-0009\tA. James\tOncology\t{today}\treceived\t91\t\n",
+            suffix=".tsv",
+        )
+        out, err = StringIO(), StringIO()
+
+        with CaptureQueriesContext(connection) as ctx:
+            call_command("import_records", path, stdout=out, stderr=err)
+
+        self.assertEqual(LabRecord.objects.count(), 2)
+        self.assertIn("1 created, 0 updated, 0 unchanged, 4 rejected", out.getvalue())
+        self.assertIn("line 3 [LAB-2026-0002] processed_at", err.getvalue())
+        self.assertIn("Duplicate sample code", err.getvalue())
+        self.assertIn("A record with this sample code exists", err.getvalue())
+        self.assertLess(len(ctx.captured_queries), 16)
+        self.assertEqual(DailyRecordStats.objects.get().record_count, 2)
+
+    def test_update_existing_upserts_by_sample_code(self):
+        today = timezone.localdate()
+        LabRecord.objects.create(
+            sample_code="LAB-2026-0001", submitter="A", project="Oncology", received_at=today, qc_score=40
+        )
+        path = self._write_sheet(
+            "sample_code,submitter,project,received_at,qc_score\n"
+            f"LAB-2026-0001,A,Oncology,{today},95\n"
+            f"LAB-2026-0002,A,Oncology,{today},60\n"
+        )
+
+        call_command("import_records", path, "--update-existing", "--batch-size", "1", stdout=StringIO())
+        out = StringIO()
+        call_command("import_records", path, "--update-existing", stdout=out)
+
+        self.assertEqual(LabRecord.objects.get(sample_code="LAB-2026-0001").qc_score, 95)
+        self.assertEqual(DailyRecordStats.objects.get().qc_sum, 155)
+        self.assertIn("0 created, 0 updated, 2 unchanged", out.getvalue())
+
+    def test_update_existing_keeps_columns_the_sheet_omits(self):
+        received = timezone.localdate() - timedelta(days=3)
+        LabRecord.objects.create(
+            sample_code="LAB-2026-0001",
+            submitter="A",
+            project="Oncology",
+            received_at=received,
+            status=LabRecord.Status.IN_PROGRESS,
+            qc_score=40,
+            read_count=500,
+            notes="Keep me",
+        )
+        path = self._write_sheet("sample_code,qc_score\nLAB-2026-0001,95\n")
+
+        call_command("import_records", path, "--update-existing", stdout=StringIO())
+        out = StringIO()
+        call_command("import_records", path, "--update-existing", stdout=out)
+
+        record = LabRecord.objects.get(sample_code="LAB-2026-0001")
+        self.assertEqual(
+            (record.received_at, record.status, record.read_count, record.notes, record.qc_score),
+            (received, LabRecord.Status.IN_PROGRESS, 500, "Keep me", 95),
+        )
+        bucket = DailyRecordStats.objects.values_list("day", "status", "qc_sum").get()
+        self.assertEqual(bucket, (received, "in_progress", 95))
+        self.assertIn("0 created, 0 updated, 1 unchanged", out.getvalue())
+
+    def test_stats_follow_moved_records_without_rescanning_days(self):
+        today = timezone.localdate()
+        LabRecord.objects.create(
+            sample_code="LAB-2026-0001", submitter="A", project="Oncology", received_at=today, qc_score=40
+        )
+        path = self._write_sheet(
+            "sample_code,submitter,project,received_at,qc_score\n"
+            f"LAB-2026-0001,A,Genomics,{today},95\n"
+            f"LAB-2026-0002,A,Oncology,{today},60\n"
+        )
+
+        with CaptureQueriesContext(connection) as ctx:
+            call_command("import_records", path, "--update-existing", stdout=StringIO())
+
+        self.assertFalse(any("COUNT(" in query["sql"].upper() for query in ctx.captured_queries))
+        buckets = DailyRecordStats.objects.values_list("project", "record_count", "qc_sum", "low_qc_count")
+        self.assertEqual(sorted(buckets), [("Genomics", 1, 95, 0), ("Oncology", 1, 60, 1)])
+        self.assertEqual(DailyRecordStats.rebuild(days=[today]), 2)
+        self.assertEqual(sorted(buckets), [("Genomics", 1, 95, 0), ("Oncology", 1, 60, 1)])
+
+    def test_conflicting_rows_are_reported_and_the_rest_written(self):
+        path = self._write_sheet(
+            "sample_code,submitter,project,received_at,qc_score\n"
+            f"LAB-2026-0001,A,Oncology,{timezone.localdate()},95\n"
+            f"LAB-2026-0002,A,Oncology,{timezone.localdate()},60\n"
+        )
+        errors_file = Path(path).with_name("errors.csv")
+        original = RecordImporter._write
+
+        def racing_write(importer, records, existing):
+            # Another process inserts LAB-2026-0002 between the check and the write.
+            if len(records) > 1:
+                LabRecord.objects.create(
+                    sample_code="LAB-2026-0002",
+                    submitter="B",
+                    project="Oncology",
+                    received_at=timezone.localdate(),
+                    qc_score=1,
+                )
+            return original(importer, records, existing)
+
+        with mock.patch.object(RecordImporter, "_write", racing_write):
+            call_command("import_records", path, "--errors-file", errors_file, stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(LabRecord.objects.get(sample_code="LAB-2026-0001").qc_score, 95)
+        self.assertEqual(LabRecord.objects.get(sample_code="LAB-2026-0002").qc_score, 1)
+        self.assertIn("3,LAB-2026-0002,__all__,Database rejected the row", errors_file.read_text())
+
+
+class RecordExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="viewer", password="password123")
+        today = timezone.localdate()
+        for index, qc_score in enumerate([95, 60, 85], start=1):
+            LabRecord.objects.create(
+                sample_code=f"LAB-2026-{index:04d}",
+                submitter="User One",
+                project="Oncology",
+                received_at=today,
+                qc_score=qc_score,
+                notes="private notes",
+            )
+        self.view = SavedView.objects.create(
+            user=self.user,
+            name="High QC",
+            visible_columns=["qc_score", "sample_code"],
+            min_qc_score=80,
+            ordering="-qc_score",
+        )
+
+    def test_csv_export_streams_saved_view_columns(self):
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse("record_export"), {"view": self.view.pk, "format": "csv"})
+
+        self.assertTrue(response.streaming)
+        body = b"".join(response.streaming_content).decode()
+        self.assertEqual(body.splitlines(), ["sample_code,qc_score", "LAB-2026-0001,95", "LAB-2026-0003,85"])
+
+    def test_export_command_writes_parquet(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest("pyarrow is not installed")
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / "export.parquet"
+            call_command(
+                "export_records",
+                "--view",
+                self.view.pk,
+                "--format",
+                "parquet",
+                "--chunk-size",
+                "1",
+                "--output",
+                str(output),
+                stderr=StringIO(),
+            )
+            table = pq.read_table(output)
+
+        self.assertEqual(table.column_names, ["sample_code", "qc_score"])
+        self.assertEqual(table.column("qc_score").to_pylist(), [95, 85])
+
+
+class RecordApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="pipeline", password="password123")
+        today = timezone.localdate()
+        for index in range(1, 4):
+            LabRecord.objects.create(
+                sample_code=f"LAB-2026-{index:04d}",
+                submitter="User One",
+                project="Oncology",
+                received_at=today - timedelta(days=index),
+                qc_score=80 + index,
+            )
+        self.client.force_login(self.user)
+
+    def test_list_paginates_with_cursor_links(self):
+        response = self.client.get(reverse("api_record_list"), {"limit": 2})
+
+        payload = response.json()
+        self.assertEqual([row["sample_code"] for row in payload["results"]], ["LAB-2026-0001", "LAB-2026-0002"])
+        self.assertIsNone(payload["previous"])
+
+        payload = self.client.get(payload["next"]).json()
+        self.assertEqual([row["sample_code"] for row in payload["results"]], ["LAB-2026-0003"])
+        self.assertIsNone(payload["next"])
+
+    def test_list_etag_returns_not_modified_until_data_changes(self):
+        url = reverse("api_record_list")
+        etag = self.client.get(url)["ETag"]
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(any('"portal_labrecord"."notes"' in query["sql"] for query in ctx.captured_queries))
+
+        record = LabRecord.objects.get(sample_code="LAB-2026-0002")
+        record.qc_score = 20
+        record.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_forged_cursor_is_a_400(self):
+        forged = [
+            base64.urlsafe_b64encode(json.dumps(["-received_at", KeysetPaginator.NEXT, value, pk]).encode()).decode()
+            for value, pk in ((None, 1), (float("inf"), 1), ("2026-01-01", 10**30))
+        ]
+
+        for cursor in (*forged, "not-a-cursor"):
+            response = self.client.get(reverse("api_record_list"), {"cursor": cursor})
+
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()["detail"], "Invalid cursor.")
+
+    def test_detail_by_sample_code(self):
+        url = reverse("api_record_detail", args=["LAB-2026-0003"])
+        response = self.client.get(url)
+
+        self.assertEqual(response.json()["qc_score"], 83)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        self.assertEqual(self.client.get(reverse("api_record_detail", args=["LAB-2026-9999"])).status_code, 404)
+
+    def test_anonymous_requests_are_rejected(self):
+        self.client.logout()
+
+        self.assertEqual(self.client.get(reverse("api_record_list")).status_code, 401)
+
+
+class DashboardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.record = LabRecord.objects.create(
+            sample_code="LAB-2026-0001",
+            submitter="User One",
+            project="Oncology",
+            received_at=timezone.localdate() - timedelta(days=10),
+            qc_score=90,
+        )
+
+    def test_payload_is_cached_until_records_change(self):
+        first = get_dashboard_payload()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_dashboard_payload(), first)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.record.status = LabRecord.Status.IN_PROGRESS
+            self.record.save()
+
+        self.assertEqual(get_dashboard_payload()["pending_count"], 1)
+
+    def test_management_fields_are_cached_separately(self):
+        base = get_dashboard_payload()
+        self.assertNotIn("overdue_count", base)
+
+        with self.assertNumQueries(0):
+            management = get_dashboard_payload(include_management=True)
+        self.assertEqual(management["overdue_count"], 1)
+        self.assertEqual(management["total_records"], base["total_records"])
+
+    def test_cache_expires_at_local_midnight(self):
+        now = timezone.make_aware(datetime(2026, 3, 1, 23, 59, 0))
+
+        self.assertEqual(seconds_until_tomorrow(now), 60)
+
+    def test_process_local_cache_caps_the_timeout(self):
+        with self.settings(LOCAL_CACHE=False):
+            self.assertEqual(cache_timeout(3600), 3600)
+        with self.settings(LOCAL_CACHE=True, LOCAL_CACHE_TIMEOUT=60):
+            self.assertEqual(cache_timeout(3600), 60)
+            self.assertEqual(cache_timeout(None), 60)
+            with (
+                mock.patch("portal.dashboard.seconds_until_tomorrow", return_value=3600),
+                mock.patch("portal.dashboard.cache.set_many") as set_many,
+            ):
+                get_dashboard_payload()
+            self.assertEqual(set_many.call_args.kwargs["timeout"], 60)
+
+    def test_suite_never_touches_the_shared_cache(self):
+        self.assertIsInstance(caches["default"], LocMemCache)
+
+
+class UserContextTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="tech", password="password123")
+        self.view = SavedView.objects.create(user=self.user, name="Mine", visible_columns=["sample_code"])
+        self.client.force_login(self.user)
+
+    def test_role_and_saved_views_are_loaded_once(self):
+        self.client.get(reverse("record_list"))
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse("record_list"), {"view": self.view.pk})
+            self.client.get(reverse("dashboard"))
+
+        sql = " ".join(query["sql"] for query in ctx.captured_queries)
+        self.assertNotIn("portal_savedview", sql)
+        self.assertNotIn("auth_user_groups", sql)
+
+    def test_saved_view_changes_invalidate_context(self):
+        self.client.get(reverse("record_list"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SavedView.objects.create(user=self.user, name="Second", visible_columns=["project"])
+
+        response = self.client.get(reverse("saved_view_list"))
+        self.assertEqual([view.name for view in response.context["views"]], ["Mine", "Second"])
+
+    def test_group_membership_changes_invalidate_role(self):
+        management = Group.objects.create(name="Management")
+        self.assertFalse(self.client.get(reverse("dashboard")).context["management_mode"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.add(management)
+
+        self.assertTrue(self.client.get(reverse("dashboard")).context["management_mode"])
+
+    def test_unknown_view_is_not_found(self):
+        self.assertEqual(self.client.get(reverse("record_list"), {"view": "999"}).status_code, 404)
+
+    def test_cached_context_expires_quickly(self):
+        # Bounds staleness when another process misses the invalidation.
+        with mock.patch("portal.user_context.cache.set", wraps=cache.set) as cache_set:
+            self.client.get(reverse("record_list"))
+
+        calls = [call for call in cache_set.call_args_list if call.args[0].startswith("portal:user-context:")]
+        timeouts = [call.kwargs["timeout"] for call in calls]
+        self.assertEqual(timeouts, [USER_CONTEXT_CACHE_TIMEOUT])
+        self.assertLessEqual(USER_CONTEXT_CACHE_TIMEOUT, 60)
+
+
+class SyntheticDataAndBenchmarkTests(TestCase):
+    def test_generator_produces_valid_records_and_rollup(self):
+        call_command("generate_synthetic_records", "--count", "300", "--batch-size", "120", "--seed", "7", stdout=StringIO())
+
+        self.assertEqual(LabRecord.objects.count(), 300)
+        for record in LabRecord.objects.all()[:50]:
+            record.full_clean()
+        self.assertEqual(compute_dashboard_stats().total_records, 300)
+
+    def test_benchmark_writes_json_report(self):
+        cache.clear()
+        get_user_model().objects.create_user(username="bench", password="password123")
+        call_command("generate_synthetic_records", "--count", "60", "--seed", "1", stdout=StringIO())
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / "bench.json"
+            call_command(
+                "benchmark_portal",
+                "--user",
+                "bench",
+                "--repeat",
+                "1",
+                "--deep-pages",
+                "2",
+                "--output",
+                str(output),
+                stderr=StringIO(),
+            )
+            report = json.loads(output.read_text())
+
+        names = [row["name"] for row in report["results"]]
+        self.assertIn("dashboard (cold cache)", names)
+        self.assertIn("record_list ordering=qc_score", names)
+        self.assertEqual(report["meta"]["record_count"], 60)
+        self.assertFalse(SavedView.objects.filter(name__startswith="benchmark: ").exists())
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.metrics_dir = Path(directory.name)
+        settings_override = override_settings(METRICS_DIR=directory.name, METRICS_FLUSH_INTERVAL=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.staff = get_user_model().objects.create_user(username="ops", password="password123", is_staff=True)
+
+    def test_metrics_report_requests_per_url_name(self):
+        self.client.force_login(self.staff)
+        self.client.get(reverse("dashboard"))
+
+        response = self.client.get(reverse("metrics"))
+
+        body = response.content.decode()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('portal_requests_total{method="GET",status="200",view="dashboard"}', body)
+        self.assertIn('portal_request_duration_seconds_bucket{view="dashboard",le="+Inf"}', body)
+        self.assertIn('portal_request_db_queries_count{view="dashboard"}', body)
+        self.assertIn('portal_response_size_bytes_sum{view="dashboard"}', body)
+
+    async def test_middlewares_stay_async_under_asgi(self):
+        async def view(request):
+            return HttpResponse()
+
+        for middleware in (RequestMetricsMiddleware, PrimaryPinMiddleware, RequestProfilingMiddleware):
+            self.assertTrue(iscoroutinefunction(middleware(view)))
+        await self.async_client.aforce_login(self.staff)
+
+        with mock.patch.object(metrics_store, "observe", wraps=metrics_store.observe) as observe:
+            response = await self.async_client.get(reverse("api_dashboard"), {"_profile": "1"})
+
+        self.assertEqual(response.status_code, 200)
+        # Queries the async view runs through sync_to_async are still counted.
+        observed = {call.args[0]: call.args[2] for call in observe.call_args_list}
+        self.assertGreater(observed["portal_request_db_queries"], 0)
+        profile = await RequestProfile.objects.aget()
+        self.assertTrue(any("portal_labrecord" in query["sql"] for query in profile.queries))
+        self.assertEqual(profile.view_name, "api_dashboard")
+
+    def test_metrics_sum_all_worker_files(self):
+        other_worker = {"portal_requests_total": {'[["method", "GET"], ["status", 200], ["view", "other"]]': 41}}
+        (self.metrics_dir / f"metrics-{os.getppid()}.json").write_text(json.dumps(other_worker))
+        self.client.force_login(self.staff)
+
+        body = self.client.get(reverse("metrics")).content.decode()
+
+        self.assertIn('portal_requests_total{method="GET",status="200",view="other"} 41', body)
+
+    def test_metrics_drop_files_of_exited_workers(self):
+        exited = subprocess.Popen([sys.executable, "-c", ""])
+        exited.wait()
+        stale = self.metrics_dir / f"metrics-{exited.pid}.json"
+        stale.write_text(json.dumps({"portal_requests_total": {'[["view", "gone"]]': 7}}))
+        self.client.force_login(self.staff)
+
+        body = self.client.get(reverse("metrics")).content.decode()
+
+        self.assertNotIn('view="gone"', body)
+        self.assertFalse(stale.exists())
+
+    def test_metrics_require_staff_or_token(self):
+        user = get_user_model().objects.create_user(username="analyst", password="password123")
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        self.client.logout()
+
+        with override_settings(METRICS_TOKEN="scrape-me"):
+            response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer scrape-me")
+        self.assertEqual(response.status_code, 200)
+
+
+class RequestProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = get_user_model().objects.create_user(username="ops", password="password123", is_staff=True)
+        LabRecord.objects.create(
+            sample_code="LAB-2026-0001",
+            submitter="A. James",
+            project="Genomics",
+            received_at=timezone.localdate(),
+            qc_score=90,
+        )
+
+    def test_staff_flag_captures_profile_with_explained_sql(self):
+        self.client.force_login(self.staff)
+
+        response = self.client.get(reverse("record_list"), {"_profile": "1"})
+
+        self.assertEqual(response.status_code, 200)
+        profile = RequestProfile.objects.get()
+        self.assertEqual(profile.view_name, "record_list")
+        self.assertEqual(profile.user, self.staff)
+        self.assertIn("cumulative", profile.profile_stats)
+        self.assertEqual(profile.query_count, len(profile.queries))
+        record_queries = [query for query in profile.queries if "portal_labrecord" in query["sql"]]
+        self.assertTrue(record_queries)
+        self.assertTrue(all(query["explain"] for query in record_queries))
+
+    def test_parameters_are_redacted_and_session_queries_never_kept(self):
+        recorder = SqlRecorder()
+        recorder("default", 'SELECT * FROM "django_session" WHERE "session_key" = %s', ["secret-key"], 0.0001)
+        recorder("default", 'SELECT * FROM "portal_labrecord" WHERE "project" = %s', ["Genomics"], 0.0001)
+
+        redacted = _query_log(recorder)
+        with self.settings(PROFILING_CAPTURE_PARAMS=True):
+            captured = _query_log(recorder)
+
+        self.assertEqual([entry["params"] for entry in redacted], [["<redacted>"], ["<redacted>"]])
+        self.assertEqual([entry["params"] for entry in captured], [["<redacted>"], ["Genomics"]])
+        self.assertEqual(captured[0]["explain"], "")
+        self.assertTrue(captured[1]["explain"])
+
+    def test_request_is_served_unprofiled_when_a_profiler_is_active(self):
+        self.client.force_login(self.staff)
+
+        with mock.patch("portal.profiling.cProfile.Profile.enable", side_effect=ValueError("already active")):
+            response = self.client.get(reverse("record_list"), {"_profile": "1"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_flag_ignored_for_non_staff_and_sampling_applies_to_everyone(self):
+        user = get_user_model().objects.create_user(username="analyst", password="password123")
+        self.client.force_login(user)
+        self.client.get(reverse("record_list"), {"_profile": "1"})
+        self.assertFalse(RequestProfile.objects.exists())
+
+        with self.settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_KEEP=2):
+            for _ in range(3):
+                self.client.get(reverse("dashboard"))
+        self.assertEqual(RequestProfile.objects.count(), 2)
+
+    def test_admin_serves_collapsed_stacks(self):
+        profile = RequestProfile.objects.create(
+            method="GET",
+            path="/records/",
+            status_code=200,
+            duration_ms=12.5,
+            collapsed_stacks="handler (views.py:1);record_list (portal/views.py:40) 7",
+        )
+        get_user_model().objects.create_superuser(username="admin", password="password123")
+        self.client.login(username="admin", password="password123")
+
+        detail = self.client.get(reverse("admin:portal_requestprofile_change", args=[profile.pk]))
+        download = self.client.get(reverse("admin:portal_requestprofile_collapsed", args=[profile.pk]))
+
+        self.assertContains(detail, "Download .folded")
+        self.assertEqual(download.content.decode(), "handler (views.py:1);record_list (portal/views.py:40) 7")
+
+
+class BulkStatusTransitionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.records = {}
+        for index, received_days_ago in enumerate([5, 4, 1], start=1):
+            record = LabRecord.objects.create(
+                sample_code=f"LAB-2026-{index:04d}",
+                submitter="User One",
+                project="Oncology",
+                received_at=self.today - timedelta(days=received_days_ago),
+                status=LabRecord.Status.IN_PROGRESS,
+                qc_score=85,
+            )
+            self.records[record.sample_code] = record
+
+    def test_valid_rows_are_updated_in_one_statement_and_rest_rejected(self):
+        processed_at = self.today - timedelta(days=2)
+        ids = [record.id for record in self.records.values()]
+
+        with CaptureQueriesContext(connection) as ctx:
+            result = transition_records(LabRecord.Status.COMPLETED, processed_at, ids=[*ids, 999999])
+
+        updates = [query for query in ctx.captured_queries if query["sql"].startswith('UPDATE "portal_labrecord"')]
+        self.assertEqual(len(updates), 1)
+        # Daily stats move by delta instead of recounting the affected days.
+        self.assertFalse(any("COUNT(" in query["sql"].upper() for query in ctx.captured_queries))
+        self.assertEqual(result.updated, ["LAB-2026-0001", "LAB-2026-0002"])
+        self.assertEqual(
+            [(row.key, row.reason) for row in result.rejected],
+            [("LAB-2026-0003", PROCESSED_BEFORE_RECEIVED), ("999999", "Record not found.")],
+        )
+        self.assertEqual(LabRecord.objects.filter(status=LabRecord.Status.COMPLETED).count(), 2)
+        self.assertEqual(compute_dashboard_stats(), compute_dashboard_stats(LabRecord.objects.all()))
+
+    def test_finished_status_without_date_keeps_existing_processed_dates(self):
+        LabRecord.objects.filter(sample_code="LAB-2026-0001").update(processed_at=self.today)
+
+        result = transition_records(LabRecord.Status.FAILED, sample_codes=["LAB-2026-0001", "LAB-2026-0002"])
+
+        self.assertEqual(result.updated, ["LAB-2026-0001"])
+        self.assertEqual([row.reason for row in result.rejected], [PROCESSED_REQUIRED])
+        self.assertEqual(LabRecord.objects.get(sample_code="LAB-2026-0001").processed_at, self.today)
+
+    def test_explorer_bulk_action_reports_outcome(self):
+        user = get_user_model().objects.create_user(username="tech", password="password123")
+        self.client.force_login(user)
+
+        response = self.client.post(
+            reverse("record_bulk_status"),
+            {
+                "ids": [record.id for record in self.records.values()],
+                "status": LabRecord.Status.COMPLETED,
+                "processed_at": (self.today - timedelta(days=2)).isoformat(),
+                "next": reverse("record_list") + "?q=LAB",
+            },
+            follow=True,
+        )
+
+        self.assertRedirects(response, reverse("record_list") + "?q=LAB")
+        messages = [str(message) for message in response.context["messages"]]
+        self.assertIn("Updated 2 records.", messages)
+        self.assertTrue(any(message.startswith("Skipped 1 records. LAB-2026-0003") for message in messages))
+
+    def test_api_accepts_sample_codes_and_validates_payload(self):
+        user = get_user_model().objects.create_user(username="robot", password="password123")
+        self.client.force_login(user)
+        url = reverse("api_record_bulk_status")
+
+        response = self.client.post(
+            url,
+            {"sample_codes": ["LAB-2026-0003", "LAB-2026-9999"], "status": "completed", "processed_at": str(self.today)},
+            content_type="application/json",
+        )
+        bad = self.client.post(url, {"ids": [1], "status": "shipped"}, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["updated_sample_codes"], ["LAB-2026-0003"])
+        self.assertEqual(response.json()["rejected"], [{"key": "LAB-2026-9999", "reason": "Record not found."}])
+        self.assertEqual(bad.status_code, 400)
+
+
+@override_settings(INGEST_TOKEN="pipeline-secret")
+class RecordIngestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        for index in range(1, 4):
+            LabRecord.objects.create(
+                sample_code=f"LAB-2026-{index:04d}",
+                submitter="User One",
+                project="Oncology",
+                received_at=self.today,
+                status=LabRecord.Status.IN_PROGRESS,
+                qc_score=80,
+            )
+        self.url = reverse("api_record_ingest")
+
+    def _post_ndjson(self, rows):
+        body = "\n".join(json.dumps(row) for row in rows) + "\n"
+        return self.client.post(
+            self.url, body, content_type="application/x-ndjson", HTTP_AUTHORIZATION="Bearer pipeline-secret"
+        )
+
+    def test_ndjson_updates_metrics_and_reports_bad_rows(self):
+        rows = [
+            {"sample_code": "LAB-2026-0001", "read_count": 1200000, "qc_score": 91},
+            {"sample_code": "LAB-2026-0002", "qc_score": 150},
+            {"sample_code": "LAB-2026-9999", "read_count": 5},
+        ]
+
+        response = self._post_ndjson(rows)
+
+        payload = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((payload["processed"], payload["updated"], payload["rejected"]), (3, 1, 2))
+        self.assertEqual([error["line"] for error in payload["errors"]], [2, 3])
+        self.assertEqual(payload["errors"][1]["errors"], {"sample_code": [NOT_FOUND]})
+        record = LabRecord.objects.get(sample_code="LAB-2026-0001")
+        self.assertEqual((record.read_count, record.qc_score), (1200000, 91))
+        self.assertEqual(compute_dashboard_stats(), compute_dashboard_stats(LabRecord.objects.all()))
+
+    def test_retrying_a_run_is_a_no_op(self):
+        rows = [{"sample_code": f"LAB-2026-{index:04d}", "read_count": 1000 * index} for index in range(1, 4)]
+        self._post_ndjson(rows)
+
+        with CaptureQueriesContext(connection) as ctx:
+            payload = self._post_ndjson(rows).json()
+
+        self.assertEqual((payload["updated"], payload["unchanged"]), (0, 3))
+        self.assertFalse([query for query in ctx.captured_queries if query["sql"].startswith("UPDATE")])
+
+    def test_json_batch_from_session_creates_full_records(self):
+        user = get_user_model().objects.create_user(username="tech", password="password123")
+        self.client.force_login(user)
+        new_record = {
+            "sample_code": "LAB-2026-0004",
+            "submitter": "Pipeline",
+            "project": "Oncology",
+            "received_at": str(self.today),
+            "qc_score": 77,
+            "read_count": 42,
+        }
+
+        response = self.client.post(self.url, {"records": [new_record]}, content_type="application/json")
+
+        self.assertEqual(response.json()["created"], 1)
+        self.assertEqual(LabRecord.objects.get(sample_code="LAB-2026-0004").created_by, user)
+
+    def test_requires_token_or_session_and_supported_content_type(self):
+        anonymous = self.client.post(self.url, "[]", content_type="application/json")
+        wrong_token = self.client.post(
+            self.url, "[]", content_type="application/json", HTTP_AUTHORIZATION="Bearer nope"
+        )
+        wrong_type = self.client.post(
+            self.url, "a,b", content_type="text/csv", HTTP_AUTHORIZATION="Bearer pipeline-secret"
+        )
+
+        self.assertEqual(anonymous.status_code, 401)
+        self.assertEqual(wrong_token.status_code, 401)
+        self.assertEqual(wrong_type.status_code, 415)
+
+    def test_stats_follow_ingested_rows_without_rescanning_days(self):
+        rows = [
+            {"sample_code": "LAB-2026-0001", "qc_score": 40},
+            {
+                "sample_code": "LAB-2026-0004",
+                "submitter": "Pipeline",
+                "project": "Genomics",
+                "received_at": str(self.today - timedelta(days=1)),
+                "qc_score": 77,
+            },
+        ]
+
+        with mock.patch.object(DailyRecordStats, "rebuild") as rebuild:
+            self._post_ndjson(rows)
+
+        rebuild.assert_not_called()
+        expected = list(DailyRecordStats.objects.values_list("day", "project", "status", "record_count", "qc_sum"))
+        DailyRecordStats.rebuild()
+        self.assertEqual(
+            list(DailyRecordStats.objects.values_list("day", "project", "status", "record_count", "qc_sum")), expected
+        )
+        self.assertEqual(DailyRecordStats.objects.get(day=self.today).low_qc_count, 1)
+
+    def test_wrongly_typed_values_are_row_errors(self):
+        new_record = {
+            "submitter": "Pipeline",
+            "project": "Oncology",
+            "received_at": str(self.today),
+            "qc_score": 77,
+        }
+        rows = [
+            {**new_record, "sample_code": "LAB-2026-0004", "notes": None},
+            {**new_record, "sample_code": "LAB-2026-0005", "received_at": 20260102},
+            {**new_record, "sample_code": "LAB-2026-0006", "qc_score": [77]},
+            {"sample_code": "LAB-2026-0001", "read_count": True},
+        ]
+
+        response = self._post_ndjson(rows)
+
+        payload = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((payload["created"], payload["rejected"]), (1, 3))
+        self.assertEqual(
+            [error["errors"] for error in payload["errors"]],
+            [
+                {"received_at": ["Expected a string."]},
+                {"qc_score": ["Expected a whole number."]},
+                {"read_count": ["Expected a whole number."]},
+            ],
+        )
+        self.assertEqual(LabRecord.objects.get(sample_code="LAB-2026-0004").notes, "")
+
+    def test_malformed_json_bodies_are_rejected_with_400(self):
+        for body in ("[{", '{"records": 5}'):
+            response = self.client.post(
+                self.url, body, content_type="application/json", HTTP_AUTHORIZATION="Bearer pipeline-secret"
+            )
+
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("Invalid JSON", response.json()["detail"])
+        self.assertFalse(LabRecordChange.objects.filter(action=LabRecordChange.Action.UPDATED).exists())
+
+
+def create_dashboard_records(today):
+    for index, status in enumerate(LabRecord.Status.values, start=1):
+        LabRecord.objects.create(
+            sample_code=f"LAB-2026-{index:04d}",
+            submitter="User One",
+            project="Oncology",
+            received_at=today - timedelta(days=index),
+            processed_at=today if status in {"completed", "failed"} else None,
+            status=status,
+            qc_score=60 + index * 5,
+        )
+
+
+class AsyncDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        create_dashboard_records(self.today)
+        self.user = get_user_model().objects.create_user(username="viewer", password="password123", is_staff=True)
+
+    async def test_async_payload_matches_sync_payload(self):
+        expected = await sync_to_async(build_dashboard_payload)(self.today)
+        self.assertEqual(await abuild_dashboard_payload(self.today), expected)
+
+    async def test_async_dashboard_view_and_json_endpoint(self):
+        anonymous = await self.async_client.get(reverse("api_dashboard"))
+        await self.async_client.aforce_login(self.user)
+
+        page = await self.async_client.get(reverse("dashboard_async"))
+        data = await self.async_client.get(reverse("api_dashboard"))
+
+        self.assertEqual(anonymous.status_code, 401)
+        self.assertEqual(page.status_code, 200)
+        self.assertEqual(page.context["total_records"], 4)
+        self.assertEqual(data.json()["total_records"], 4)
+        self.assertEqual(data.json()["completion_rate"], 25.0)
+        self.assertEqual(len(data.json()["recent_records"]), 4)
+
+
+def read_event(chunk: bytes) -> tuple[str, dict]:
+    fields = dict(line.split(": ", 1) for line in chunk.decode().strip().splitlines())
+    return fields["event"], json.loads(fields["data"])
+
+
+@override_settings(LIVE_DASHBOARD_POLL_SECONDS=0.01)
+class DashboardStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        create_dashboard_records(self.today)
+        self.staff = get_user_model().objects.create_user(username="staff", password="password123", is_staff=True)
+        self.viewer = get_user_model().objects.create_user(username="viewer", password="password123")
+
+    def test_payload_delta_keeps_changed_fields_only(self):
+        previous = {"total_records": 4, "avg_qc": 72.5, "status_chart": {"labels": ["a"], "values": [1]}}
+        current = {"total_records": 5, "avg_qc": 72.5, "status_chart": {"labels": ["a"], "values": [2]}}
+
+        self.assertEqual(payload_delta(previous, current), {"total_records": 5, "status_chart": current["status_chart"]})
+
+    async def test_stream_sends_snapshot_then_deltas_when_data_changes(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(reverse("dashboard_stream"))
+        events = aiter(response.streaming_content)
+
+        snapshot = read_event(await anext(events))
+        await sync_to_async(LabRecord.objects.create)(
+            sample_code="LAB-2026-0099",
+            submitter="User One",
+            project="Oncology",
+            received_at=self.today,
+            qc_score=65,
+        )
+        await sync_to_async(bump_data_version)()
+        delta = read_event(await anext(events))
+        await response.streaming_content.aclose()
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(snapshot[0], "snapshot")
+        self.assertEqual((snapshot[1]["total_records"], snapshot[1]["completion_rate"]), (4, 25.0))
+        self.assertEqual(delta[0], "delta")
+        self.assertEqual(delta[1]["total_records"], 5)
+        self.assertIn("trend_chart", delta[1])
+        self.assertNotIn("failed_count", delta[1])
+
+    async def test_stream_ignores_payloads_cached_from_a_lagging_replica(self):
+        keys = dashboard_cache_keys(await sync_to_async(get_data_version)(), self.today)
+        base, management = await sync_to_async(build_dashboard_payload)(self.today)
+        await cache.aset_many({keys[0]: {**base, "total_records": 3}, keys[1]: {**management, "completion_rate": 0.0}})
+        await self.async_client.aforce_login(self.staff)
+
+        response = await self.async_client.get(reverse("dashboard_stream"))
+        snapshot = read_event(await anext(aiter(response.streaming_content)))
+        await response.streaming_content.aclose()
+
+        self.assertEqual((snapshot[1]["total_records"], snapshot[1]["completion_rate"]), (4, 25.0))
+        self.assertEqual((await cache.aget(keys[0]))["total_records"], 4)
+
+    async def test_stream_hides_management_fields_and_needs_asgi(self):
+        await self.async_client.aforce_login(self.viewer)
+        response = await self.async_client.get(reverse("dashboard_stream"))
+        snapshot = read_event(await anext(aiter(response.streaming_content)))
+        await response.streaming_content.aclose()
+        await sync_to_async(self.client.force_login)(self.viewer)
+        wsgi = await sync_to_async(self.client.get)(reverse("dashboard_stream"))
+
+        self.assertEqual(snapshot[1]["total_records"], 4)
+        self.assertNotIn("completion_rate", snapshot[1])
+        self.assertEqual(wsgi.status_code, 204)
+
+
+@override_settings(DASHBOARD_PARALLEL_QUERIES=True)
+class ParallelDashboardQueryTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        create_dashboard_records(self.today)
+
+    def test_parallel_queries_run_on_separate_connections(self):
+        expected = build_dashboard_payload(self.today)
+
+        with mock.patch("portal.dashboard.connections.close_all") as close_all:
+            payload = async_to_sync(abuild_dashboard_payload)(self.today)
+
+        self.assertEqual(payload, expected)
+        self.assertEqual(close_all.call_count, 3)
+
+
+class RecordTableTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        today = timezone.localdate()
+        for index in range(1, 231):
+            LabRecord.objects.create(
+                sample_code=f"LAB-2026-{index:04d}",
+                submitter="<b>Bold</b>" if index == 1 else "User One",
+                project="Oncology",
+                received_at=today,
+                status=LabRecord.Status.IN_PROGRESS,
+                qc_score=80,
+            )
+        self.user = get_user_model().objects.create_user(username="viewer", password="password123")
+
+    def test_registry_covers_every_saved_view_column(self):
+        self.assertEqual(list(COLUMN_RENDERERS), COLUMN_NAMES)
+
+    def test_rows_render_only_visible_columns_escaped(self):
+        rows = project_records(LabRecord.objects.filter(sample_code="LAB-2026-0001"), ["submitter", "status"])
+        table = RecordTable(["status", "submitter"], rows)
+
+        self.assertIn("<th>Submitter</th><th>Status</th>", table.header)
+        self.assertIn("<td>&lt;b&gt;Bold&lt;/b&gt;</td><td>In Progress</td>", table.body)
+        self.assertNotIn("LAB-2026-0001", table.body)
+        self.assertIn(reverse("record_edit", args=[rows[0].id]), table.body)
+        self.assertIn('colspan="4"', RecordTable(["status", "submitter"], []).body)
+
+    def test_explorer_supports_large_page_sizes(self):
+        self.client.force_login(self.user)
+
+        large = self.client.get(reverse("record_list"), {"per_page": "200"})
+        unsupported = self.client.get(reverse("record_list"), {"per_page": "10000"})
+
+        self.assertEqual(len(large.context["page_obj"]), 200)
+        self.assertEqual(large.content.decode().count('name="ids"'), 200)
+        self.assertEqual(unsupported.context["per_page"], 25)
+
+
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username="analyst", password="password123")
+        self.client.force_login(self.user)
+
+    def test_router_sends_portal_reads_to_the_active_alias_only(self):
+        router = ReplicaRouter()
+
+        with read_from("replica"):
+            self.assertEqual(router.db_for_read(LabRecord), "replica")
+            self.assertIsNone(router.db_for_read(get_user_model()))
+            self.assertEqual(router.db_for_write(LabRecord), "default")
+        self.assertIsNone(router.db_for_read(LabRecord))
+        with self.settings(REPLICA_DATABASE="replica"):
+            self.assertFalse(router.allow_migrate("replica", "portal"))
+
+    def _aliases_seen_by_record_list(self):
+        seen = []
+
+        def spy(*args, **kwargs):
+            seen.append(current_read_alias())
+            return build_record_query(*args, **kwargs)
+
+        with mock.patch("portal.views.build_record_query", side_effect=spy):
+            self.client.get(reverse("record_list"))
+        return seen
+
+    def test_reads_use_replica_until_the_session_writes(self):
+        # "default" stands in for the replica alias: the test database has one.
+        with self.settings(REPLICA_DATABASE="default"):
+            self.assertEqual(self._aliases_seen_by_record_list(), ["default"])
+
+            self.client.post(
+                reverse("record_create"),
+                {
+                    "sample_code": "LAB-2026-0001",
+                    "submitter": "User One",
+                    "project": "Oncology",
+                    "received_at": timezone.localdate().isoformat(),
+                    "status": LabRecord.Status.RECEIVED,
+                    "qc_score": 80,
+                    "read_count": 0,
+                },
+            )
+
+            self.assertIn(PRIMARY_PIN_SESSION_KEY, self.client.session)
+            self.assertEqual(self._aliases_seen_by_record_list(), [None])
+
+    def test_streamed_exports_read_from_the_replica(self):
+        def stream(*args, **kwargs):
+            yield (current_read_alias() or "primary").encode()
+
+        with self.settings(REPLICA_DATABASE="default"), mock.patch("portal.views.stream_export", side_effect=stream):
+            response = self.client.get(reverse("record_export"))
+            body = b"".join(response.streaming_content)
+
+        self.assertEqual(body, b"default")
+        self.assertIsNone(current_read_alias())
+
+
+class ApproximateCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        today = timezone.localdate()
+        for index in range(1, 6):
+            LabRecord.objects.create(
+                sample_code=f"LAB-2026-{index:04d}",
+                submitter="User One",
+                project="Oncology",
+                received_at=today,
+                status=LabRecord.Status.RECEIVED if index <= 3 else LabRecord.Status.IN_PROGRESS,
+                qc_score=60 + index,
+            )
+
+    def test_count_display(self):
+        self.assertEqual(str(RecordCount(1234)), "1,234")
+        self.assertEqual(str(RecordCount(123456, exact=False)), "about 120,000")
+        self.assertEqual(str(RecordCount(10000, exact=False, lower_bound=True)), "more than 10,000")
+        self.assertEqual(RecordCount(40, exact=False) // 25, 1)
+
+    def test_rollup_filter_counts_without_scanning_records(self):
+        with CaptureQueriesContext(connection) as ctx:
+            count = count_records(LabRecord.objects.filter(status="received"), {"status": "received"})
+
+        self.assertEqual((count, count.exact), (3, True))
+        self.assertNotIn('FROM "portal_labrecord"', ctx.captured_queries[0]["sql"])
+
+    def test_exact_below_threshold_and_lower_bound_on_sqlite(self):
+        filtered = LabRecord.objects.filter(qc_score__gte=62)
+
+        exact = count_records(filtered, threshold=10)
+        capped = count_records(filtered, threshold=2)
+
+        self.assertEqual((exact, exact.exact), (4, True))
+        self.assertEqual((capped, capped.exact, str(capped)), (2, False, "more than 2"))
+
+    def test_explorer_and_admin_show_counts(self):
+        user = get_user_model().objects.create_superuser(username="admin", password="password123")
+        self.client.force_login(user)
+
+        explorer = self.client.get(reverse("record_list"))
+        with CaptureQueriesContext(connection) as ctx:
+            changelist = self.client.get(reverse("admin:portal_labrecord_changelist"))
+            filtered = self.client.get(reverse("admin:portal_labrecord_changelist"), {"status__exact": "received"})
+
+        self.assertContains(explorer, "5 records")
+        self.assertContains(changelist, "5 lab records")
+        self.assertContains(filtered, "3 results (<a")
+        self.assertContains(filtered, "5 total")
+        full_count = 'SELECT COUNT(*) AS "__count" FROM "portal_labrecord"'
+        self.assertFalse([query for query in ctx.captured_queries if query["sql"].startswith(full_count)])
+
+    def test_pages_past_an_estimated_count_stay_reachable(self):
+        user = get_user_model().objects.create_superuser(username="admin", password="password123")
+        self.client.force_login(user)
+        queryset = LabRecord.objects.filter(qc_score__gte=0).order_by("id")
+        estimate = RecordCount(2, exact=False, lower_bound=True)
+
+        with mock.patch.object(ApproximateCountPaginator, "count", estimate):
+            paginator = ApproximateCountPaginator(queryset, per_page=2)
+            with mock.patch.object(LabRecordAdmin, "list_per_page", 2):
+                changelist = self.client.get(
+                    reverse("admin:portal_labrecord_changelist"), {"qc_score__gte": "0", "p": "3"}
+                )
+
+            self.assertEqual([record.sample_code for record in paginator.page(3)], ["LAB-2026-0005"])
+            with self.assertRaises(EmptyPage):
+                paginator.page(4)
+        self.assertContains(changelist, "LAB-2026-0005")
+        self.assertContains(changelist, 'name="action"')
+
+
+class RecordChangeLogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.user = get_user_model().objects.create_user(username="reader", password="password123")
+        self.client.force_login(self.user)
+
+    def _create(self, index, **extra):
+        return LabRecord.objects.create(
+            sample_code=f"LAB-2026-{index:04d}",
+            submitter="User One",
+            project="Oncology",
+            received_at=self.today,
+            qc_score=80,
+            **extra,
+        )
+
+    def test_every_write_path_appends_in_sequence(self):
+        record = self._create(1)
+        self._create(2)
+        record.qc_score = 85
+        record.save()
+        transition_records(LabRecord.Status.IN_PROGRESS, sample_codes=["LAB-2026-0002"])
+        record.delete()
+
+        changes = list(LabRecordChange.objects.values_list("sequence", "action", "sample_code"))
+        self.assertEqual(
+            changes,
+            [
+                (1, "created", "LAB-2026-0001"),
+                (2, "created", "LAB-2026-0002"),
+                (3, "updated", "LAB-2026-0001"),
+                (4, "updated", "LAB-2026-0002"),
+                (5, "deleted", "LAB-2026-0001"),
+            ],
+        )
+        self.assertEqual(LabRecordChange.objects.get(sequence=4).data["status"], "in_progress")
+        self.assertEqual(ChangeLogState.objects.get().last_sequence, 5)
+
+    def test_failed_write_leaves_no_change(self):
+        self._create(1)
+        with self.assertRaises(ValidationError):
+            self._create(2, status=LabRecord.Status.COMPLETED)
+
+        self.assertEqual(LabRecordChange.objects.count(), 1)
+
+    def test_api_pages_through_changes_with_cursor(self):
+        for index in range(1, 4):
+            self._create(index)
+
+        first = self.client.get(reverse("api_record_changes"), {"limit": 2}).json()
+        second = self.client.get(reverse("api_record_changes"), {"after": first["cursor"], "limit": 2}).json()
+
+        self.assertEqual([row["sequence"] for row in first["results"]], [1, 2])
+        self.assertEqual((first["cursor"], first["has_more"]), (2, True))
+        self.assertIn("after=2", first["next"])
+        self.assertEqual([row["sample_code"] for row in second["results"]], ["LAB-2026-0003"])
+        self.assertEqual((second["cursor"], second["has_more"]), (3, False))
+        self.assertEqual(self.client.get(reverse("api_record_changes"), {"after": "x"}).status_code, 400)
+
+    def test_compaction_keeps_latest_change_and_expires_old_cursors(self):
+        kept = self._create(1)
+        removed = self._create(2)
+        kept.qc_score = 90
+        kept.save()
+        removed.delete()
+        self._create(3)
+        LabRecordChange.objects.filter(sequence__lte=4).update(changed_at=timezone.now() - timedelta(days=60))
+
+        out = StringIO()
+        call_command("compact_record_changes", "--older-than-days", "30", stdout=out)
+
+        self.assertIn("Removed 2 superseded changes and 1 deletions", out.getvalue())
+        self.assertEqual(list(LabRecordChange.objects.values_list("sequence", flat=True)), [3, 5])
+        expired = self.client.get(reverse("api_record_changes"), {"after": 1})
+        self.assertEqual((expired.status_code, expired.json()["resume_after"]), (410, 5))
+
+        out = StringIO()
+        call_command("record_changes", "--after", "4", stdout=out, stderr=StringIO())
+        self.assertEqual([json.loads(line)["sequence"] for line in out.getvalue().splitlines()], [5])
+
+
+class FacetCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        today = timezone.localdate()
+        rows = [
+            ("Oncology", LabRecord.Status.RECEIVED, 55),
+            ("Oncology", LabRecord.Status.RECEIVED, 75),
+            ("Oncology", LabRecord.Status.IN_PROGRESS, 92),
+            ("Genomics", LabRecord.Status.RECEIVED, 88),
+        ]
+        for index, (project, status, qc_score) in enumerate(rows, start=1):
+            LabRecord.objects.create(
+                sample_code=f"LAB-2026-{index:04d}",
+                submitter="User One",
+                project=project,
+                received_at=today,
+                status=status,
+                qc_score=qc_score,
+            )
+        self.user = get_user_model().objects.create_user(username="viewer", password="password123")
+        self.client.force_login(self.user)
+
+    def test_counts_come_from_one_query_and_are_cached(self):
+        queryset = LabRecord.objects.filter(project="Oncology")
+
+        with CaptureQueriesContext(connection) as ctx:
+            counts = facet_counts(queryset)
+            facet_counts(queryset)
+
+        self.assertEqual(counts["status"], {"received": 2, "in_progress": 1})
+        self.assertEqual(counts["project"], {"Oncology": 3})
+        self.assertEqual(counts["qc_band"], {"low": 1, "medium": 1, "high": 1})
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_counts_follow_search_and_recompute_after_writes(self):
+        queryset = build_record_query(query="Genomics").queryset
+        self.assertEqual(facet_counts(queryset)["status"], {"received": 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            LabRecord.objects.filter(project="Genomics").get().delete()
+
+        self.assertEqual(facet_counts(build_record_query(query="Genomics").queryset)["status"], {})
+
+    def test_clicking_a_facet_narrows_the_explorer(self):
+        response = self.client.get(reverse("record_list"), {"project": "Oncology", "per_page": 50})
+
+        facets = {facet.name: facet for facet in response.context["facets"]}
+        self.assertEqual(response.context["record_count"], 3)
+        self.assertEqual(
+            [(option.value, option.count) for option in facets["status"].options], [("received", 2), ("in_progress", 1)]
+        )
+        selected = facets["project"].options[0]
+        self.assertTrue(selected.selected)
+        self.assertEqual(selected.url, "?per_page=50")
+        self.assertIn("qc_band=low", facets["qc_band"].options[0].url)
+        narrowed = self.client.get(reverse("record_list") + facets["qc_band"].options[0].url)
+        self.assertEqual(narrowed.context["record_count"], 1)
+        self.assertNotContains(narrowed, "LAB-2026-0002")
+
+
+class SavedViewFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.user = get_user_model().objects.create_user(username="tester", password="password123")
+        rows = [
+            # project, submitter, received days ago, turnaround days, read_count
+            ("Oncology", "A. James", 20, 3, 2_000_000),
+            ("Oncology", "B. Lee", 15, 12, 3_000_000),
+            ("Oncology", "A. James", 5, None, 500_000),
+            ("Genomics", "A. James", 10, 2, 4_000_000),
+        ]
+        for index, (project, submitter, age, turnaround, read_count) in enumerate(rows, start=1):
+            received_at = self.today - timedelta(days=age)
+            LabRecord.objects.create(
+                sample_code=f"LAB-2026-{index:04d}",
+                submitter=submitter,
+                project=project,
+                received_at=received_at,
+                processed_at=received_at + timedelta(days=turnaround) if turnaround is not None else None,
+                status=LabRecord.Status.COMPLETED if turnaround is not None else LabRecord.Status.RECEIVED,
+                qc_score=80,
+                read_count=read_count,
+            )
+
+    def _view(self, filters, **extra):
+        return SavedView(user=self.user, name="Filtered", visible_columns=["sample_code"], filters=filters, **extra)
+
+    def _codes(self, view):
+        return sorted(view.apply_to_queryset(LabRecord.objects.all()).values_list("sample_code", flat=True))
+
+    def test_clean_rejects_unknown_keys_and_inverted_ranges(self):
+        with self.assertRaises(ValidationError) as ctx:
+            self._view({"colour": "red", "read_count": {"min": 10, "max": 5}}).full_clean()
+
+        messages = ctx.exception.message_dict["filters"]
+        self.assertIn("colour: Unknown filter.", messages)
+        self.assertIn("read_count: The range starts after it ends.", messages)
+        with self.assertRaises(ValidationError):
+            self._view({"received_at": {"from": "yesterday"}}).full_clean()
+
+    def test_structured_filters_compile_to_one_cached_q_tree(self):
+        since = (self.today - timedelta(days=18)).isoformat()
+        view = self._view(
+            {
+                "received_at": {"from": since},
+                "projects": [" Oncology", "Genomics", ""],
+                "submitters": [],
+                "read_count": {"min": 1_000_000, "max": None},
+                "turnaround_days": {"max": 7},
+            }
+        )
+        view.save()
+        view.refresh_from_db()
+        compile_filters.cache_clear()
+
+        self.assertEqual(self._codes(view), ["LAB-2026-0004"])
+        self.assertEqual(self._codes(SavedView.objects.get(pk=view.pk)), ["LAB-2026-0004"])
+        self.assertEqual(compile_filters.cache_info().misses, 1)
+        self.assertEqual(view.filters["projects"], ["Genomics", "Oncology"])
+        self.assertNotIn("submitters", view.filters)
+        self.assertEqual(self._codes(self._view({"turnaround_days": {"min": 10}})), ["LAB-2026-0002"])
+        low_reads = self._view({"submitters": ["A. James"], "read_count": {"max": 1_000_000}})
+        self.assertEqual(self._codes(low_reads), ["LAB-2026-0003"])
+
+    def test_rollup_filter_covers_received_dates_and_projects_only(self):
+        since = self.today - timedelta(days=16)
+        by_date = self._view({"received_at": {"from": since.isoformat()}, "projects": ["Oncology"]})
+        by_submitter = self._view({"submitters": ["B. Lee"]})
+
+        record_query = build_record_query(by_date)
+
+        self.assertEqual(by_date.rollup_filter(), {"day__gte": since, "project__in": ["Oncology"]})
+        self.assertEqual(count_records(record_query.queryset, record_query.rollup_filter), 2)
+        self.assertIsNone(by_submitter.rollup_filter())
+
+    def test_form_builds_filters_and_reports_field_errors(self):
+        self.client.force_login(self.user)
+        data = {
+            "name": "Recent Oncology",
+            "visible_columns": ["sample_code", "project"],
+            "ordering": "-received_at",
+            "projects": "Oncology,\nGenomics",
+            "min_turnaround_days": "1",
+            "max_turnaround_days": "7",
+        }
+
+        invalid = self.client.post(reverse("saved_view_create"), {**data, "min_read_count": "9", "max_read_count": "1"})
+        self.client.post(reverse("saved_view_create"), data)
+
+        self.assertFormError(invalid.context["form"], "min_read_count", "The range starts after it ends.")
+        view = SavedView.objects.get(name="Recent Oncology")
+        self.assertEqual(view.filters, {"projects": ["Genomics", "Oncology"], "turnaround_days": {"min": 1, "max": 7}})
+        self.assertEqual(view.filter_summary, "Turnaround (days) 1 to 7; Project: Genomics, Oncology")
+
+
+@override_settings(SAMPLE_CODE_PREFIX="LAB", INGEST_TOKEN="pipeline-secret")
+class SampleCodeAllocatorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.user = get_user_model().objects.create_user(username="analyst", password="password123")
+
+    def test_blocks_continue_after_hand_entered_codes(self):
+        for code in ("LAB-2026-0007", "LAB-2026-0012", "LABX-2026-0099", "LAB-2025-0500"):
+            LabRecord.objects.create(
+                sample_code=code, submitter="A", project="Oncology", received_at=self.today, qc_score=80
+            )
+
+        first = allocate_sample_codes(3, year=2026)
+        with CaptureQueriesContext(connection) as ctx:
+            second = allocate_sample_codes(2, "lab", 2026)
+
+        self.assertEqual(first, ["LAB-2026-0013", "LAB-2026-0014", "LAB-2026-0015"])
+        self.assertEqual(second, ["LAB-2026-0016", "LAB-2026-0017"])
+        self.assertEqual(allocate_sample_codes(1, "LABX", 2026), ["LABX-2026-0100"])
+        self.assertEqual(SampleCodeCounter.objects.get(prefix="LAB", year=2026).last_number, 17)
+        bumps = [query for query in ctx.captured_queries if "samplecodecounter" in query["sql"].lower()]
+        self.assertEqual(len(bumps), 1 if connection.features.can_return_columns_from_insert else 2)
+
+    def test_codes_typed_after_seeding_are_skipped(self):
+        self.assertEqual(allocate_sample_codes(2, year=2026), ["LAB-2026-0001", "LAB-2026-0002"])
+        for code in ("LAB-2026-0003", "LAB-2026-0009"):
+            LabRecord.objects.create(
+                sample_code=code, submitter="A", project="Oncology", received_at=self.today, qc_score=80
+            )
+
+        self.assertEqual(allocate_sample_codes(2, year=2026), ["LAB-2026-0010", "LAB-2026-0011"])
+        self.assertEqual(allocate_sample_codes(1, year=2026, reserved={"LAB-2026-0012"}), ["LAB-2026-0013"])
+
+    def test_code_taken_after_validation_is_a_form_error(self):
+        LabRecord.objects.create(
+            sample_code="LAB-2026-0001", submitter="A", project="Oncology", received_at=self.today, qc_score=80
+        )
+        self.client.force_login(self.user)
+        data = {
+            "sample_code": "",
+            "code_prefix": "LAB",
+            "submitter": "User One",
+            "project": "Oncology",
+            "received_at": "2026-03-02",
+            "status": LabRecord.Status.RECEIVED,
+            "qc_score": 80,
+            "read_count": 0,
+        }
+
+        with mock.patch("portal.forms.allocate_sample_codes", return_value=["LAB-2026-0001"]):
+            response = self.client.post(reverse("record_create"), data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["form"].has_error("sample_code"))
+        self.assertEqual(LabRecord.objects.count(), 1)
+
+    def test_invalid_requests_are_rejected_without_allocating(self):
+        for kwargs in ({"prefix": "lab1"}, {"prefix": "L"}, {"count": 0}, {"year": 26}):
+            with self.assertRaises(ValidationError):
+                allocate_sample_codes(**kwargs)
+        self.assertFalse(SampleCodeCounter.objects.exists())
+
+    def test_form_assigns_a_code_when_left_blank(self):
+        self.client.force_login(self.user)
+        data = {
+            "sample_code": "",
+            "code_prefix": "seq",
+            "submitter": "User One",
+            "project": "Oncology",
+            "received_at": "2026-03-02",
+            "status": LabRecord.Status.RECEIVED,
+            "qc_score": 80,
+            "read_count": 0,
+        }
+
+        invalid = self.client.post(reverse("record_create"), {**data, "qc_score": 150})
+        bad_prefix = self.client.post(reverse("record_create"), {**data, "code_prefix": "S1"})
+        self.client.post(reverse("record_create"), data)
+        self.client.post(reverse("record_create"), data)
+
+        self.assertEqual(invalid.status_code, 200)
+        self.assertFormError(bad_prefix.context["form"], "code_prefix", "Use 2 to 6 letters, like LAB.")
+        codes = LabRecord.objects.order_by("sample_code").values_list("sample_code", flat=True)
+        self.assertEqual(list(codes), ["SEQ-2026-0001", "SEQ-2026-0002"])
+
+    def test_importer_assigns_codes_per_received_year(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / "sheet.csv"
+        path.write_text(
+            "sample_code,submitter,project,received_at,qc_score\n"
+            ",A,Oncology,2025-12-30,90\n"
+            "SEQ-2026-0001,A,Oncology,2026-01-02,90\n"
+            ",A,Oncology,2026-01-02,90\n"
+            ",A,Oncology,2026-01-03,90\n"
+        )
+
+        call_command("import_records", str(path), "--code-prefix", "SEQ", stdout=StringIO())
+
+        codes = LabRecord.objects.order_by("sample_code").values_list("sample_code", flat=True)
+        self.assertEqual(list(codes), ["SEQ-2025-0001", "SEQ-2026-0001", "SEQ-2026-0002", "SEQ-2026-0003"])
+        self.assertEqual(LabRecordChange.objects.filter(action=LabRecordChange.Action.CREATED).count(), 4)
+
+    def test_api_reserves_a_block(self):
+        url = reverse("api_sample_codes")
+
+        headers = {"Authorization": "Bearer pipeline-secret"}
+
+        response = self.client.post(url, {"count": 3, "year": 2026}, content_type="application/json", headers=headers)
+        too_many = self.client.post(url, {"count": 5000}, content_type="application/json", headers=headers)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["sample_codes"], ["LAB-2026-0001", "LAB-2026-0002", "LAB-2026-0003"])
+        self.assertEqual(too_many.status_code, 400)
+        self.assertEqual(self.client.post(url, {}, content_type="application/json").status_code, 401)
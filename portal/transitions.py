@@ -0,0 +1,94 @@
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, CharField, Q, Value, When
+from django.utils import timezone
+
+from .data_version import mark_records_changed
+from .models import DailyRecordStats, LabRecord, LabRecordChange
+
+MAX_BULK_RECORDS = 5000
+NOT_FOUND = "Record not found."
+PROCESSED_BEFORE_RECEIVED = "Processed date cannot be earlier than received date."
+PROCESSED_REQUIRED = "Processed date is required when status is completed or failed."
+FINISHED_STATUSES = {LabRecord.Status.COMPLETED, LabRecord.Status.FAILED}
+
+
+@dataclass(frozen=True)
+class RejectedRecord:
+    key: str
+    reason: str
+
+
+@dataclass
+class TransitionResult:
+    updated: list = field(default_factory=list)
+    rejected: list = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {
+            "updated": len(self.updated),
+            "updated_sample_codes": self.updated,
+            "rejected": [{"key": row.key, "reason": row.reason} for row in self.rejected],
+        }
+
+
+def _rejection_reason(status, processed_at):
+    # The per-row half of LabRecord.clean(), evaluated by the database for the
+    # whole set in the same query that locks the rows.
+    whens = []
+    if processed_at is not None:
+        whens.append(When(received_at__gt=processed_at, then=Value(PROCESSED_BEFORE_RECEIVED)))
+    elif status in FINISHED_STATUSES:
+        whens.append(When(processed_at__isnull=True, then=Value(PROCESSED_REQUIRED)))
+    return Case(*whens, default=Value(""), output_field=CharField())
+
+
+def transition_records(status, processed_at=None, ids=(), sample_codes=()) -> TransitionResult:
+    # processed_at is only written when given; otherwise each row keeps its own.
+    if status not in LabRecord.Status.values:
+        raise ValidationError({"status": f"Unknown status: {status}"})
+    ids = {int(value) for value in ids}
+    sample_codes = set(sample_codes)
+    if len(ids) + len(sample_codes) > MAX_BULK_RECORDS:
+        raise ValidationError(f"At most {MAX_BULK_RECORDS} records can be updated at once.")
+
+    result = TransitionResult()
+    with transaction.atomic():
+        rows = list(
+            LabRecord.objects.select_for_update()
+            .filter(Q(id__in=ids) | Q(sample_code__in=sample_codes))
+            .order_by("id")
+            .annotate(rejection=_rejection_reason(status, processed_at))
+            .values_list("id", "sample_code", "rejection", *DailyRecordStats.SOURCE_FIELDS, named=True)
+        )
+
+        valid_ids = []
+        previous = []
+        for row in rows:
+            if row.rejection:
+                result.rejected.append(RejectedRecord(row.sample_code, row.rejection))
+            else:
+                valid_ids.append(row.id)
+                previous.append({name: getattr(row, name) for name in DailyRecordStats.SOURCE_FIELDS})
+                result.updated.append(row.sample_code)
+
+        found_ids = {row.id for row in rows}
+        found_codes = {row.sample_code for row in rows}
+        result.rejected.extend(RejectedRecord(str(value), NOT_FOUND) for value in sorted(ids - found_ids))
+        result.rejected.extend(RejectedRecord(value, NOT_FOUND) for value in sorted(sample_codes - found_codes))
+
+        if valid_ids:
+            changes = {"status": status, "updated_at": timezone.now()}
+            if processed_at is not None:
+                changes["processed_at"] = processed_at
+            LabRecord.objects.filter(id__in=valid_ids).update(**changes)
+            LabRecordChange.log_records(LabRecord.objects.filter(id__in=valid_ids), LabRecordChange.Action.UPDATED)
+            # Only the status moves, so each row shifts between buckets of its
+            # locked day, project and QC score.
+            DailyRecordStats.apply_deltas(
+                removed=previous, added=[{**values, "status": status} for values in previous]
+            )
+            mark_records_changed()
+    return result
@@ -1,14 +1,25 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 urlpatterns = [
     path("", views.dashboard, name="dashboard"),
+    path("dashboard/async/", views.dashboard_async, name="dashboard_async"),
+    path("dashboard/stream/", views.dashboard_stream, name="dashboard_stream"),
     path("records/", views.record_list, name="record_list"),
+    path("records/export/", views.record_export, name="record_export"),
+    path("records/bulk-status/", views.record_bulk_status, name="record_bulk_status"),
     path("records/new/", views.record_create, name="record_create"),
     path("records/<int:pk>/edit/", views.record_edit, name="record_edit"),
     path("views/", views.saved_view_list, name="saved_view_list"),
     path("views/new/", views.saved_view_create, name="saved_view_create"),
     path("views/<int:pk>/edit/", views.saved_view_edit, name="saved_view_edit"),
     path("views/<int:pk>/delete/", views.saved_view_delete, name="saved_view_delete"),
+    path("api/v1/dashboard/", api.dashboard, name="api_dashboard"),
+    path("api/v1/changes/", api.record_changes, name="api_record_changes"),
+    path("api/v1/sample-codes/", api.sample_codes, name="api_sample_codes"),
+    path("api/v1/records/", api.record_list, name="api_record_list"),
+    path("api/v1/records/bulk-status/", api.record_bulk_status, name="api_record_bulk_status"),
+    path("api/v1/records/ingest/", api.record_ingest, name="api_record_ingest"),
+    path("api/v1/records/<str:sample_code>/", api.record_detail, name="api_record_detail"),
 ]
@@ -0,0 +1,84 @@
+from dataclasses import dataclass, field
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.http import Http404
+
+from .models import SavedView
+
+MANAGEMENT_GROUP = "management"
+# Writes bump the user's version in the shared cache; the short lifetime bounds
+# how long a missed invalidation (lost key, process-local cache) can linger.
+USER_CONTEXT_CACHE_TIMEOUT = 60
+
+
+def _version_key(user_id) -> str:
+    return f"portal:user-context-version:{user_id}"
+
+
+def _data_key(user_id, version) -> str:
+    return f"portal:user-context:{user_id}:{version}"
+
+
+@dataclass(frozen=True)
+class UserContext:
+    user: object
+    in_management_group: bool
+    saved_views: list = field(default_factory=list)
+
+    @property
+    def is_management(self) -> bool:
+        return self.user.is_superuser or self.user.is_staff or self.in_management_group
+
+    @property
+    def default_view(self):
+        for view in self.saved_views:
+            if view.is_default:
+                return view
+        return self.saved_views[0] if self.saved_views else None
+
+    def get_view(self, view_id):
+        for view in self.saved_views:
+            if str(view.pk) == str(view_id):
+                return view
+        raise Http404("Saved view not found.")
+
+    def select_view(self, view_id=None):
+        if view_id:
+            return self.get_view(view_id)
+        return self.default_view
+
+
+def _load(user) -> tuple[bool, list]:
+    in_management_group = user.groups.filter(name__iexact=MANAGEMENT_GROUP).exists()
+    saved_views = list(SavedView.objects.filter(user=user).order_by("-is_default", "name"))
+    return in_management_group, saved_views
+
+
+def get_user_context(request) -> UserContext:
+    # Memoized on the request, and cached per user across requests for up to
+    # a minute, or until a saved view or group membership change bumps that
+    # user's version.
+    context = getattr(request, "_portal_user_context", None)
+    if context is not None:
+        return context
+
+    user = request.user
+    version = cache.get(_version_key(user.pk))
+    if version is None:
+        version = uuid4().hex
+        cache.set(_version_key(user.pk), version, timeout=None)
+
+    data_key = _data_key(user.pk, version)
+    cached = cache.get(data_key)
+    if cached is None:
+        cached = _load(user)
+        cache.set(data_key, cached, timeout=USER_CONTEXT_CACHE_TIMEOUT)
+
+    context = UserContext(user=user, in_management_group=cached[0], saved_views=cached[1])
+    request._portal_user_context = context
+    return context
+
+
+def invalidate_user_context(*user_ids) -> None:
+    cache.delete_many([_version_key(user_id) for user_id in user_ids])
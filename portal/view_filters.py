@@ -0,0 +1,168 @@
+import json
+from datetime import date, timedelta
+from functools import lru_cache
+
+from django.db.models import F, Q
+from django.db.models.lookups import GreaterThanOrEqual, LessThanOrEqual
+
+# Structured SavedView.filters, e.g.
+# {"received_at": {"from": "2026-01-01", "to": "2026-03-31"}, "projects": ["Oncology"],
+#  "read_count": {"min": 1000000}, "turnaround_days": {"max": 7}}
+DATE_RANGE_FILTERS = {"received_at": "Received", "processed_at": "Processed"}
+SET_FILTERS = {"projects": "project", "submitters": "submitter"}
+NUMBER_RANGE_FILTERS = {"read_count": "Read count", "turnaround_days": "Turnaround (days)"}
+FILTER_KEYS = {*DATE_RANGE_FILTERS, *SET_FILTERS, *NUMBER_RANGE_FILTERS}
+MAX_SET_VALUES = 200
+MAX_SET_VALUE_LENGTH = 120
+
+
+def _date_or_none(value):
+    if value in (None, ""):
+        return None
+    if not isinstance(value, str):
+        raise ValueError
+    return date.fromisoformat(value)
+
+
+def _validate_range(name, bounds, parse, lower, upper, errors):
+    if not isinstance(bounds, dict) or set(bounds) - {lower, upper}:
+        errors[name] = f'Use {{"{lower}": ..., "{upper}": ...}}.'
+        return
+    try:
+        low, high = parse(bounds.get(lower)), parse(bounds.get(upper))
+    except (TypeError, ValueError):
+        errors[name] = "Enter valid bounds."
+        return
+    if low is not None and high is not None and low > high:
+        errors[name] = "The range starts after it ends."
+
+
+def _count_or_none(value):
+    if value in (None, ""):
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise ValueError
+    return value
+
+
+def validate_filters(filters) -> dict[str, str]:
+    # {filter key: message}; empty when the definition is usable.
+    if not isinstance(filters, dict):
+        return {"filters": "Filters must be an object."}
+    errors = {}
+    for name in sorted(set(filters) - FILTER_KEYS):
+        errors[name] = "Unknown filter."
+    for name in DATE_RANGE_FILTERS:
+        if name in filters:
+            _validate_range(name, filters[name], _date_or_none, "from", "to", errors)
+    for name in NUMBER_RANGE_FILTERS:
+        if name in filters:
+            _validate_range(name, filters[name], _count_or_none, "min", "max", errors)
+    for name in SET_FILTERS:
+        values = filters.get(name, [])
+        if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+            errors[name] = "Enter a list of names."
+        elif len(values) > MAX_SET_VALUES:
+            errors[name] = f"At most {MAX_SET_VALUES} values."
+        elif any(len(value) > MAX_SET_VALUE_LENGTH for value in values):
+            errors[name] = f"Names are at most {MAX_SET_VALUE_LENGTH} characters."
+    return errors
+
+
+def normalize_filters(filters: dict) -> dict:
+    # Drops empty bounds and lists and trims names, so "no filter" is always
+    # stored as an absent key. Assumes validate_filters() passed.
+    normalized = {}
+    for name in [*DATE_RANGE_FILTERS, *NUMBER_RANGE_FILTERS]:
+        bounds = {key: value for key, value in filters.get(name, {}).items() if value not in (None, "")}
+        if bounds:
+            normalized[name] = bounds
+    for name in SET_FILTERS:
+        values = sorted({value.strip() for value in filters.get(name, [])} - {""})
+        if values:
+            normalized[name] = values
+    return normalized
+
+
+def describe_filters(filters: dict) -> str:
+    parts = []
+    ranges = [(DATE_RANGE_FILTERS, "from", "to"), (NUMBER_RANGE_FILTERS, "min", "max")]
+    for labels, lower, upper in ranges:
+        for name, label in labels.items():
+            bounds = filters.get(name, {})
+            low, high = bounds.get(lower), bounds.get(upper)
+            if low is not None and high is not None:
+                parts.append(f"{label} {low} to {high}")
+            elif low is not None:
+                parts.append(f"{label} from {low}")
+            elif high is not None:
+                parts.append(f"{label} up to {high}")
+    for name, field in SET_FILTERS.items():
+        if filters.get(name):
+            parts.append(f"{field.title()}: {', '.join(filters[name])}")
+    return "; ".join(parts)
+
+
+def filter_definition(status="", min_qc_score=None, filters=None) -> str:
+    # Canonical JSON of everything a view filters on; it changes exactly when
+    # the view's filters do, so it doubles as the compiled-filter cache key.
+    spec = {"status": status, "min_qc_score": min_qc_score, "filters": filters or {}}
+    return json.dumps(spec, sort_keys=True, separators=(",", ":"))
+
+
+@lru_cache(maxsize=512)
+def compile_filters(definition: str) -> Q:
+    # Plain column comparisons (ranges, equality, IN) so the planner can use
+    # the status/received_at/qc_score/project indexes; only the turnaround
+    # bounds need an expression, and they imply processed_at IS NOT NULL.
+    spec = json.loads(definition)
+    filters = spec["filters"]
+    q = Q()
+    if spec["status"]:
+        q &= Q(status=spec["status"])
+    if spec["min_qc_score"] is not None:
+        q &= Q(qc_score__gte=spec["min_qc_score"])
+    for name in DATE_RANGE_FILTERS:
+        bounds = filters.get(name, {})
+        if bounds.get("from"):
+            q &= Q(**{f"{name}__gte": date.fromisoformat(bounds["from"])})
+        if bounds.get("to"):
+            q &= Q(**{f"{name}__lte": date.fromisoformat(bounds["to"])})
+    for name, field in SET_FILTERS.items():
+        values = filters.get(name, [])
+        if len(values) == 1:
+            q &= Q(**{field: values[0]})
+        elif values:
+            q &= Q(**{f"{field}__in": values})
+    read_count = filters.get("read_count", {})
+    if read_count.get("min") is not None:
+        q &= Q(read_count__gte=read_count["min"])
+    if read_count.get("max") is not None:
+        q &= Q(read_count__lte=read_count["max"])
+    turnaround = filters.get("turnaround_days", {})
+    if turnaround.get("min") is not None or turnaround.get("max") is not None:
+        elapsed = F("processed_at") - F("received_at")
+        q &= Q(processed_at__isnull=False)
+        if turnaround.get("min") is not None:
+            q &= Q(GreaterThanOrEqual(elapsed, timedelta(days=turnaround["min"])))
+        if turnaround.get("max") is not None:
+            q &= Q(LessThanOrEqual(elapsed, timedelta(days=turnaround["max"])))
+    return q
+
+
+def rollup_lookups(definition: str):
+    # The DailyRecordStats lookups equivalent to the definition, or None when
+    # it filters on something the rollup does not keep.
+    spec = json.loads(definition)
+    filters = spec["filters"]
+    if spec["min_qc_score"] is not None or set(filters) - {"received_at", "projects"}:
+        return None
+    lookups = {"status": spec["status"]} if spec["status"] else {}
+    bounds = filters.get("received_at", {})
+    if bounds.get("from"):
+        lookups["day__gte"] = date.fromisoformat(bounds["from"])
+    if bounds.get("to"):
+        lookups["day__lte"] = date.fromisoformat(bounds["to"])
+    if filters.get("projects"):
+        lookups["project__in"] = filters["projects"]
+    return lookups
@@ -1,128 +1,164 @@
 import json
-from datetime import timedelta
 
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.db.models import Avg, Count, Q
-from django.db.models.functions import TruncDate
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.utils import timezone
-
-from .forms import LabRecordForm, SavedViewForm
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.utils.text import slugify
+from django.views.decorators.http import require_POST
+
+from .columns import RecordTable, project_records
+from .counts import count_records
+from .dashboard import aget_dashboard_payload, get_dashboard_payload
+from .exports import EXPORT_FORMATS, parquet_available, stream_export
+from .facets import build_facets, facet_selection
+from .forms import BulkStatusForm, LabRecordForm, SavedViewForm
+from .live import get_broadcaster
 from .models import LabRecord, SavedView
-
-DEFAULT_COLUMNS = [
-    "sample_code",
-    "project",
-    "submitter",
-    "status",
-    "received_at",
-    "processed_at",
-    "qc_score",
-    "read_count",
-]
+from .pagination import KeysetPaginator
+from .queries import DEFAULT_COLUMNS, build_record_query
+from .routers import replica_reads
+from .transitions import transition_records
+from .user_context import get_user_context
+
+RECORDS_PER_PAGE = 25
+PAGE_SIZE_CHOICES = (25, 50, 100, 200, 500)
+REJECTED_MESSAGE_LIMIT = 10
+
+
+def _dashboard_context(management_mode, payload) -> dict:
+    return {
+        "management_mode": management_mode,
+        **payload,
+        "status_chart": json.dumps(payload["status_chart"]),
+        "trend_chart": json.dumps(payload["trend_chart"]),
+    }
 
 
-def _is_management_user(user) -> bool:
-    return user.is_superuser or user.is_staff or user.groups.filter(name__iexact="management").exists()
+@login_required
+@replica_reads
+def dashboard(request):
+    management_mode = get_user_context(request).is_management
+    payload = get_dashboard_payload(include_management=management_mode)
+    return render(request, "portal/dashboard.html", _dashboard_context(management_mode, payload))
 
 
 @login_required
-def dashboard(request):
-    records = LabRecord.objects.all()
-    total_records = records.count()
-    completed_count = records.filter(status=LabRecord.Status.COMPLETED).count()
-    pending_count = records.filter(status__in=[LabRecord.Status.RECEIVED, LabRecord.Status.IN_PROGRESS]).count()
-    failed_count = records.filter(status=LabRecord.Status.FAILED).count()
-    avg_qc = records.aggregate(value=Avg("qc_score"))["value"]
-
-    window_start = timezone.localdate() - timedelta(days=30)
-    recent_trend = (
-        records.filter(received_at__gte=window_start)
-        .annotate(day=TruncDate("received_at"))
-        .values("day")
-        .annotate(total=Count("id"))
-        .order_by("day")
-    )
-    trend_labels = [row["day"].isoformat() for row in recent_trend]
-    trend_values = [row["total"] for row in recent_trend]
+@replica_reads
+async def dashboard_async(request):
+    management_mode = (await sync_to_async(get_user_context)(request)).is_management
+    payload = await aget_dashboard_payload(include_management=management_mode)
+    # Template rendering touches the lazy request.user, so it stays synchronous.
+    return await sync_to_async(render)(request, "portal/dashboard.html", _dashboard_context(management_mode, payload))
 
-    status_totals = records.values("status").annotate(total=Count("id")).order_by("status")
-    status_lookup = dict(LabRecord.Status.choices)
-    status_labels = [status_lookup[row["status"]] for row in status_totals]
-    status_values = [row["total"] for row in status_totals]
 
-    seven_days_ago = timezone.localdate() - timedelta(days=7)
-    overdue_count = records.filter(
-        status__in=[LabRecord.Status.RECEIVED, LabRecord.Status.IN_PROGRESS],
-        received_at__lt=seven_days_ago,
-    ).count()
-    low_qc_count = records.filter(qc_score__lt=70).count()
+@login_required
+async def dashboard_stream(request):
+    # Server-Sent Events need a long-lived connection, which only ASGI serves
+    # without pinning a worker. 204 tells EventSource not to reconnect, so under
+    # WSGI the dashboard simply stays static.
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    management_mode = (await sync_to_async(get_user_context)(request)).is_management
+    response = StreamingHttpResponse(
+        get_broadcaster().stream(include_management=management_mode), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
-    completion_rate = None
-    if total_records:
-        completion_rate = round((completed_count / total_records) * 100, 1)
 
-    context = {
-        "management_mode": _is_management_user(request.user),
-        "total_records": total_records,
-        "completed_count": completed_count,
-        "pending_count": pending_count,
-        "failed_count": failed_count,
-        "avg_qc": round(avg_qc, 1) if avg_qc is not None else None,
-        "completion_rate": completion_rate,
-        "overdue_count": overdue_count,
-        "low_qc_count": low_qc_count,
-        "recent_records": records.order_by("-received_at", "-id")[:10],
-        "status_chart": json.dumps({"labels": status_labels, "values": status_values}),
-        "trend_chart": json.dumps({"labels": trend_labels, "values": trend_values}),
-    }
-    return render(request, "portal/dashboard.html", context)
+def _page_size(value) -> int:
+    if value and value.isdigit() and int(value) in PAGE_SIZE_CHOICES:
+        return int(value)
+    return RECORDS_PER_PAGE
 
 
 @login_required
+@replica_reads
 def record_list(request):
-    saved_views = SavedView.objects.filter(user=request.user).order_by("-is_default", "name")
-
-    selected_view = None
-    selected_view_id = request.GET.get("view")
-    if selected_view_id:
-        selected_view = get_object_or_404(saved_views, pk=selected_view_id)
-    else:
-        selected_view = saved_views.filter(is_default=True).first() or saved_views.first()
-
-    queryset = LabRecord.objects.all()
-    visible_columns = DEFAULT_COLUMNS
+    user_context = get_user_context(request)
+    selected_view = user_context.select_view(request.GET.get("view"))
+    record_query = build_record_query(selected_view, request.GET.get("q", ""), facet_selection(request.GET))
 
-    if selected_view:
-        queryset = selected_view.apply_to_queryset(queryset)
-        visible_columns = selected_view.visible_columns
-    else:
-        queryset = queryset.order_by("-received_at")
-
-    query = request.GET.get("q", "").strip()
-    if query:
-        queryset = queryset.filter(
-            Q(sample_code__icontains=query)
-            | Q(project__icontains=query)
-            | Q(submitter__icontains=query)
-            | Q(notes__icontains=query)
-        )
-
-    paginator = Paginator(queryset, 25)
-    page_obj = paginator.get_page(request.GET.get("page"))
+    queryset = project_records(
+        record_query.queryset, record_query.visible_columns, extra=[record_query.ordering.lstrip("-")]
+    )
+    per_page = _page_size(request.GET.get("per_page"))
+    paginator = KeysetPaginator(queryset, record_query.ordering, per_page=per_page)
+    page_obj = paginator.get_page(request.GET.get("cursor"))
 
     context = {
         "page_obj": page_obj,
-        "saved_views": saved_views,
+        "table": RecordTable(record_query.visible_columns, page_obj),
+        "record_count": count_records(record_query.queryset, record_query.rollup_filter),
+        "facets": build_facets(record_query.queryset, record_query.facets, request.GET),
+        "saved_views": user_context.saved_views,
         "selected_view": selected_view,
-        "visible_columns": visible_columns,
-        "query": query,
+        "query": record_query.query,
+        "per_page": per_page,
+        "page_size_choices": PAGE_SIZE_CHOICES,
+        "bulk_form": BulkStatusForm(),
     }
     return render(request, "portal/record_list.html", context)
 
 
+@login_required
+@require_POST
+def record_bulk_status(request):
+    next_url = request.POST.get("next", "")
+    if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        next_url = "record_list"
+
+    form = BulkStatusForm(request.POST)
+    ids = [value for value in request.POST.getlist("ids") if value.isdigit()]
+    if not ids:
+        messages.error(request, "Select at least one record.")
+        return redirect(next_url)
+    if not form.is_valid():
+        messages.error(request, "Choose a valid status and processed date.")
+        return redirect(next_url)
+
+    try:
+        result = transition_records(form.cleaned_data["status"], form.cleaned_data["processed_at"], ids=ids)
+    except ValidationError as exc:
+        messages.error(request, " ".join(exc.messages))
+        return redirect(next_url)
+
+    if result.updated:
+        messages.success(request, f"Updated {len(result.updated)} records.")
+    if result.rejected:
+        shown = "; ".join(f"{row.key}: {row.reason}" for row in result.rejected[:REJECTED_MESSAGE_LIMIT])
+        more = len(result.rejected) - REJECTED_MESSAGE_LIMIT
+        messages.warning(
+            request, f"Skipped {len(result.rejected)} records. {shown}" + (f" (and {more} more)" if more > 0 else "")
+        )
+    return redirect(next_url)
+
+
+@login_required
+@replica_reads
+def record_export(request):
+    export_format = request.GET.get("format", "csv")
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest("Unsupported export format.")
+    if export_format == "parquet" and not parquet_available():
+        return HttpResponseBadRequest("Parquet export requires pyarrow to be installed.")
+
+    selected_view = get_user_context(request).select_view(request.GET.get("view"))
+    record_query = build_record_query(selected_view, request.GET.get("q", ""), facet_selection(request.GET))
+
+    content_type, extension = EXPORT_FORMATS[export_format]
+    filename = f"records-{slugify(selected_view.name) if selected_view else 'all'}.{extension}"
+    response = StreamingHttpResponse(stream_export(record_query, export_format), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
 @login_required
 def record_create(request):
     if request.method == "POST":
@@ -130,9 +166,14 @@ def record_create(request):
         if form.is_valid():
             record = form.save(commit=False)
             record.created_by = request.user
-            record.save()
-            messages.success(request, "Record created.")
-            return redirect("record_list")
+            try:
+                record.save()
+            except ValidationError as exc:
+                # A matching code was saved elsewhere after the form validated.
+                form.add_error(None, exc)
+            else:
+                messages.success(request, "Record created.")
+                return redirect("record_list")
     else:
         form = LabRecordForm()
 
@@ -157,8 +198,7 @@ def record_edit(request, pk):
 
 @login_required
 def saved_view_list(request):
-    views = SavedView.objects.filter(user=request.user).order_by("-is_default", "name")
-    return render(request, "portal/saved_view_list.html", {"views": views})
+    return render(request, "portal/saved_view_list.html", {"views": get_user_context(request).saved_views})
 
 
 @login_required
@@ -14,11 +14,11 @@ function parseChartData(id) {
 function drawStatusChart() {
     const ctx = document.getElementById("statusChart");
     if (!ctx) {
-        return;
+        return null;
     }
 
     const data = parseChartData("status-data");
-    new Chart(ctx, {
+    return new Chart(ctx, {
         type: "doughnut",
         data: {
             labels: data.labels,
@@ -44,11 +44,11 @@ function drawStatusChart() {
 function drawTrendChart() {
     const ctx = document.getElementById("trendChart");
     if (!ctx) {
-        return;
+        return null;
     }
 
     const data = parseChartData("trend-data");
-    new Chart(ctx, {
+    return new Chart(ctx, {
         type: "line",
         data: {
             labels: data.labels,
@@ -82,5 +82,47 @@ function drawTrendChart() {
     });
 }
 
-drawStatusChart();
-drawTrendChart();
+const charts = {
+    status_chart: drawStatusChart(),
+    trend_chart: drawTrendChart(),
+};
+
+function formatStat(node, value) {
+    if (value === null || value === undefined) {
+        return "N/A";
+    }
+    return `${value}${node.dataset.suffix || ""}`;
+}
+
+function applyDashboardChanges(changes) {
+    for (const [name, value] of Object.entries(changes)) {
+        const chart = charts[name];
+        if (chart) {
+            // Swap the data in place so Chart.js animates instead of redrawing.
+            chart.data.labels = value.labels;
+            chart.data.datasets[0].data = value.values;
+            chart.update();
+            continue;
+        }
+        const node = document.querySelector(`[data-stat="${name}"]`);
+        if (node) {
+            node.textContent = formatStat(node, value);
+        }
+    }
+}
+
+function connectDashboardStream() {
+    const grid = document.querySelector("[data-stream-url]");
+    if (!grid || !window.EventSource) {
+        return;
+    }
+
+    const source = new EventSource(grid.dataset.streamUrl);
+    for (const eventName of ["snapshot", "delta"]) {
+        source.addEventListener(eventName, (event) => {
+            applyDashboardChanges(JSON.parse(event.data));
+        });
+    }
+}
+
+connectDashboardStream();